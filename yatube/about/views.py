@@ -1,11 +1,15 @@
 from django.views.generic.base import TemplateView
 
+from core.budgets import Budget
+
 
 class AboutAuthorView(TemplateView):
     # В переменной template_name обязательно указывается имя шаблона,
     # на основе которого будет создана возвращаемая страница
     template_name = 'about/author.html'
+    budget = Budget(max_queries=2, max_db_ms=20, max_render_ms=100)
 
 
 class AboutTechView(TemplateView):
     template_name = 'about/tech.html'
+    budget = Budget(max_queries=2, max_db_ms=20, max_render_ms=100)
@@ -0,0 +1,22 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'func', 'attempts', 'run_after', 'failed')
+    list_filter = ('failed', 'func')
+    readonly_fields = ('created',)
+    actions = ('retry_jobs',)
+
+    def retry_jobs(self, request, queryset):
+        queryset.update(
+            failed=False, attempts=0, run_after=timezone.now(),
+            locked_by='', locked_until=None,
+        )
+
+    retry_jobs.short_description = 'Повторить выбранные задачи'
+
+
+admin.site.register(Job, JobAdmin)
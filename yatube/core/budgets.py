@@ -0,0 +1,163 @@
+"""
+Бюджеты представлений: сколько запросов к базе, времени в базе и времени
+отрисовки шаблонов может потратить одна страница.
+
+Бюджет функции задает декоратор ``view_budget``, бюджет класса —
+атрибут ``budget``. Проверяет их ``ViewBudgetMiddleware``.
+"""
+import threading
+import time
+from collections import defaultdict, namedtuple
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+from django.template.base import Template
+
+Budget = namedtuple(
+    'Budget',
+    ('max_queries', 'max_db_ms', 'max_render_ms'),
+    defaults=(None, None, None),
+)
+
+_local = threading.local()
+
+
+class BudgetExceeded(AssertionError):
+    pass
+
+
+def view_budget(**limits):
+    """Задает бюджет представления-функции."""
+    def decorator(view):
+        view.budget = Budget(**limits)
+        return view
+    return decorator
+
+
+def get_budget(view):
+    budget = getattr(view, 'budget', None)
+    if budget is None:
+        budget = getattr(getattr(view, 'view_class', None), 'budget', None)
+    return budget
+
+
+class Usage:
+    """Запросы и отрисовки шаблонов за время одного запроса."""
+
+    def __init__(self):
+        self.queries = []
+        self.templates = defaultdict(list)
+        self.render_ms = 0
+        self.depth = 0
+
+    @property
+    def db_ms(self):
+        return sum(duration for sql, duration in self.queries)
+
+    def __call__(self, execute, sql, params, many, context):
+        if self not in getattr(_local, 'usages', ()):
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(
+                (sql, (time.perf_counter() - started) * 1000)
+            )
+
+    def violations(self, budget, limits=Budget._fields):
+        """Превышения тех пределов бюджета, что перечислены в ``limits``."""
+        checks = (
+            ('max_queries', 'запросов к базе', len(self.queries)),
+            ('max_db_ms', 'мс в базе', self.db_ms),
+            ('max_render_ms', 'мс на шаблоны', self.render_ms),
+        )
+        return [
+            f'{name}: {value:.0f} из {getattr(budget, field)}'
+            for field, name, value in checks
+            if field in limits and getattr(budget, field) is not None
+            and value > getattr(budget, field)
+        ]
+
+    def breakdown(self):
+        sql_stats = defaultdict(list)
+        for sql, duration in self.queries:
+            sql_stats[sql].append(duration)
+        lines = ['SQL (повторы, время):']
+        for sql, durations in sorted(
+                sql_stats.items(), key=lambda item: -sum(item[1])):
+            lines.append(
+                f'  {len(durations)}x {sum(durations):7.2f} мс  {sql}'
+            )
+        lines.append('Шаблоны (отрисовки, время с вложенными):')
+        for name, durations in sorted(
+                self.templates.items(), key=lambda item: -sum(item[1])):
+            lines.append(
+                f'  {len(durations)}x {sum(durations):7.2f} мс  {name}'
+            )
+        return '\n'.join(lines)
+
+
+def _timed_render(render):
+    def wrapper(self, context):
+        usages = getattr(_local, 'usages', None)
+        if not usages:
+            return render(self, context)
+        for usage in usages:
+            usage.depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            duration = (time.perf_counter() - started) * 1000
+            for usage in usages:
+                usage.depth -= 1
+                usage.templates[self.name or '<string>'].append(duration)
+                if not usage.depth:
+                    usage.render_ms += duration
+    wrapper.timed = True
+    return wrapper
+
+
+def install_render_timer():
+    """Подменяет Template.render замером времени, один раз на процесс."""
+    if not getattr(Template.render, 'timed', False):
+        Template.render = _timed_render(Template.render)
+
+
+@contextmanager
+def track_usage():
+    """Замеры запроса; считаются запросы ко всем базам, включая реплики."""
+    usage = Usage()
+    if not hasattr(_local, 'usages'):
+        _local.usages = []
+    usages = _local.usages
+    usages.append(usage)
+    try:
+        with ExitStack() as stack:
+            for db_connection in connections.all():
+                stack.enter_context(db_connection.execute_wrapper(usage))
+            yield usage
+    finally:
+        usages.remove(usage)
+
+
+def count_query(sql):
+    """
+    Засчитывает в замеры запрос, который здесь не выполняется, но
+    выполнился бы в работе, например INSERT задачи при
+    BACKGROUND_JOBS_EAGER.
+    """
+    for usage in getattr(_local, 'usages', ()):
+        usage.queries.append((sql, 0))
+
+
+@contextmanager
+def untracked():
+    """Запросы и шаблоны внутри блока не входят в замеры запроса."""
+    usages = getattr(_local, 'usages', [])
+    _local.usages = []
+    try:
+        yield
+    finally:
+        _local.usages = usages
@@ -0,0 +1,153 @@
+"""
+Минификация и сжатие HTML-ответов.
+
+``minify_html`` убирает из страницы комментарии и отступы шаблонов:
+каждая серия пробельных символов между тегами и в тексте сжимается до
+одного пробела или перевода строки. Содержимое <pre>, <textarea>,
+<script> и <style>, а также сами теги с атрибутами не меняются.
+
+``encode`` сжимает страницу в gzip или brotli, если клиент принимает
+их по Accept-Encoding. Страницы лент кэшируются posts.page_cache уже
+минифицированными и сжатыми, остальные HTML-ответы обрабатывает
+``core.middleware.HtmlCompressionMiddleware``.
+"""
+import gzip
+import io
+import re
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # без brotli ответы сжимаются только в gzip
+    brotli = None
+
+PRESERVED = re.compile(
+    r'(<(pre|textarea|script|style)\b.*?</\2\s*>)', re.IGNORECASE | re.DOTALL
+)
+# Условные комментарии <!--[if IE]> остаются
+COMMENT = re.compile(r'<!--(?!\[if).*?-->', re.DOTALL)
+TAG = re.compile(r'(<[^>]*>)')
+WHITESPACE = re.compile(r'\s+')
+
+
+def collapse(match):
+    return '\n' if '\n' in match.group() else ' '
+
+
+def minify_html(html):
+    parts = PRESERVED.split(html)
+    # split возвращает текст, найденный блок и имя его тега по очереди
+    chunks = []
+    for index in range(0, len(parts), 3):
+        text = COMMENT.sub('', parts[index])
+        for position, token in enumerate(TAG.split(text)):
+            chunks.append(
+                token if position % 2 else WHITESPACE.sub(collapse, token)
+            )
+        if index + 1 < len(parts):
+            chunks.append(parts[index + 1])
+    return ''.join(chunks).strip()
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding, кроме запрещенных через q=0."""
+    accepted = set()
+    for item in header.split(','):
+        encoding, *params = item.split(';')
+        quality = 1
+        for param in params:
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0
+        if encoding.strip() and quality > 0:
+            accepted.add(encoding.strip().lower())
+    return accepted
+
+
+def choose_encoding(request):
+    """'br', 'gzip' или '', если клиент не принимает сжатые ответы."""
+    accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return ''
+
+
+def gzip_compress(data, level):
+    # mtime=0, чтобы одинаковое содержимое давало одинаковые байты
+    buffer = io.BytesIO()
+    with gzip.GzipFile(
+        fileobj=buffer, mode='wb', compresslevel=level, mtime=0
+    ) as file:
+        file.write(data)
+    return buffer.getvalue()
+
+
+def encode(content, encoding):
+    """
+    Сжатое содержимое и его кодировка. Короткие ответы и ответы, которые
+    сжатие не уменьшает, возвращаются как есть с кодировкой ''.
+    """
+    if not encoding or len(content) < settings.HTML_COMPRESS_MIN_LENGTH:
+        return content, ''
+    if encoding == 'br':
+        compressed = brotli.compress(
+            content, quality=settings.HTML_BROTLI_QUALITY
+        )
+    else:
+        compressed = gzip_compress(content, settings.HTML_GZIP_LEVEL)
+    if len(compressed) >= len(content):
+        return content, ''
+    return compressed, encoding
+
+
+def minify_content(content, charset):
+    """Тело HTML-ответа в байтах после minify_html, если HTML_MINIFY."""
+    if not settings.HTML_MINIFY:
+        return content
+    return minify_html(content.decode(charset)).encode(charset)
+
+
+def is_html(response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.has_header('Content-Encoding')
+        and response.get('Content-Type', '').startswith('text/html')
+    )
+
+
+def set_content(response, content, encoding):
+    """Подставляет готовое тело ответа и помечает его обработанным."""
+    response.content = content
+    response['Content-Length'] = str(len(content))
+    if encoding:
+        response['Content-Encoding'] = encoding
+    patch_vary_headers(response, ('Accept-Encoding',))
+    response.html_compressed = True
+    return response
+
+
+def weaken_etag(response):
+    # Сжатое и исходное тело не совпадают побайтно
+    etag = response.get('ETag', '')
+    if response.has_header('Content-Encoding') and etag.startswith('"'):
+        response['ETag'] = 'W/' + etag
+
+
+def compress_response(request, response):
+    if getattr(response, 'html_compressed', False):
+        weaken_etag(response)
+        return response
+    if not is_html(response):
+        return response
+    content = minify_content(response.content, response.charset)
+    set_content(response, *encode(content, choose_encoding(request)))
+    weaken_etag(response)
+    return response
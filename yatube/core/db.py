@@ -0,0 +1,67 @@
+"""
+Настройка SQLite для работы под нагрузкой.
+
+``configure_sqlite`` выставляет прагмы из SQLITE_PRAGMAS каждому новому
+соединению: в режиме WAL читатели не ждут писателя. Писатель в SQLite
+все равно один, поэтому записи из представлений идут через
+``serialized_write`` и ждут своей очереди на блокировке файла, а не
+падают с «database is locked» при одновременной записи из нескольких
+воркеров.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+
+from . import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: очередь только внутри процесса
+    fcntl = None
+
+_write_lock = threading.Lock()
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Обработчик connection_created."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {pragma} = {value}')
+
+
+def write_lock_path():
+    return str(connection.settings_dict['NAME']) + '.write-lock'
+
+
+@contextmanager
+def serialized_write():
+    """
+    Пропускает запись к SQLite по одной: сначала среди потоков процесса,
+    затем среди процессов через flock. Вызывается вне транзакции, чтобы
+    ожидающий не держал блокировок базы.
+    """
+    if (connection.vendor != 'sqlite'
+            or not settings.SQLITE_SERIALIZE_WRITES
+            or connection.in_atomic_block):
+        yield
+        return
+    started = time.perf_counter()
+    with _write_lock:
+        lock_file = None
+        if fcntl is not None and not connection.is_in_memory_db():
+            lock_file = open(write_lock_path(), 'a')
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        metrics.observe(
+            'yatube_write_wait_seconds', time.perf_counter() - started
+        )
+        try:
+            yield
+        finally:
+            if lock_file is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                lock_file.close()
@@ -0,0 +1,181 @@
+"""
+Фоновые задачи.
+
+``enqueue(func, *args)`` записывает вызов в таблицу Job в текущей
+транзакции: задача появляется в очереди, только если изменение, ради
+которого она поставлена, зафиксировано, и не теряется при падении
+процесса. Выполняет очередь ``manage.py run_worker``. Аргументы задач —
+значения, которые переживают JSON, обычно id. Функция с декоратором
+``batched`` получает сразу список аргументов всех задач пачки, поэтому
+так помечаются только идемпотентные функции: при ошибке пачка
+выполняется заново по одной задаче. Функции с внешними побочными
+эффектами, например отправку писем, не помечают, и каждая их задача
+выполняется отдельно. При BACKGROUND_JOBS_EAGER задачи выполняются
+сразу, так их проверяют тесты.
+"""
+import json
+import logging
+import time
+import traceback
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import metrics
+from .budgets import count_query, untracked
+from .db import serialized_write
+from .models import Job
+
+logger = logging.getLogger('core.jobs')
+
+
+def batched(func):
+    """
+    Задачи с этой функцией выполняются пачкой: ``func(values)``, где
+    ``values`` — различные единственные аргументы задач пачки.
+    """
+    func.batched = True
+    return func
+
+
+def func_path(func):
+    return f'{func.__module__}.{func.__qualname__}'
+
+
+def call(func, args_list):
+    if getattr(func, 'batched', False):
+        values = list(dict.fromkeys(args[0] for args in args_list))
+        func(values)
+    else:
+        for args in args_list:
+            func(*args)
+
+
+def enqueue(func, *args):
+    """Ставит ``func(*args)`` в очередь вместе с текущей транзакцией."""
+    if settings.BACKGROUND_JOBS_EAGER:
+        # В бюджет запроса входит только запись задачи, как в работе,
+        # а саму задачу в работе выполнит воркер
+        count_query(f'INSERT INTO "{Job._meta.db_table}" ({func_path(func)})')
+        with untracked():
+            call(func, [args])
+        return
+    Job.objects.create(func=func_path(func), args=json.dumps(args))
+
+
+def ready_jobs(now):
+    return Job.objects.filter(
+        Q(locked_until__isnull=True) | Q(locked_until__lt=now),
+        failed=False,
+        run_after__lte=now,
+    )
+
+
+def claim(worker, limit):
+    """
+    Занимает до ``limit`` готовых задач на BACKGROUND_JOBS_LEASE секунд.
+    UPDATE повторяет условие выборки, поэтому задачу, которую успел
+    занять другой воркер, этот не получит. Задачи упавшего воркера
+    освобождаются сами, когда истечет срок.
+    """
+    now = timezone.now()
+    lease = timedelta(seconds=settings.BACKGROUND_JOBS_LEASE)
+    with serialized_write():
+        ids = list(
+            ready_jobs(now).order_by('pk').values_list('pk', flat=True)[:limit]
+        )
+        if not ids:
+            return []
+        ready_jobs(now).filter(pk__in=ids).update(
+            locked_by=worker, locked_until=now + lease
+        )
+    return list(Job.objects.filter(pk__in=ids, locked_by=worker))
+
+
+def group_jobs(jobs):
+    """Задачи пачки по функциям; пакетную функцию вызывают один раз."""
+    groups = {}
+    for job in jobs:
+        groups.setdefault(job.func, []).append(job)
+    return groups
+
+
+def run_jobs(worker, func, jobs):
+    """Выполняет задачи и удаляет их в одной транзакции."""
+    with serialized_write(), transaction.atomic():
+        call(func, [job.loads() for job in jobs])
+        Job.objects.filter(
+            pk__in=[job.pk for job in jobs], locked_by=worker
+        ).delete()
+
+
+def run_group(worker, path, jobs):
+    """
+    Выполняет задачи одной функции. Пакетная функция сначала получает
+    всю пачку в одной транзакции; если пачка упала, ее задачи, как и
+    задачи обычных функций, выполняются по одной, каждая в своей
+    транзакции. Повторяются только упавшие задачи, поэтому одна плохая
+    задача не задерживает остальные и не повторяет их побочные эффекты.
+    """
+    started = time.perf_counter()
+    results = Counter()
+    try:
+        func = import_string(path)
+        if getattr(func, 'batched', False) and len(jobs) > 1:
+            try:
+                run_jobs(worker, func, jobs)
+            except Exception:
+                logger.warning(
+                    'Пачка задач %s упала, задачи выполняются по одной',
+                    path, exc_info=True,
+                )
+            else:
+                results['ok'] += len(jobs)
+                jobs = []
+    except Exception:
+        logger.exception('Фоновая задача %s упала', path)
+        retry(worker, jobs, traceback.format_exc())
+        results['error'] += len(jobs)
+        jobs = []
+    for job in jobs:
+        try:
+            run_jobs(worker, func, [job])
+        except Exception:
+            logger.exception('Фоновая задача %s упала', path)
+            retry(worker, [job], traceback.format_exc())
+            results['error'] += 1
+        else:
+            results['ok'] += 1
+    close_old_connections()
+    for result, count in results.items():
+        metrics.inc('yatube_jobs_total', count, func=path, result=result)
+    metrics.observe(
+        'yatube_job_duration_seconds', time.perf_counter() - started,
+        func=path,
+    )
+
+
+def retry(worker, jobs, error):
+    """Откладывает задачи с растущей задержкой или помечает упавшими."""
+    now = timezone.now()
+    with serialized_write():
+        for job in jobs:
+            job.attempts += 1
+            job.error = error
+            job.failed = job.attempts >= settings.BACKGROUND_JOBS_MAX_ATTEMPTS
+            delay = settings.BACKGROUND_JOBS_RETRY_DELAY * 2 ** (
+                job.attempts - 1
+            )
+            Job.objects.filter(pk=job.pk, locked_by=worker).update(
+                attempts=job.attempts,
+                error=job.error,
+                failed=job.failed,
+                run_after=now + timedelta(seconds=delay),
+                locked_by='',
+                locked_until=None,
+            )
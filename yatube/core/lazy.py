@@ -0,0 +1,63 @@
+"""
+Отложенный импорт редких частей сайта.
+
+URLconf импортирует модули всех представлений при первом разборе адреса,
+поэтому входу, смене пароля и админке платит каждый воркер, даже если до
+них никто не дойдет. ``lazy_view`` импортирует представление при первом
+запросе к нему, ``lazy_include`` загружает вложенный URLconf с
+пространством имен при первом обращении к его адресам.
+"""
+from django.urls import URLResolver
+from django.urls.resolvers import RoutePattern
+from django.utils.module_loading import import_string
+
+
+def lazy_view(path, **initkwargs):
+    """Представление-класс по пути ``path``, ``as_view(**initkwargs)``."""
+    view = None
+
+    def wrapper(request, *args, **kwargs):
+        nonlocal view
+        if view is None:
+            view = import_string(path).as_view(**initkwargs)
+        return view(request, *args, **kwargs)
+    wrapper.lazy_path = path
+    return wrapper
+
+
+class LazyURLResolver(URLResolver):
+    """Вложенный URLconf, который загружается, когда нужны его адреса."""
+
+    def _populate(self):
+        # Корневой URLconf заполняет вложенные при первом же reverse,
+        # для пространства имен ему хватает самого резолвера
+        if 'urlconf_module' in self.__dict__:
+            super()._populate()
+
+    @property
+    def reverse_dict(self):
+        self.urlconf_module
+        return super().reverse_dict
+
+    @property
+    def namespace_dict(self):
+        self.urlconf_module
+        return super().namespace_dict
+
+    @property
+    def app_dict(self):
+        self.urlconf_module
+        return super().app_dict
+
+
+def lazy_include(route, urlconf, namespace):
+    """
+    Как ``path(route, include(urlconf, namespace))``, но модуль импортируется
+    при первом разборе адреса под ``route`` или reverse из ``namespace``.
+    """
+    return LazyURLResolver(
+        RoutePattern(route, is_endpoint=False),
+        urlconf,
+        app_name=namespace,
+        namespace=namespace,
+    )
@@ -0,0 +1,440 @@
+import json
+import math
+import multiprocessing
+import platform
+import subprocess
+import sys
+import time
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, connections, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.template_cache import reset_templates, warm_templates
+from posts.models import AuthorStats, Group, Post
+
+SCENARIOS = (
+    'index', 'group_posts', 'profile', 'post_detail', 'post_create', 'mixed',
+    'index_cached',
+)
+# Сценарии, в которых анонимные ленты берутся из кэша страниц. В
+# остальных кэш страниц выключен: иначе после прогрева каждый запрос
+# к одному и тому же адресу замерял бы только попадание в кэш
+PAGE_CACHE_SCENARIOS = ('index_cached',)
+# Сценарии с новыми процессами, запускаются только явно через --scenario
+PROCESS_SCENARIOS = ('first_request', 'cold_start')
+# WSGI-входы, которые сравнивает cold_start
+WSGI_ENTRIES = ('yatube.wsgi', 'yatube.wsgi_slim')
+# Новый интерпретатор: импорт WSGI-входа и первый запрос к главной
+COLD_START_SCRIPT = '''
+import importlib, json, sys, time
+from wsgiref.util import setup_testing_defaults
+started = time.perf_counter()
+application = importlib.import_module(sys.argv[1]).application
+booted = time.perf_counter()
+environ = {}
+setup_testing_defaults(environ)
+statuses = []
+b''.join(application(environ, lambda status, *args: statuses.append(status)))
+print(json.dumps({
+    'boot': booted - started,
+    'first_request': time.perf_counter() - booted,
+    'status': int(statuses[0].split()[0]),
+}))
+'''
+# Прагмы SQLite по умолчанию для сравнения с core.db (--plain-sqlite)
+PLAIN_SQLITE = {'journal_mode': 'DELETE', 'synchronous': 'FULL'}
+
+
+def percentile(values, percent):
+    """Перцентиль по ближайшему рангу для отсортированного списка."""
+    rank = math.ceil(percent / 100 * len(values))
+    return values[max(rank - 1, 0)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный прогон основных страниц: задержка p50/p95/p99, '
+        'запросы к базе на страницу и пропускная способность. Отчет '
+        'пишется в JSON, чтобы сравнивать его между коммитами. Анонимные '
+        'ленты отрисовываются без кэша страниц, попадания в него замеряет '
+        'отдельный сценарий index_cached; с --base-url кэш страниц '
+        'работает так, как настроен на сервере.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='Сколько запросов отправить в каждом сценарии.',
+        )
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument(
+            '--scenario',
+            action='append',
+            choices=SCENARIOS + PROCESS_SCENARIOS,
+            help=(
+                'Запустить только выбранные сценарии. first_request '
+                'замеряет первый запрос воркера после fork без прогрева '
+                'шаблонов и с прогревом, cold_start — запуск нового '
+                'процесса с WSGI-входами из WSGI_ENTRIES и первый запрос.'
+            ),
+        )
+        parser.add_argument(
+            '--login',
+            action='store_true',
+            help='Читать страницы от имени автора, а не анонимно.',
+        )
+        parser.add_argument(
+            '--base-url',
+            help=(
+                'Адрес запущенного сервера, например http://127.0.0.1:8000. '
+                'Без него запросы идут через тестовый клиент Django.'
+            ),
+        )
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=1,
+            help=(
+                'Сколько процессов одновременно отправляют запросы. Больше '
+                'одного — запросы идут в базу без отката, созданные посты '
+                'удаляются после сценария.'
+            ),
+        )
+        parser.add_argument(
+            '--plain-sqlite',
+            action='store_true',
+            help=(
+                'Без WAL, прагм и очереди записи core.db, чтобы сравнить '
+                'с настройками по умолчанию.'
+            ),
+        )
+        parser.add_argument(
+            '--cold-starts',
+            type=int,
+            default=10,
+            help='Сколько раз запускать процесс в сценарии cold_start.',
+        )
+        parser.add_argument('--output', help='Файл для JSON-отчета.')
+        parser.add_argument(
+            '--compare', help='Прежний JSON-отчет для сравнения.'
+        )
+
+    def handle(self, *args, **options):
+        forks = options['processes'] > 1 or set(PROCESS_SCENARIOS) & set(
+            options['scenario'] or ()
+        )
+        if forks and (
+                options['base_url'] or connection.vendor != 'sqlite'
+                or connection.is_in_memory_db()):
+            raise CommandError(
+                '--processes, first_request и cold_start работают только '
+                'с SQLite в файле и тестовым клиентом.'
+            )
+        if not options['plain_sqlite']:
+            return self.benchmark(options)
+        connections.close_all()
+        with override_settings(SQLITE_PRAGMAS=PLAIN_SQLITE,
+                               SQLITE_SERIALIZE_WRITES=False):
+            self.benchmark(options)
+        connections.close_all()
+
+    def benchmark(self, options):
+        author_stats = AuthorStats.objects.order_by('-post_count').first()
+        group = Group.objects.order_by('-post_count').first()
+        if author_stats is None or group is None:
+            raise CommandError('База пуста, сначала запустите seed.')
+        self.author = author_stats.author
+        self.group = group
+        self.post_ids = list(
+            Post.objects.values_list('id', flat=True)[:options['requests']]
+        )
+        self.base_url = options['base_url']
+        if self.base_url:
+            import requests
+            self.session = requests.Session()
+        else:
+            self.client = Client()
+            if options['login']:
+                self.client.force_login(self.author)
+            self.author_client = Client()
+            self.author_client.force_login(self.author)
+
+        scenarios = options['scenario'] or SCENARIOS
+        report = {'meta': self.meta(options), 'scenarios': {}}
+        for scenario in scenarios:
+            if scenario == 'post_create' and self.base_url:
+                self.stderr.write('post_create пропущен: нужен вход.')
+                continue
+            if scenario == 'first_request':
+                self.first_request_scenarios(report, options)
+                continue
+            if scenario == 'cold_start':
+                self.cold_start_scenarios(report, options)
+                continue
+            with override_settings(
+                    POSTS_PAGE_CACHE=scenario in PAGE_CACHE_SCENARIOS):
+                result = self.run(scenario, options)
+            report['scenarios'][scenario] = result
+            self.print_result(scenario, result)
+
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as stream:
+                self.compare(json.load(stream), report)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                json.dump(report, stream, ensure_ascii=False, indent=2,
+                          sort_keys=True)
+
+    def meta(self, options):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                cwd=settings.BASE_DIR, capture_output=True, text=True,
+            ).stdout.strip() or None
+        except OSError:
+            commit = None
+        return {
+            'commit': commit,
+            'created': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'posts': Post.objects.count(),
+            'requests': options['requests'],
+            'login': options['login'],
+            'processes': options['processes'],
+            'plain_sqlite': options['plain_sqlite'],
+            'templates_cached': settings.TEMPLATES_CACHED,
+            'target': self.base_url or 'test client',
+        }
+
+    def request(self, scenario, number):
+        """Отправляет запрос сценария и возвращает код ответа."""
+        if scenario == 'mixed':
+            # Каждый четвертый запрос — новый пост, остальные — главная
+            scenario = 'post_create' if number % 4 == 0 else 'index'
+        if scenario == 'post_create':
+            response = self.author_client.post(
+                reverse('posts:post_create'),
+                {'text': f'Пост нагрузочного теста {number}'},
+            )
+            return response.status_code
+        if scenario in ('index', 'index_cached'):
+            url = reverse('posts:index')
+        elif scenario == 'group_posts':
+            url = reverse('posts:group_list', args=[self.group.slug])
+        elif scenario == 'profile':
+            url = reverse('posts:profile', args=[self.author.username])
+        else:
+            post_id = self.post_ids[number % len(self.post_ids)]
+            url = reverse('posts:post_detail', args=[post_id])
+        if self.base_url:
+            return self.session.get(self.base_url + url).status_code
+        return self.client.get(url).status_code
+
+    def run(self, scenario, options):
+        if options['processes'] > 1:
+            return self.run_processes(scenario, options)
+        latencies, queries, errors = [], 0, 0
+        # Посты из post_create откатываются вместе с транзакцией
+        with transaction.atomic():
+            for number in range(options['warmup']):
+                self.request(scenario, number)
+            started = time.perf_counter()
+            for number in range(options['requests']):
+                with CaptureQueriesContext(connection) as captured:
+                    request_started = time.perf_counter()
+                    status = self.request(scenario, number)
+                    latencies.append(time.perf_counter() - request_started)
+                queries += len(captured)
+                errors += status >= 400
+            elapsed = time.perf_counter() - started
+            transaction.set_rollback(True)
+        return self.result(
+            latencies, elapsed, errors,
+            None if self.base_url else queries / len(latencies),
+        )
+
+    def run_processes(self, scenario, options):
+        """
+        Запускает сценарий в нескольких процессах сразу. Замер начинается,
+        когда все процессы прогреты, и заканчивается с последним ответом.
+        """
+        processes = options['processes']
+        per_process = math.ceil(options['requests'] / processes)
+        last_pk = Post.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        ready = context.Barrier(processes + 1)
+        results = context.Queue()
+        workers = [
+            context.Process(
+                target=self.work,
+                args=(scenario, options['warmup'],
+                      range(index * per_process, (index + 1) * per_process),
+                      ready, results),
+            )
+            for index in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        ready.wait()
+        started = time.perf_counter()
+        latencies, errors = [], 0
+        for _ in workers:
+            worker_latencies, worker_errors = results.get()
+            latencies.extend(worker_latencies)
+            errors += worker_errors
+        elapsed = time.perf_counter() - started
+        for worker in workers:
+            worker.join()
+        Post.objects.filter(pk__gt=last_pk, author=self.author).delete()
+        return self.result(latencies, elapsed, errors, None)
+
+    def work(self, scenario, warmup, numbers, ready, results):
+        """Тело процесса из run_processes."""
+        for number in range(warmup):
+            self.request(scenario, number)
+        ready.wait()
+        latencies, errors = [], 0
+        for number in numbers:
+            request_started = time.perf_counter()
+            try:
+                status = self.request(scenario, number)
+            except DatabaseError:
+                status = 500
+            latencies.append(time.perf_counter() - request_started)
+            errors += status >= 400
+        results.put((latencies, errors))
+        connections.close_all()
+
+    def first_request_scenarios(self, report, options):
+        if not settings.TEMPLATES_CACHED:
+            self.stderr.write(
+                'Кэш шаблонов выключен (DEBUG), прогрев ничего не меняет: '
+                'запустите с TEMPLATES_CACHED=1.'
+            )
+        for warm in (False, True):
+            scenario = 'first_request_warm' if warm else 'first_request_cold'
+            result = self.first_requests(options['requests'], warm)
+            report['scenarios'][scenario] = result
+            self.print_result(scenario, result)
+
+    def first_requests(self, count, warm):
+        """
+        Первый запрос только что созданного воркера, как у gunicorn
+        --preload: процесс ответвляется от этого и сразу открывает главную
+        страницу. Без ``warm`` шаблоны разбираются в воркере во время
+        запроса, с ``warm`` — уже разобраны до fork.
+        """
+        reset_templates()
+        if warm:
+            warm_templates()
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        latencies, errors = [], 0
+        started = time.perf_counter()
+        for _ in range(count):
+            worker = context.Process(target=self.first_request,
+                                     args=(results,))
+            worker.start()
+            latency, status = results.get()
+            worker.join()
+            latencies.append(latency)
+            errors += status >= 400
+        elapsed = time.perf_counter() - started
+        return self.result(latencies, elapsed, errors, None)
+
+    def first_request(self, results):
+        """Тело воркера из first_requests."""
+        # Вошедший автор: анонимная главная пришла бы из кэша страниц
+        request_started = time.perf_counter()
+        response = self.author_client.get(reverse('posts:index'))
+        results.put(
+            (time.perf_counter() - request_started, response.status_code)
+        )
+        connections.close_all()
+
+    def cold_start_scenarios(self, report, options):
+        for entry in WSGI_ENTRIES:
+            scenario = 'cold_start_' + entry.split('.')[-1]
+            result = self.cold_starts(entry, options['cold_starts'])
+            report['scenarios'][scenario] = result
+            self.print_result(scenario, result)
+            self.stdout.write(
+                f'{"":>12}  запуск p50 {result["boot_p50_ms"]:8.2f} мс  '
+                f'первый запрос p50 {result["first_request_p50_ms"]:8.2f} мс'
+            )
+
+    def cold_starts(self, entry, count):
+        """
+        Холодный старт воркера: новый интерпретатор импортирует
+        WSGI-вход ``entry`` и отвечает на первый запрос к главной. Задержка
+        сценария — сумма обоих времен, без запуска самого интерпретатора.
+        """
+        latencies, boots, first_requests, errors = [], [], [], 0
+        started = time.perf_counter()
+        for _ in range(count):
+            process = subprocess.run(
+                [sys.executable, '-c', COLD_START_SCRIPT, entry],
+                cwd=settings.BASE_DIR, capture_output=True, text=True,
+            )
+            if process.returncode:
+                raise CommandError(process.stderr.strip().splitlines()[-1])
+            timings = json.loads(process.stdout.splitlines()[-1])
+            boots.append(timings['boot'])
+            first_requests.append(timings['first_request'])
+            latencies.append(timings['boot'] + timings['first_request'])
+            errors += timings['status'] >= 400
+        elapsed = time.perf_counter() - started
+        result = self.result(latencies, elapsed, errors, None)
+        result['boot_p50_ms'] = round(
+            percentile(sorted(boots), 50) * 1000, 3
+        )
+        result['first_request_p50_ms'] = round(
+            percentile(sorted(first_requests), 50) * 1000, 3
+        )
+        return result
+
+    def result(self, latencies, elapsed, errors, queries_per_request):
+        latencies.sort()
+        return {
+            'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+            'queries_per_request': queries_per_request,
+            'throughput_rps': round(len(latencies) / elapsed, 1),
+            'errors': errors,
+        }
+
+    def print_result(self, scenario, result):
+        queries = result['queries_per_request']
+        self.stdout.write(
+            f'{scenario:>12}: p50 {result["p50_ms"]:8.2f} мс  '
+            f'p95 {result["p95_ms"]:8.2f} мс  p99 {result["p99_ms"]:8.2f} мс  '
+            f'{result["throughput_rps"]:8.1f} запр/с  '
+            f'запросов к БД: {"-" if queries is None else f"{queries:.1f}"}'
+        )
+
+    def compare(self, baseline, report):
+        self.stdout.write(f'Сравнение с {baseline["meta"].get("commit")}:')
+        for scenario, result in report['scenarios'].items():
+            old = baseline['scenarios'].get(scenario)
+            if old is None:
+                continue
+            changes = []
+            for key in ('p50_ms', 'p95_ms', 'throughput_rps'):
+                if old[key]:
+                    delta = (result[key] - old[key]) / old[key] * 100
+                    changes.append(f'{key} {delta:+.1f}%')
+            self.stdout.write(f'{scenario:>12}: ' + ', '.join(changes))
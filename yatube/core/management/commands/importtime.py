@@ -0,0 +1,102 @@
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+LINE_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def parse_importtime(text):
+    """
+    Строки ``python -X importtime`` в список ``(модуль, собственное время,
+    время с вложенными импортами, глубина)``, время в микросекундах.
+    """
+    modules = []
+    for line in text.splitlines():
+        match = LINE_RE.match(line)
+        if match:
+            own, cumulative, indent, name = match.groups()
+            modules.append(
+                (name, int(own), int(cumulative), (len(indent) - 1) // 2)
+            )
+    return modules
+
+
+def group_by_package(modules, depth):
+    """Собственное время, сложенное по первым ``depth`` частям имени."""
+    totals = defaultdict(int)
+    for name, own, _, _ in modules:
+        totals['.'.join(name.split('.')[:depth])] += own
+    return [(name, own, own, 0) for name, own in totals.items()]
+
+
+class Command(BaseCommand):
+    help = (
+        'Профиль импортов при запуске воркера: запускает новый '
+        'интерпретатор с -X importtime, импортирует WSGI-вход и выводит '
+        'таблицу модулей, самые долгие первыми.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--entry',
+            action='append',
+            help=(
+                'Модуль, импорт которого замеряется; можно указать '
+                'несколько. По умолчанию yatube.wsgi и yatube.wsgi_slim.'
+            ),
+        )
+        parser.add_argument(
+            '--sort',
+            choices=('self', 'cumulative'),
+            default='cumulative',
+            help='Сортировать по собственному времени или с вложенными.',
+        )
+        parser.add_argument('--limit', type=int, default=25)
+        parser.add_argument(
+            '--package-depth',
+            type=int,
+            help=(
+                'Сложить собственное время по пакетам из стольких частей '
+                'имени, например 2 для django.db.'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        for entry in options['entry'] or ['yatube.wsgi', 'yatube.wsgi_slim']:
+            modules = parse_importtime(self.profile(entry))
+            if not modules:
+                raise CommandError(f'Не удалось замерить импорт {entry}.')
+            total = sum(own for _, own, _, _ in modules)
+            self.stdout.write(
+                f'{entry}: {len(modules)} модулей, {total / 1000:.1f} мс'
+            )
+            if options['package_depth']:
+                modules = group_by_package(modules, options['package_depth'])
+            key = 1 if options['sort'] == 'self' else 2
+            modules.sort(key=lambda module: -module[key])
+            self.stdout.write(f'{"свое, мс":>10} {"всего, мс":>10}  модуль')
+            for name, own, cumulative, _ in modules[:options['limit']]:
+                self.stdout.write(
+                    f'{own / 1000:10.1f} {cumulative / 1000:10.1f}  {name}'
+                )
+            self.stdout.write('')
+
+    def profile(self, entry):
+        env = {
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': os.environ.get(
+                'DJANGO_SETTINGS_MODULE', 'yatube.settings'
+            ),
+        }
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {entry}'],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if process.returncode:
+            raise CommandError(process.stderr.strip().splitlines()[-1])
+        return process.stderr
@@ -0,0 +1,91 @@
+import os
+import signal
+import socket
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from core import jobs
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет фоновые задачи из очереди core.jobs. Несколько воркеров '
+        'можно запускать одновременно, каждая задача достается одному.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=2,
+            help='Сколько групп задач выполнять параллельно в потоках.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Сколько задач занимать из очереди за раз.',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help='Пауза в секундах, когда очередь пуста.',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Выполнить готовые задачи и выйти.',
+        )
+
+    def handle(self, *args, **options):
+        worker = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        stopping = threading.Event()
+
+        def stop(signum, frame):
+            # Текущая пачка доделывается, новые задачи не берутся
+            stopping.set()
+
+        handlers = {
+            signum: signal.signal(signum, stop)
+            for signum in (signal.SIGTERM, signal.SIGINT)
+        }
+        try:
+            done = self.work(worker, stopping, options)
+        finally:
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+        self.stdout.write(f'Воркер {worker} обработал задач: {done}.')
+
+    def work(self, worker, stopping, options):
+        done = 0
+        executor = None
+        if options['concurrency'] > 1:
+            executor = ThreadPoolExecutor(
+                max_workers=options['concurrency'],
+                thread_name_prefix='background-job',
+            )
+        try:
+            while not stopping.is_set():
+                claimed = jobs.claim(worker, options['batch_size'])
+                if not claimed:
+                    if options['once']:
+                        break
+                    stopping.wait(options['poll_interval'])
+                    continue
+                groups = jobs.group_jobs(claimed).items()
+                if executor is None:
+                    for path, group in groups:
+                        jobs.run_group(worker, path, group)
+                else:
+                    list(executor.map(
+                        lambda item: jobs.run_group(worker, *item), groups
+                    ))
+                done += len(claimed)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        return done
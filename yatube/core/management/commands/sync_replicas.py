@@ -0,0 +1,52 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную базу SQLite в файлы реплик из DATABASE_REPLICAS. '
+        'Заменяет репликацию при локальной проверке чтения с реплик.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            help=(
+                'Повторять копирование раз в столько секунд, имитируя '
+                'отставание реплик.'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError(
+                'Реплики не заданы: укажите DATABASE_REPLICAS в окружении.'
+            )
+        if connections['default'].vendor != 'sqlite':
+            raise CommandError('Копировать можно только базу SQLite.')
+        while True:
+            self.sync()
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+
+    def sync(self):
+        source = connections['default']
+        source.ensure_connection()
+        started = time.perf_counter()
+        for alias in settings.DATABASE_REPLICAS:
+            connections[alias].close()
+            target = sqlite3.connect(connections[alias].settings_dict['NAME'])
+            try:
+                source.connection.backup(target)
+            finally:
+                target.close()
+        self.stdout.write(
+            f'Реплики обновлены: {", ".join(settings.DATABASE_REPLICAS)} '
+            f'за {time.perf_counter() - started:.2f} с.'
+        )
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.template_cache import warm_templates
+
+
+class Command(BaseCommand):
+    help = (
+        'Разбирает все шаблоны TEMPLATES_DIR, как yatube/wsgi.py при '
+        'запуске воркера, и сообщает время и синтаксические ошибки.'
+    )
+
+    def handle(self, *args, **options):
+        count, seconds, errors = warm_templates()
+        for name, error in errors.items():
+            self.stderr.write(f'{name}: {error}')
+        cached = 'в кэше' if settings.TEMPLATES_CACHED else 'без кэша'
+        self.stdout.write(
+            f'Разобрано шаблонов: {count} за {seconds * 1000:.1f} мс '
+            f'({cached}).'
+        )
+        if errors:
+            raise CommandError(f'Ошибки в шаблонах: {len(errors)}.')
@@ -0,0 +1,211 @@
+"""
+Метрики в текстовом формате Prometheus.
+
+Каждый процесс копит значения в памяти и сохраняет их в
+METRICS_DIR/<pid>.json, если с прошлой записи прошло больше
+METRICS_FLUSH_INTERVAL секунд, а также при выходе. Страница /metrics/
+складывает файлы всех процессов, поэтому воркеры gunicorn отдают общие
+числа. Каталог задается переменной окружения METRICS_DIR, его нужно
+очищать перед запуском gunicorn. Без него (например, у runserver)
+метрики видны только в своем процессе.
+"""
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+QUERY_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+PAGE_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 500)
+
+HISTOGRAM = 'histogram'
+COUNTER = 'counter'
+
+METRICS = {
+    'yatube_request_duration_seconds': (
+        HISTOGRAM, 'Время ответа по представлению', LATENCY_BUCKETS,
+    ),
+    'yatube_db_queries': (
+        HISTOGRAM, 'Запросов к базе за ответ', QUERY_BUCKETS,
+    ),
+    'yatube_db_duration_seconds': (
+        HISTOGRAM, 'Время в базе за ответ', LATENCY_BUCKETS,
+    ),
+    'yatube_template_render_seconds': (
+        HISTOGRAM, 'Время отрисовки шаблонов за ответ', LATENCY_BUCKETS,
+    ),
+    'yatube_write_wait_seconds': (
+        HISTOGRAM, 'Ожидание очереди на запись в SQLite', LATENCY_BUCKETS,
+    ),
+    'yatube_paginator_page_number': (
+        HISTOGRAM, 'Номер запрошенной нумерованной страницы', PAGE_BUCKETS,
+    ),
+    'yatube_paginator_pages_total': (
+        COUNTER, 'Страницы лент по способу паджинации', None,
+    ),
+    'yatube_cache_requests_total': (
+        COUNTER, 'Обращения к кэшам страниц и счетчиков', None,
+    ),
+    'yatube_jobs_total': (
+        COUNTER, 'Выполненные и упавшие фоновые задачи', None,
+    ),
+    'yatube_job_duration_seconds': (
+        HISTOGRAM, 'Время выполнения пачки фоновых задач', LATENCY_BUCKETS,
+    ),
+}
+
+
+def format_labels(labels):
+    def escape(value):
+        return (
+            str(value).replace('\\', r'\\').replace('"', r'\"')
+            .replace('\n', r'\n')
+        )
+    return ','.join(
+        f'{name}="{escape(value)}"' for name, value in sorted(labels.items())
+    )
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else 'unresolved'
+
+
+class Registry:
+    """Значения метрик текущего процесса."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.pid = os.getpid()
+        self.samples = {name: {} for name in METRICS}
+        self.flushed = time.monotonic()
+
+    def check_fork(self):
+        # Воркер gunicorn не должен повторно отдать значения мастера
+        if os.getpid() != self.pid:
+            self.reset()
+
+    def observe(self, name, value, **labels):
+        buckets = METRICS[name][2]
+        key = format_labels(labels)
+        with self.lock:
+            self.check_fork()
+            sample = self.samples[name].get(key)
+            if sample is None:
+                sample = self.samples[name][key] = {
+                    'buckets': [0] * len(buckets), 'sum': 0, 'count': 0,
+                }
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    sample['buckets'][index] += 1
+                    break
+            sample['sum'] += value
+            sample['count'] += 1
+        self.maybe_flush()
+
+    def inc(self, name, amount=1, **labels):
+        key = format_labels(labels)
+        with self.lock:
+            self.check_fork()
+            counters = self.samples[name]
+            counters[key] = counters.get(key, 0) + amount
+        self.maybe_flush()
+
+    def path(self):
+        return os.path.join(settings.METRICS_DIR, f'{self.pid}.json')
+
+    def maybe_flush(self):
+        interval = settings.METRICS_FLUSH_INTERVAL
+        if time.monotonic() - self.flushed >= interval:
+            self.flush()
+
+    def flush(self):
+        if not settings.METRICS_DIR:
+            return
+        with self.lock:
+            self.check_fork()
+            data = json.dumps(self.samples)
+            self.flushed = time.monotonic()
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        path = self.path()
+        with open(path + '.tmp', 'w') as file:
+            file.write(data)
+        os.replace(path + '.tmp', path)
+
+    def collect(self):
+        """Значения всех процессов, сложенные по метрикам и меткам."""
+        if not settings.METRICS_DIR:
+            with self.lock:
+                return json.loads(json.dumps(self.samples))
+        self.flush()
+        merged = {name: {} for name in METRICS}
+        for path in glob.glob(os.path.join(settings.METRICS_DIR, '*.json')):
+            try:
+                with open(path) as file:
+                    samples = json.load(file)
+            except (OSError, ValueError):
+                continue
+            for name, values in samples.items():
+                if name in merged:
+                    merge(merged[name], values)
+        return merged
+
+
+def merge(target, values):
+    for key, value in values.items():
+        if key not in target:
+            target[key] = value
+        elif isinstance(value, dict):
+            sample = target[key]
+            sample['buckets'] = [
+                left + right
+                for left, right in zip(sample['buckets'], value['buckets'])
+            ]
+            sample['sum'] += value['sum']
+            sample['count'] += value['count']
+        else:
+            target[key] += value
+
+
+def braces(key):
+    return f'{{{key}}}' if key else ''
+
+
+def render(samples):
+    """Текст в формате Prometheus 0.0.4."""
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for key, value in sorted(samples[name].items()):
+            if kind == COUNTER:
+                lines.append(f'{name}{braces(key)} {value}')
+                continue
+            prefix = f'{key},' if key else ''
+            cumulative = 0
+            for bound, count in zip(buckets, value['buckets']):
+                cumulative += count
+                lines.append(
+                    f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}'
+                )
+            lines.append(
+                f'{name}_bucket{{{prefix}le="+Inf"}} {value["count"]}'
+            )
+            lines.append(f'{name}_sum{braces(key)} {value["sum"]}')
+            lines.append(f'{name}_count{braces(key)} {value["count"]}')
+    return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+observe = registry.observe
+inc = registry.inc
+atexit.register(registry.flush)
@@ -0,0 +1,156 @@
+import logging
+import random
+import sys
+import time
+
+from django.conf import settings
+
+from . import metrics
+from .budgets import (BudgetExceeded, get_budget, install_render_timer,
+                      track_usage)
+from .compression import compress_response
+from .profiling import start_sampler, write_profile
+from .routers import PRIMARY_COOKIE, allow_replica_reads, replica_reads
+
+logger = logging.getLogger('core.budgets')
+
+
+class ViewBudgetMiddleware:
+    """
+    Сверяет расход страницы с бюджетом ее представления. При
+    VIEW_BUDGETS_MODE = 'raise' превышение бюджета — исключение с
+    разбором запросов и шаблонов, при 'log' — предупреждение в лог.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install_render_timer()
+
+    def __call__(self, request):
+        if settings.VIEW_BUDGETS_MODE == 'off':
+            return self.get_response(request)
+        with track_usage() as usage:
+            response = self.get_response(request)
+        budget = getattr(request, 'view_budget', None)
+        if budget is not None:
+            self.check(request, budget, usage)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.view_budget = get_budget(view_func)
+
+    def check(self, request, budget, usage):
+        violations = usage.violations(
+            budget, settings.VIEW_BUDGETS_LIMITS
+        )
+        if not violations:
+            return
+        view_name = request.resolver_match.view_name
+        message = (
+            f'{view_name} ({request.get_full_path()}) вышел за бюджет: '
+            + '; '.join(violations) + '\n' + usage.breakdown()
+        )
+        if settings.VIEW_BUDGETS_MODE == 'raise':
+            raise BudgetExceeded(message)
+        logger.warning(message)
+
+
+class ProfilingMiddleware:
+    """
+    Профилирует долю PROFILING_SAMPLE_RATE запросов и дописывает их стеки
+    в PROFILING_DIR/<представление>.collapsed, а замеры — в .timings.
+    Остальные запросы проходят без замеров и лишних потоков.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install_render_timer()
+
+    def __call__(self, request):
+        rate = settings.PROFILING_SAMPLE_RATE
+        if not rate or random.random() >= rate:
+            return self.get_response(request)
+        sampler = start_sampler(sys._getframe())
+        started = time.perf_counter()
+        try:
+            with track_usage() as usage:
+                response = self.get_response(request)
+        finally:
+            stacks = sampler.stop()
+        total_ms = (time.perf_counter() - started) * 1000
+        write_profile(metrics.view_name(request), stacks, (
+            f'{request.method} {request.get_full_path()} '
+            f'status={response.status_code} total_ms={total_ms:.1f} '
+            f'queries={len(usage.queries)} db_ms={usage.db_ms:.1f} '
+            f'render_ms={usage.render_ms:.1f} '
+            f'samples={sum(stacks.values())}'
+        ))
+        return response
+
+
+class MetricsMiddleware:
+    """Замеры каждого ответа для гистограмм core.metrics."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install_render_timer()
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        with track_usage() as usage:
+            response = self.get_response(request)
+        view = metrics.view_name(request)
+        metrics.observe(
+            'yatube_request_duration_seconds',
+            time.perf_counter() - started, view=view,
+        )
+        metrics.observe('yatube_db_queries', len(usage.queries), view=view)
+        metrics.observe(
+            'yatube_db_duration_seconds', usage.db_ms / 1000, view=view
+        )
+        metrics.observe(
+            'yatube_template_render_seconds', usage.render_ms / 1000,
+            view=view,
+        )
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Разрешает чтение с реплик в представлениях DATABASE_REPLICA_VIEWS и
+    после любой записи в основную базу ставит cookie, по которой
+    следующие запросы браузера читают основную базу.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with replica_reads(pinned=PRIMARY_COOKIE in request.COOKIES) as state:
+            response = self.get_response(request)
+            wrote = state.wrote
+        if wrote:
+            response.set_cookie(
+                PRIMARY_COOKIE, '1',
+                max_age=settings.DATABASE_REPLICA_MAX_LAG,
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.resolver_match.view_name in settings.DATABASE_REPLICA_VIEWS:
+            allow_replica_reads()
+
+
+class HtmlCompressionMiddleware:
+    """
+    Минифицирует HTML-ответы и сжимает их в gzip или brotli по
+    Accept-Encoding (core.compression). Страницы, которые уже сжал кэш
+    страниц лент, проходят без повторного сжатия.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return compress_response(request, self.get_response(request))
@@ -0,0 +1,39 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:54
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('func', models.CharField(max_length=200, verbose_name='функция')),
+                ('args', models.TextField(default='[]', verbose_name='аргументы')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='попытки')),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, verbose_name='выполнить после')),
+                ('locked_by', models.CharField(blank=True, max_length=100, verbose_name='воркер')),
+                ('locked_until', models.DateTimeField(blank=True, null=True, verbose_name='занята до')),
+                ('failed', models.BooleanField(default=False, verbose_name='не выполнена')),
+                ('error', models.TextField(blank=True, verbose_name='ошибка')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='поставлена')),
+            ],
+            options={
+                'verbose_name': 'фоновая задача',
+                'verbose_name_plural': 'фоновые задачи',
+                'ordering': ['pk'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['failed', 'run_after'], name='job_ready_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+import json
+
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """
+    Отложенный вызов ``func(*args)`` из core.jobs. Выполненные задачи
+    удаляются, упавшие больше BACKGROUND_JOBS_MAX_ATTEMPTS раз остаются
+    с ``failed`` и текстом ошибки.
+    """
+    func = models.CharField('функция', max_length=200)
+    args = models.TextField('аргументы', default='[]')
+    attempts = models.PositiveSmallIntegerField('попытки', default=0)
+    run_after = models.DateTimeField('выполнить после', default=timezone.now)
+    locked_by = models.CharField('воркер', max_length=100, blank=True)
+    locked_until = models.DateTimeField('занята до', null=True, blank=True)
+    failed = models.BooleanField('не выполнена', default=False)
+    error = models.TextField('ошибка', blank=True)
+    created = models.DateTimeField('поставлена', auto_now_add=True)
+
+    class Meta:
+        ordering = ['pk']
+        verbose_name = 'фоновая задача'
+        verbose_name_plural = 'фоновые задачи'
+        indexes = [
+            models.Index(
+                fields=['failed', 'run_after'],
+                name='job_ready_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.func}{tuple(self.loads())}'
+
+    def loads(self):
+        return json.loads(self.args)
@@ -0,0 +1,93 @@
+"""
+Выборочное профилирование запросов.
+
+Пока идет запрос, отдельный поток раз в PROFILING_INTERVAL_MS снимает
+стек потока, который его обрабатывает. Снимки складываются в файлы
+формата collapsed stacks (по файлу на представление), из которых
+flamegraph.pl или speedscope строят flame graph. Корень каждого стека —
+категория времени: ``sql``, если в стеке есть драйвер базы, ``template``
+внутри отрисовки шаблона и ``python`` в остальных случаях.
+"""
+import os
+import sys
+import threading
+from collections import Counter
+
+from django.conf import settings
+
+CATEGORIES = (
+    ('sql', 'django.db.backends.'),
+    ('template', 'django.template.'),
+)
+
+
+def frame_name(frame):
+    module = frame.f_globals.get('__name__', '?')
+    code = frame.f_code
+    return f'{module}.{getattr(code, "co_qualname", code.co_name)}'
+
+
+def collapse(frame, root):
+    """Стек от ``root`` (не включая его) до ``frame`` с категорией."""
+    names = []
+    while frame is not None and frame is not root:
+        names.append(frame_name(frame))
+        frame = frame.f_back
+    names.reverse()
+    for category, prefix in CATEGORIES:
+        if any(name.startswith(prefix) for name in names):
+            break
+    else:
+        category = 'python'
+    return ';'.join([category] + names)
+
+
+class Sampler(threading.Thread):
+    """Снимает стеки потока ``thread_id`` ниже кадра ``root``."""
+
+    def __init__(self, thread_id, root, interval):
+        super().__init__(name='request-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.root = root
+        self.interval = interval
+        self.stacks = Counter()
+        self.finished = threading.Event()
+
+    def run(self):
+        while not self.finished.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[collapse(frame, self.root)] += 1
+
+    def stop(self):
+        self.finished.set()
+        self.join()
+        return self.stacks
+
+
+def start_sampler(root):
+    sampler = Sampler(
+        threading.get_ident(), root, settings.PROFILING_INTERVAL_MS / 1000
+    )
+    sampler.start()
+    return sampler
+
+
+def profile_path(view_name, suffix):
+    filename = view_name.replace(':', '.') + suffix
+    return os.path.join(settings.PROFILING_DIR, filename)
+
+
+def write_profile(view_name, stacks, summary):
+    """
+    Дописывает стеки и строку с замерами запроса в файлы представления.
+    Каждый файл пишется одним вызовом write, чтобы строки разных
+    процессов не перемешивались.
+    """
+    os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+    lines = ''.join(f'{stack} {count}\n' for stack, count in stacks.items())
+    if lines:
+        with open(profile_path(view_name, '.collapsed'), 'a') as file:
+            file.write(lines)
+    with open(profile_path(view_name, '.timings'), 'a') as file:
+        file.write(summary + '\n')
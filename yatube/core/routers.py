@@ -0,0 +1,71 @@
+"""
+Чтение с реплик базы.
+
+Реплики — псевдонимы из DATABASE_REPLICAS. С них читаются только модели
+приложений DATABASE_REPLICA_APPS и только в представлениях
+DATABASE_REPLICA_VIEWS, все остальное, включая сессии, идет в основную
+базу. После записи ``ReplicaRoutingMiddleware`` ставит cookie, и
+DATABASE_REPLICA_MAX_LAG секунд этот браузер читает только основную базу,
+чтобы автор сразу видел свой пост.
+"""
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+
+PRIMARY_COOKIE = 'read_primary'
+
+_state = threading.local()
+
+
+@contextmanager
+def replica_reads(pinned=False):
+    """Состояние маршрутизации на время одного запроса."""
+    _state.allowed = False
+    _state.primary = pinned
+    _state.wrote = False
+    _state.replica_used = False
+    try:
+        yield _state
+    finally:
+        _state.allowed = False
+
+
+def allow_replica_reads():
+    _state.allowed = True
+
+
+def read_from_replica():
+    """Читал ли текущий запрос что-нибудь с реплики."""
+    return getattr(_state, 'replica_used', False)
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if (not replicas
+                or not getattr(_state, 'allowed', False)
+                or getattr(_state, 'primary', False)
+                or model._meta.app_label
+                not in settings.DATABASE_REPLICA_APPS):
+            return 'default'
+        _state.replica_used = True
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        # До конца запроса читаем то, что только что записали
+        _state.primary = True
+        _state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {'default', *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Реплики получают схему вместе с данными из основной базы
+        if db in settings.DATABASE_REPLICAS:
+            return False
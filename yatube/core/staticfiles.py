@@ -0,0 +1,229 @@
+"""
+Статика с отпечатками и сжатыми копиями.
+
+``CompressedManifestStaticFilesStorage`` при collectstatic дописывает
+к имени каждого файла хэш содержимого, как ManifestStaticFilesStorage,
+и кладет рядом копии .gz и .br (brotli, если он установлен) для
+текстовых файлов, если сжатие их заметно уменьшает.
+
+``StaticFilesApplication`` оборачивает WSGI-приложение и отдает файлы
+из STATIC_ROOT до Django: выбирает сжатую копию по Accept-Encoding,
+отвечает 304 по ETag и If-Modified-Since, а тело передает через
+wsgi.file_wrapper, который у gunicorn отправляет файл через sendfile
+без копирования в процесс. Файлы с хэшем в имени кэшируются браузером
+на год, остальные — на STATIC_CACHE_MAX_AGE секунд. Список файлов
+читается при запуске, поэтому после collectstatic воркеры перезапускают.
+"""
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import posixpath
+from wsgiref.util import FileWrapper
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.utils.http import http_date, parse_http_date_safe
+
+from .compression import accepted_encodings, brotli, gzip_compress
+
+logger = logging.getLogger('core.staticfiles')
+
+COMPRESSIBLE_TYPES = (
+    'text/', 'application/javascript', 'application/json',
+    'application/xml', 'image/svg+xml', 'image/x-icon',
+    'image/vnd.microsoft.icon',
+)
+# Сжатая копия сохраняется, только если она меньше этой доли оригинала
+COMPRESS_RATIO = 0.95
+# Расширения сжатых копий в порядке предпочтения при отдаче
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+BLOCK_SIZE = 64 * 1024
+
+
+def is_compressible(name):
+    content_type, _ = mimetypes.guess_type(name)
+    return bool(content_type) and content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def compressors():
+    yield '.gz', lambda data: gzip_compress(data, 9)
+    if brotli is not None:
+        yield '.br', lambda data: brotli.compress(data, quality=11)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        # Оригинал и копия с хэшем обычно совпадают, сжимаем их один раз
+        compressed = {}
+        names = set(self.hashed_files) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if not is_compressible(name) or not self.exists(name):
+                continue
+            for compressed_name in self.compress(name, compressed):
+                yield name, compressed_name, True
+
+    def compress(self, name, compressed):
+        with self.open(name) as file:
+            data = file.read()
+        for suffix, compress in compressors():
+            compressed_name = name + suffix
+            if self.exists(compressed_name):
+                self.delete(compressed_name)
+            key = (suffix, hashlib.sha256(data).digest())
+            if key not in compressed:
+                compressed[key] = compress(data)
+            if len(compressed[key]) < len(data) * COMPRESS_RATIO:
+                self._save(compressed_name, ContentFile(compressed[key]))
+                yield compressed_name
+
+
+def content_type(name):
+    guessed, _ = mimetypes.guess_type(name)
+    guessed = guessed or 'application/octet-stream'
+    if guessed.startswith('text/') or guessed == 'application/javascript':
+        guessed += '; charset=utf-8'
+    return guessed
+
+
+class StaticVariant:
+    """Файл на диске в одной кодировке и заголовки ответа для него."""
+
+    def __init__(self, path, headers, encoding=None):
+        stat = os.stat(path)
+        self.path = path
+        self.mtime = int(stat.st_mtime)
+        self.etag = f'"{stat.st_size:x}-{self.mtime:x}"'
+        self.headers = headers + [
+            ('Content-Length', str(stat.st_size)),
+            ('Last-Modified', http_date(self.mtime)),
+            ('ETag', self.etag),
+        ]
+        if encoding:
+            self.headers.append(('Content-Encoding', encoding))
+
+    def not_modified(self, environ):
+        if_none_match = environ.get('HTTP_IF_NONE_MATCH')
+        if if_none_match is not None:
+            etags = {
+                etag.strip().replace('W/', '', 1)
+                for etag in if_none_match.split(',')
+            }
+            return self.etag in etags or '*' in etags
+        since = parse_http_date_safe(
+            environ.get('HTTP_IF_MODIFIED_SINCE', '')
+        )
+        return since is not None and self.mtime <= since
+
+
+class StaticFile:
+    """Файл из STATIC_ROOT со сжатыми копиями, если они есть."""
+
+    def __init__(self, path, immutable):
+        max_age = (
+            IMMUTABLE_MAX_AGE if immutable else settings.STATIC_CACHE_MAX_AGE
+        )
+        cache_control = f'public, max-age={max_age}'
+        if immutable:
+            cache_control += ', immutable'
+        encoded = [
+            (encoding, path + suffix) for encoding, suffix in ENCODINGS
+            if os.path.isfile(path + suffix)
+        ]
+        headers = [
+            ('Content-Type', content_type(path)),
+            ('Cache-Control', cache_control),
+        ]
+        if encoded:
+            headers.append(('Vary', 'Accept-Encoding'))
+        self.variants = {
+            encoding: StaticVariant(encoded_path, headers, encoding)
+            for encoding, encoded_path in encoded
+        }
+        self.identity = StaticVariant(path, headers)
+
+    def variant(self, environ):
+        if self.variants:
+            accepted = accepted_encodings(
+                environ.get('HTTP_ACCEPT_ENCODING', '')
+            )
+            for encoding, _ in ENCODINGS:
+                if encoding in accepted and encoding in self.variants:
+                    return self.variants[encoding]
+        return self.identity
+
+
+def hashed_names(root):
+    """Имена с хэшем из манифеста collectstatic."""
+    path = os.path.join(root, ManifestStaticFilesStorage.manifest_name)
+    try:
+        with open(path) as file:
+            return set(json.load(file).get('paths', {}).values())
+    except (OSError, ValueError):
+        return set()
+
+
+def find_files(root):
+    """``{имя: StaticFile}`` для всех файлов STATIC_ROOT, кроме копий."""
+    immutable = hashed_names(root)
+    suffixes = tuple(suffix for _, suffix in ENCODINGS)
+    files = {}
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, root).replace(os.sep, '/')
+            if (name == ManifestStaticFilesStorage.manifest_name
+                    or name.endswith(suffixes)):
+                continue
+            files[name] = StaticFile(path, name in immutable)
+    return files
+
+
+class StaticFilesApplication:
+    """WSGI-обертка, которая отдает статику до Django."""
+
+    def __init__(self, application, root=None, prefix=None):
+        self.application = application
+        self.root = root or settings.STATIC_ROOT
+        self.prefix = prefix or settings.STATIC_URL
+        self.files = find_files(self.root) if self.root else {}
+        if not self.files:
+            logger.warning(
+                'В STATIC_ROOT (%s) нет файлов, выполните collectstatic',
+                self.root,
+            )
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if not path.startswith(self.prefix):
+            return self.application(environ, start_response)
+        name = posixpath.normpath(path[len(self.prefix):])
+        static_file = self.files.get(name)
+        if static_file is None:
+            return self.application(environ, start_response)
+        method = environ.get('REQUEST_METHOD', 'GET')
+        if method not in ('GET', 'HEAD'):
+            start_response('405 Method Not Allowed', [
+                ('Allow', 'GET, HEAD'), ('Content-Length', '0'),
+            ])
+            return []
+        variant = static_file.variant(environ)
+        if variant.not_modified(environ):
+            headers = [
+                header for header in variant.headers
+                if header[0] not in ('Content-Length', 'Content-Encoding')
+            ]
+            start_response('304 Not Modified', headers)
+            return []
+        start_response('200 OK', list(variant.headers))
+        if method == 'HEAD':
+            return []
+        file_wrapper = environ.get('wsgi.file_wrapper', FileWrapper)
+        return file_wrapper(open(variant.path, 'rb'), BLOCK_SIZE)
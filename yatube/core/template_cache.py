@@ -0,0 +1,60 @@
+"""
+Прогрев кэша шаблонов.
+
+С кэширующим загрузчиком (TEMPLATES_CACHED) шаблон разбирается один раз
+на процесс, но этот раз приходится на первый запрос, который его
+отрисовывает. ``warm_templates`` заранее разбирает все шаблоны из
+каталогов DIRS движка: yatube/wsgi.py вызывает его до того, как воркер
+начнет принимать запросы, а под gunicorn --preload разобранные шаблоны
+достаются воркерам от мастера через fork.
+"""
+import logging
+import os
+import time
+
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+
+logger = logging.getLogger('core.template_cache')
+
+
+def django_engines():
+    return [
+        engine.engine for engine in engines.all()
+        if hasattr(engine, 'engine')
+    ]
+
+
+def template_names(engine):
+    for directory in engine.dirs:
+        for root, _, files in os.walk(directory):
+            for filename in sorted(files):
+                path = os.path.join(root, filename)
+                yield os.path.relpath(path, directory).replace(os.sep, '/')
+
+
+def warm_templates():
+    """
+    Разбирает шаблоны и возвращает их число, время в секундах и ошибки
+    вида ``{имя: текст ошибки}``. Ошибки только пишутся в лог: воркер
+    запускается и с ними, а падает на них команда warm_templates.
+    """
+    started = time.perf_counter()
+    count, errors = 0, {}
+    for engine in django_engines():
+        for name in template_names(engine):
+            try:
+                engine.get_template(name)
+            except (TemplateSyntaxError, TemplateDoesNotExist,
+                    UnicodeDecodeError, OSError) as error:
+                errors[name] = str(error)
+                logger.warning('Шаблон %s не разобран: %s', name, error)
+            count += 1
+    return count, time.perf_counter() - started, errors
+
+
+def reset_templates():
+    """Забывает разобранные шаблоны, как у только что запущенного воркера."""
+    for engine in django_engines():
+        for loader in engine.template_loaders:
+            if hasattr(loader, 'reset'):
+                loader.reset()
@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+BUDGET_MIDDLEWARE = 'core.middleware.ViewBudgetMiddleware'
+
+
+class BudgetTestRunner(DiscoverRunner):
+    """
+    Тесты падают, если страница вышла за бюджет запросов к базе своего
+    представления; время страниц замеряет manage.py benchmark.
+    Фоновые задачи выполняются сразу, чтобы тесты видели их результат.
+    Кэш в памяти процесса: тесты чистят его и не трогают кэш разработки.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        middleware = list(settings.MIDDLEWARE)
+        if BUDGET_MIDDLEWARE not in middleware:
+            middleware.append(BUDGET_MIDDLEWARE)
+        self.budget_settings = override_settings(
+            MIDDLEWARE=middleware, VIEW_BUDGETS_MODE='raise',
+            VIEW_BUDGETS_LIMITS=('max_queries',),
+            BACKGROUND_JOBS_EAGER=True,
+            CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            }},
+        )
+        self.budget_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.budget_settings.disable()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,646 @@
+import gzip
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from contextlib import nullcontext
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core import mail
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.template import engines
+from django.templatetags.static import static
+from django.test import (RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+from django.urls import path, resolve, reverse
+
+from posts.models import Post
+
+from . import jobs, metrics
+from .budgets import BudgetExceeded, track_usage, view_budget
+from .compression import minify_html
+from .lazy import lazy_include, lazy_view
+from .management.commands.importtime import (
+    group_by_package, parse_importtime,
+)
+from .middleware import ViewBudgetMiddleware
+from .models import Job
+from .profiling import start_sampler
+from .routers import (PRIMARY_COOKIE, ReplicaRouter, allow_replica_reads,
+                      replica_reads)
+from .staticfiles import StaticFilesApplication, brotli
+from .template_cache import reset_templates, warm_templates
+
+User = get_user_model()
+
+job_calls = []
+
+
+@jobs.batched
+def record_batch(values):
+    job_calls.append(values)
+
+
+def failing_job(value):
+    raise ValueError(value)
+
+
+def flaky_job(value):
+    if value == 2:
+        raise ValueError(value)
+    job_calls.append(value)
+
+
+@jobs.batched
+def flaky_batch(values):
+    for value in values:
+        flaky_job(value)
+
+
+@view_budget(max_render_ms=0)
+def slow_view(request):
+    engines['django'].from_string('{{ value }}').render({'value': 1})
+
+
+@view_budget(max_queries=1)
+def greedy_view(request):
+    for _ in range(3):
+        User.objects.exists()
+    engines['django'].from_string('{{ value }}').render({'value': 1})
+
+
+class ViewBudgetMiddlewareTest(TestCase):
+
+    def call(self, view):
+        request = RequestFactory().get('/')
+        request.resolver_match = resolve('/')
+
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            return view(request)
+
+        middleware = ViewBudgetMiddleware(get_response)
+        return middleware(request)
+
+    @override_settings(VIEW_BUDGETS_MODE='raise')
+    def test_budget_exceeded(self):
+        """Превышение бюджета показывает повторяющийся SQL и шаблоны."""
+        with self.assertRaises(BudgetExceeded) as context:
+            self.call(greedy_view)
+        message = str(context.exception)
+        self.assertIn('запросов к базе: 3 из 1', message)
+        self.assertIn('3x', message)
+        self.assertIn('auth_user', message)
+        self.assertIn('<string>', message)
+
+    @override_settings(VIEW_BUDGETS_MODE='log')
+    def test_budget_logged(self):
+        with self.assertLogs('core.budgets', 'WARNING'):
+            self.call(greedy_view)
+
+    @override_settings(VIEW_BUDGETS_MODE='raise')
+    def test_time_limits_checked_if_listed(self):
+        """В тестах пределы времени не проверяются, на стенде — да."""
+        self.call(slow_view)
+        with override_settings(VIEW_BUDGETS_LIMITS=('max_render_ms',)):
+            with self.assertRaises(BudgetExceeded):
+                self.call(slow_view)
+
+    @override_settings(BACKGROUND_JOBS_EAGER=True)
+    def test_eager_job_counts_as_insert(self):
+        """Задача при EAGER входит в замер одним INSERT, как в работе."""
+        with track_usage() as usage:
+            jobs.enqueue(record_batch, 1)
+        self.assertEqual(len(usage.queries), 1)
+        self.assertIn('core_job', usage.queries[0][0])
+
+    def test_all_databases_tracked(self):
+        """Запросы к репликам тоже входят в бюджет."""
+        replica = mock.Mock()
+        replica.execute_wrapper.return_value = nullcontext()
+        with mock.patch.object(
+            connections, 'all', return_value=[connection, replica]
+        ):
+            with track_usage() as usage:
+                User.objects.exists()
+        replica.execute_wrapper.assert_called_once_with(usage)
+        self.assertEqual(len(usage.queries), 1)
+
+
+def busy(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+@override_settings(PROFILING_INTERVAL_MS=1)
+class ProfilingMiddlewareTest(TestCase):
+
+    def setUp(self):
+        self.profiling_dir = tempfile.mkdtemp()
+        settings = override_settings(PROFILING_DIR=self.profiling_dir)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(shutil.rmtree, self.profiling_dir)
+
+    def timings_path(self):
+        return os.path.join(self.profiling_dir, 'posts.index.timings')
+
+    def test_sampler_collapses_stacks(self):
+        """Стеки считаются от кадра middleware и начинаются с категории."""
+        sampler = start_sampler(sys._getframe())
+        busy(0.05)
+        stacks = sampler.stop()
+        self.assertIn('python;core.tests.busy', stacks)
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_sampled_request_written(self):
+        self.client.get(reverse('posts:index'))
+        with open(self.timings_path()) as file:
+            summary = file.read()
+        self.assertIn('GET / status=200', summary)
+        self.assertIn('queries=', summary)
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    def test_unsampled_request_not_written(self):
+        self.client.get(reverse('posts:index'))
+        self.assertFalse(os.path.exists(self.timings_path()))
+
+
+@override_settings(METRICS_TOKEN='secret')
+class MetricsTest(TestCase):
+
+    def setUp(self):
+        metrics.registry.reset()
+        self.metrics_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.metrics_dir)
+
+    def scrape(self):
+        response = self.client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret'
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_request_histograms(self):
+        """Ответы попадают в гистограммы по имени представления."""
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        text = self.scrape()
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="posts:index"} 2',
+            text,
+        )
+        self.assertIn('yatube_db_queries_bucket{view="posts:index"', text)
+        self.assertIn(
+            'yatube_cache_requests_total{cache="feed_page",result="hit"} 1',
+            text,
+        )
+        self.assertIn(
+            'yatube_paginator_pages_total{mode="keyset_first",'
+            'view="posts:index"} 1',
+            text,
+        )
+
+    def test_processes_aggregated(self):
+        """Файлы других процессов складываются с текущим."""
+        other = {name: {} for name in metrics.METRICS}
+        other['yatube_cache_requests_total'] = {
+            'cache="feed_page",result="hit"': 5,
+        }
+        with open(os.path.join(self.metrics_dir, '1.json'), 'w') as file:
+            json.dump(other, file)
+        metrics.inc(
+            'yatube_cache_requests_total', cache='feed_page', result='hit'
+        )
+        with self.settings(METRICS_DIR=self.metrics_dir):
+            text = self.scrape()
+        self.assertIn(
+            'yatube_cache_requests_total{cache="feed_page",result="hit"} 6',
+            text,
+        )
+
+    def test_scrape_without_token_forbidden(self):
+        """Без верного токена метрики не отдаются, даже с 127.0.0.1."""
+        for header in ('', 'Bearer wrong', 'secret'):
+            with self.subTest(header=header):
+                response = self.client.get(
+                    reverse('metrics'), HTTP_AUTHORIZATION=header
+                )
+                self.assertEqual(response.status_code, 404)
+        with self.settings(METRICS_TOKEN=None):
+            response = self.client.get(
+                reverse('metrics'), HTTP_AUTHORIZATION='Bearer None'
+            )
+        self.assertEqual(response.status_code, 404)
+
+
+class SQLiteTuningTest(TestCase):
+
+    def test_connection_pragmas(self):
+        """Новое соединение получает прагмы из SQLITE_PRAGMAS."""
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            synchronous = cursor.fetchone()[0]
+            cursor.execute('PRAGMA cache_size')
+            cache_size = cursor.fetchone()[0]
+        self.assertEqual(synchronous, 1, 'synchronous не равен NORMAL')
+        self.assertEqual(cache_size, -64 * 1024)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRouterTest(TestCase):
+
+    def test_reads_routed_to_replica(self):
+        """Посты в разрешенных представлениях читаются с реплики."""
+        router = ReplicaRouter()
+        with replica_reads():
+            self.assertEqual(router.db_for_read(Session), 'default')
+            allow_replica_reads()
+            self.assertEqual(router.db_for_read(User), 'default')
+            self.assertEqual(router.db_for_read(Post), 'replica1')
+            router.db_for_write(Post)
+            self.assertEqual(
+                router.db_for_read(Post), 'default',
+                'После записи запрос читает с реплики',
+            )
+
+    def test_author_pinned_to_primary(self):
+        """После записи автор читает основную базу, а не реплику."""
+        user = User.objects.create_user(username='writer')
+        self.client.force_login(user)
+        response = self.client.post(
+            reverse('posts:post_create'), {'text': 'Новый пост'}
+        )
+        self.assertIn(PRIMARY_COOKIE, response.cookies)
+        # Реплики replica1 в тестах нет, чтение с нее упало бы
+        response = self.client.get(response.url)
+        self.assertContains(response, 'Новый пост')
+
+
+@override_settings(BACKGROUND_JOBS_EAGER=False)
+class JobQueueTest(TestCase):
+
+    def setUp(self):
+        job_calls.clear()
+
+    def run_worker(self):
+        call_command(
+            'run_worker', once=True, concurrency=1, stdout=io.StringIO()
+        )
+
+    def test_batched_jobs(self):
+        """Пакетная функция получает аргументы всех задач пачки за раз."""
+        for value in (1, 2, 1):
+            jobs.enqueue(record_batch, value)
+        self.assertEqual(Job.objects.count(), 3)
+        self.run_worker()
+        self.assertEqual(job_calls, [[1, 2]])
+        self.assertFalse(Job.objects.exists(), 'Задачи остались в очереди')
+
+    @override_settings(
+        BACKGROUND_JOBS_RETRY_DELAY=0, BACKGROUND_JOBS_MAX_ATTEMPTS=3
+    )
+    def test_failing_job_retried(self):
+        """Упавшая задача повторяется и после всех попыток остается."""
+        jobs.enqueue(failing_job, 'ошибка')
+        with self.assertLogs('core.jobs', 'ERROR'):
+            self.run_worker()
+        job = Job.objects.get()
+        self.assertTrue(job.failed)
+        self.assertEqual(job.attempts, 3)
+        self.assertIn('ValueError', job.error)
+
+    @override_settings(BACKGROUND_JOBS_RETRY_DELAY=1000)
+    def test_failing_job_does_not_block_others(self):
+        """Упавшая задача повторяется одна, соседние выполняются раз."""
+        for func in (flaky_job, flaky_batch):
+            with self.subTest(func=func.__name__):
+                job_calls.clear()
+                Job.objects.all().delete()
+                for value in (1, 2, 3):
+                    jobs.enqueue(func, value)
+                with self.assertLogs('core.jobs', 'ERROR'):
+                    self.run_worker()
+                self.assertEqual(sorted(set(job_calls)), [1, 3])
+                self.assertEqual(job_calls.count(3), 1)
+                job = Job.objects.get()
+                self.assertEqual(job.loads(), [2])
+                self.assertEqual(job.attempts, 1)
+                self.assertFalse(job.failed)
+
+    def test_claimed_job_skipped(self):
+        """Задачу, занятую другим воркером, второй воркер не получает."""
+        jobs.enqueue(record_batch, 1)
+        self.assertEqual(len(jobs.claim('first', 10)), 1)
+        self.assertEqual(jobs.claim('second', 10), [])
+
+    def test_post_side_effects_deferred(self):
+        """Счетчики и поиск обновляются воркером, а не запросом."""
+        user = User.objects.create_user(username='author')
+        self.client.force_login(user)
+        self.client.post(
+            reverse('posts:post_create'), {'text': 'Отложенный пост'}
+        )
+        self.assertFalse(Post.objects.search('отложенный').exists())
+        self.run_worker()
+        self.assertTrue(Post.objects.search('отложенный').exists())
+        self.assertEqual(user.stats.post_count, 1)
+
+    def test_signup_email_sent_by_worker(self):
+        """Письмо о регистрации отправляет воркер."""
+        self.client.post(reverse('users:signup'), {
+            'username': 'newbie',
+            'email': 'newbie@example.com',
+            'password1': 'Sl0zhny-parol',
+            'password2': 'Sl0zhny-parol',
+        })
+        self.assertEqual(mail.outbox, [])
+        self.run_worker()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['newbie@example.com'])
+
+
+CACHED_TEMPLATES = [{
+    **settings.TEMPLATES[0],
+    'OPTIONS': {
+        **settings.TEMPLATES[0]['OPTIONS'],
+        'loaders': [(
+            'django.template.loaders.cached.Loader',
+            ['django.template.loaders.filesystem.Loader'],
+        )],
+    },
+}]
+
+
+@override_settings(TEMPLATES=CACHED_TEMPLATES)
+class TemplateCacheTest(TestCase):
+
+    def cached_names(self):
+        loader = engines['django'].engine.template_loaders[0]
+        return {
+            template.origin.template_name
+            for template in loader.get_template_cache.values()
+        }
+
+    def test_all_templates_warmed(self):
+        """Прогрев разбирает все шаблоны TEMPLATES_DIR в кэш загрузчика."""
+        count, _, errors = warm_templates()
+        self.assertEqual(errors, {})
+        self.assertEqual(len(self.cached_names()), count)
+        self.assertIn('includes/post.html', self.cached_names())
+        reset_templates()
+        self.assertEqual(self.cached_names(), set())
+
+    def test_broken_templates_reported(self):
+        """Ошибки шаблонов не прерывают прогрев, а падает на них команда."""
+        engine = engines['django'].engine
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, 'broken.html'), 'w') as file:
+                file.write('{% if %}')
+            with open(os.path.join(directory, 'logo.png'), 'wb') as file:
+                file.write(b'\x89PNG\xff\xfe')
+            with mock.patch.object(engine, 'dirs', [directory]):
+                self.addCleanup(reset_templates)
+                with self.assertLogs('core.template_cache', 'WARNING'):
+                    count, _, errors = warm_templates()
+                self.assertEqual(count, 2)
+                self.assertEqual(set(errors), {'broken.html', 'logo.png'})
+                with self.assertRaises(CommandError), self.assertLogs(
+                        'core.template_cache', 'WARNING'):
+                    call_command(
+                        'warm_templates', stdout=io.StringIO(),
+                        stderr=io.StringIO(),
+                    )
+
+    def test_command_reports_templates(self):
+        """warm_templates сообщает, сколько шаблонов разобрано."""
+        stdout = io.StringIO()
+        call_command('warm_templates', stdout=stdout)
+        self.assertIn('Разобрано шаблонов', stdout.getvalue())
+
+
+IMPORTTIME_OUTPUT = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     django.db.utils
+import time:       300 |        420 |   django.db
+import time:        80 |         80 |   django.utils
+import time:       100 |        600 | yatube.wsgi
+"""
+
+
+class StartupTest(SimpleTestCase):
+
+    def test_parse_importtime(self):
+        """Вывод -X importtime разбирается в модули и пакеты."""
+        modules = parse_importtime(IMPORTTIME_OUTPUT)
+        self.assertEqual(modules[0], ('django.db.utils', 120, 120, 2))
+        self.assertEqual(modules[-1], ('yatube.wsgi', 100, 600, 0))
+        self.assertEqual(
+            sorted(group_by_package(modules, 1)),
+            [('django', 500, 500, 0), ('yatube', 100, 100, 0)],
+        )
+
+    def test_importtime_command(self):
+        """importtime печатает таблицу импортов указанного модуля."""
+        stdout = io.StringIO()
+        call_command('importtime', entry=['json'], limit=3, stdout=stdout)
+        self.assertIn('json', stdout.getvalue())
+
+    def test_lazy_include(self):
+        """URLconf из lazy_include загружается только ради его адресов."""
+        lazy = lazy_include('lazy/', 'yatube.admin_urls', namespace='lazy')
+        urlconf = type('URLConf', (), {'urlpatterns': [
+            path('plain/', greedy_view, name='plain'), lazy,
+        ]})
+        self.assertEqual(reverse('plain', urlconf=urlconf), '/plain/')
+        self.assertNotIn(
+            'urlconf_module', lazy.__dict__,
+            'URLconf загрузился при заполнении корневого',
+        )
+        self.assertEqual(reverse('lazy:index', urlconf=urlconf), '/lazy/')
+        self.assertIn('urlconf_module', lazy.__dict__)
+
+    def test_lazy_view(self):
+        """lazy_view импортирует представление при первом запросе."""
+        view = lazy_view('django.views.generic.RedirectView', url='/target/')
+        response = view(RequestFactory().get('/'))
+        self.assertEqual(response.url, '/target/')
+
+
+class StaticFilesTest(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.static_root = tempfile.mkdtemp()
+        cls.static_settings = override_settings(
+            STATIC_ROOT=cls.static_root,
+            # Статика админки только замедлила бы сборку
+            STATICFILES_FINDERS=[
+                'django.contrib.staticfiles.finders.FileSystemFinder',
+            ],
+            STATICFILES_STORAGE=(
+                'core.staticfiles.CompressedManifestStaticFilesStorage'
+            ),
+        )
+        cls.static_settings.enable()
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.static_settings.disable()
+        shutil.rmtree(cls.static_root)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.fallback_calls = []
+        self.application = StaticFilesApplication(self.fallback)
+
+    def fallback(self, environ, start_response):
+        self.fallback_calls.append(environ['PATH_INFO'])
+        start_response('404 Not Found', [])
+        return [b'']
+
+    def request(self, path, **environ):
+        environ.setdefault('REQUEST_METHOD', 'GET')
+        response = {}
+
+        def start_response(status, headers):
+            response['status'] = int(status.split()[0])
+            response['headers'] = dict(headers)
+
+        body = self.application({'PATH_INFO': path, **environ}, start_response)
+        response['body'] = b''.join(body)
+        if hasattr(body, 'close'):
+            body.close()
+        return response
+
+    def test_collectstatic_hashes_and_compresses(self):
+        """collectstatic добавляет хэш к именам и сжимает текстовые файлы."""
+        url = static('css/bootstrap.min.css')
+        self.assertRegex(
+            url, r'^/static/css/bootstrap\.min\.[0-9a-f]{12}\.css$'
+        )
+        name = os.path.join(self.static_root, url[len('/static/'):])
+        self.assertTrue(os.path.exists(name + '.gz'))
+        if brotli is not None:
+            self.assertTrue(os.path.exists(name + '.br'))
+        logo = os.path.join(
+            self.static_root, static('img/logo.png')[len('/static/'):]
+        )
+        self.assertFalse(
+            os.path.exists(logo + '.gz'), 'PNG не нужно сжимать повторно'
+        )
+
+    def test_serves_compressed_variant(self):
+        """Отдается лучшая из принятых клиентом сжатых копий."""
+        url = static('css/bootstrap.min.css')
+        with open(os.path.join(
+            self.static_root, url[len('/static/'):]
+        ), 'rb') as file:
+            original = file.read()
+        plain = self.request(url)
+        self.assertEqual(plain['body'], original)
+        self.assertNotIn('Content-Encoding', plain['headers'])
+        self.assertEqual(plain['headers']['Vary'], 'Accept-Encoding')
+        self.assertIn('immutable', plain['headers']['Cache-Control'])
+        gzipped = self.request(url, HTTP_ACCEPT_ENCODING='gzip, br;q=0')
+        self.assertEqual(gzipped['headers']['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(gzipped['body']), original)
+        self.assertEqual(
+            int(gzipped['headers']['Content-Length']), len(gzipped['body'])
+        )
+        if brotli is not None:
+            best = self.request(url, HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+            self.assertEqual(best['headers']['Content-Encoding'], 'br')
+            self.assertEqual(brotli.decompress(best['body']), original)
+
+    def test_conditional_and_fallback_requests(self):
+        """304 по ETag, HEAD без тела, чужие адреса уходят в Django."""
+        url = static('img/logo.png')
+        first = self.request(url)
+        again = self.request(url, HTTP_IF_NONE_MATCH=first['headers']['ETag'])
+        self.assertEqual(again['status'], 304)
+        self.assertEqual(again['body'], b'')
+        head = self.request(url, REQUEST_METHOD='HEAD')
+        self.assertEqual(head['status'], 200)
+        self.assertEqual(head['body'], b'')
+        unhashed = self.request('/static/img/logo.png')
+        self.assertNotIn('immutable', unhashed['headers']['Cache-Control'])
+        self.request('/static/css/missing.css')
+        self.request('/static/../settings.py')
+        self.request('/posts/')
+        self.assertEqual(self.fallback_calls, [
+            '/static/css/missing.css', '/static/../settings.py', '/posts/',
+        ])
+
+    def test_uses_file_wrapper(self):
+        """Тело передается через wsgi.file_wrapper сервера (sendfile)."""
+        wrapped = []
+
+        def file_wrapper(file, block_size):
+            wrapped.append(file.name)
+            file.close()
+            return []
+
+        self.request(static('img/logo.png'), **{
+            'wsgi.file_wrapper': file_wrapper,
+        })
+        self.assertEqual(len(wrapped), 1)
+
+
+class HtmlCompressionTest(TestCase):
+
+    def test_minify_html(self):
+        """Отступы и комментарии удаляются, <pre> и атрибуты остаются."""
+        html = (
+            '<!-- шапка -->\n  <div class="a  b">\n    <b>Я</b>  <i>Т</i>\n'
+            '  </div>\n<pre>  отступ\n\n  сохранен</pre>'
+            '<textarea name="text">  а\n  б</textarea>\n'
+        )
+        self.assertEqual(minify_html(html), (
+            '<div class="a  b">\n<b>Я</b> <i>Т</i>\n</div>\n'
+            '<pre>  отступ\n\n  сохранен</pre>'
+            '<textarea name="text">  а\n  б</textarea>'
+        ))
+
+    def test_middleware_compresses_html(self):
+        """HTML-страницы сжимаются по Accept-Encoding, ETag ослабляется."""
+        url = reverse('about:author')
+        plain = self.client.get(url)
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertNotIn('<!--', plain.content.decode())
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip;q=1.0')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertEqual(
+            int(response['Content-Length']), len(response.content)
+        )
+        if brotli is not None:
+            response = self.client.get(
+                url, HTTP_ACCEPT_ENCODING='gzip, deflate, br'
+            )
+            self.assertEqual(response['Content-Encoding'], 'br')
+            self.assertEqual(
+                brotli.decompress(response.content), plain.content
+            )
+
+    def test_conditional_get_with_compression(self):
+        """Слабый ETag сжатой страницы дает 304 на повторный запрос."""
+        Post.objects.create(
+            text='Пост', author=User.objects.create_user('etag-author')
+        )
+        response = self.client.get('/', HTTP_ACCEPT_ENCODING='gzip')
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('W/'))
+        response = self.client.get(
+            '/', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 304)
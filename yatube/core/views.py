@@ -0,0 +1,24 @@
+import hmac
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+
+from . import metrics
+
+
+def metrics_view(request):
+    """
+    Метрики всех процессов для Prometheus. Отдаются только с заголовком
+    ``Authorization: Bearer <METRICS_TOKEN>``; без METRICS_TOKEN адрес
+    закрыт. Адрес клиента не проверяется: за прокси на той же машине
+    он у всех запросов 127.0.0.1.
+    """
+    token = settings.METRICS_TOKEN
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    if not token or not hmac.compare_digest(
+            header.encode(), f'Bearer {token}'.encode()):
+        raise Http404
+    return HttpResponse(
+        metrics.render(metrics.registry.collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
@@ -1,14 +1,89 @@
 from django.contrib import admin
+from django.contrib.admin.options import IS_POPUP_VAR, TO_FIELD_VAR
+from django.contrib.admin.views.main import (
+    ALL_VAR, ORDER_VAR, PAGE_VAR, ChangeList,
+)
 
-from .models import Post, Group
+from .models import Follow, Post, Group, PostDayCount
+from .paginators import ApproximateCountPaginator
+
+# Параметры списка, которые не фильтруют посты
+LIST_VARS = {ALL_VAR, ORDER_VAR, PAGE_VAR, IS_POPUP_VAR, TO_FIELD_VAR}
+DATE_PARTS = ('year', 'month', 'day')
+
+
+class PostChangeList(ChangeList):
+
+    def get_results(self, request):
+        super().get_results(request)
+        # Всего постов — по таблице дней, а не COUNT(*) по постам
+        self.full_result_count = PostDayCount.total()
+        self.show_full_result_count = True
+        self.show_admin_actions = bool(self.full_result_count)
 
 
 class PostAdmin(admin.ModelAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author', 'group')
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
+    # Ссылки по датам строит posts_admin.post_date_hierarchy
+    date_hierarchy = 'pub_date'
     empty_value_display = '-пусто-'
+    paginator = ApproximateCountPaginator
+    # Полное число постов считает PostChangeList
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).for_feed()
+
+    def get_changelist(self, request, **kwargs):
+        return PostChangeList
+
+    def get_paginator(self, request, queryset, per_page, orphans=0,
+                      allow_empty_first_page=True):
+        return self.paginator(
+            queryset, per_page, day_filters=self.day_filters(request),
+            orphans=orphans, allow_empty_first_page=allow_empty_first_page,
+        )
+
+    def day_filters(self, request):
+        """
+        Условия на PostDayCount, если список отфильтрован только по
+        дате из date_hierarchy, иначе None.
+        """
+        params = {
+            f'pub_date__{part}': part for part in DATE_PARTS
+        }
+        if not set(request.GET) - LIST_VARS <= set(params):
+            return None
+        try:
+            return {
+                f'day__{part}': int(request.GET[param])
+                for param, part in params.items() if param in request.GET
+            }
+        except ValueError:
+            return None
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        field = super().formfield_for_foreignkey(db_field, request, **kwargs)
+        if db_field.name == 'group':
+            # Список групп list_editable читается один раз на страницу,
+            # а не для каждой строки
+            choices = getattr(request, '_group_choices', None)
+            if choices is None:
+                # list() спросил бы у итератора len() лишним COUNT
+                choices = [choice for choice in field.choices]
+                request._group_choices = choices
+            field.choices = choices
+        return field
+
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск по text идет через полнотекстовый индекс, а не LIKE
+        if not search_term:
+            return queryset, False
+        return queryset.search(search_term), False
 
 
 admin.site.register(Post, PostAdmin)
@@ -21,3 +96,12 @@ class GroupAdmin(admin.ModelAdmin):
 
 
 admin.site.register(Group, GroupAdmin)
+
+
+class FollowAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'user', 'author')
+    search_fields = ('user__username', 'author__username')
+    raw_id_fields = ('user', 'author')
+
+
+admin.site.register(Follow, FollowAdmin)
@@ -0,0 +1,101 @@
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+
+from .models import Group, Post, User
+from .paginators import KeysetPaginator, decode_cursor, encode_cursor
+
+API_FIELDS = (
+    'id', 'text', 'pub_date', 'updated', 'author__username', 'group__slug',
+)
+
+
+def serialize(row):
+    return {
+        'id': row['id'],
+        'text': row['text'],
+        'pub_date': row['pub_date'],
+        'updated': row['updated'],
+        'author': row['author__username'],
+        'group': row['group__slug'],
+    }
+
+
+def to_json(value):
+    return json.dumps(value, cls=DjangoJSONEncoder, ensure_ascii=False)
+
+
+def get_limit(request):
+    try:
+        limit = int(request.GET.get('limit', settings.POSTS_API_PAGE_SIZE))
+    except ValueError:
+        limit = settings.POSTS_API_PAGE_SIZE
+    return max(1, min(limit, settings.POSTS_API_MAX_PAGE_SIZE))
+
+
+def stream_feed(request, queryset):
+    """
+    Потоковый JSON со страницей ленты по курсорам ``after``/``before``.
+
+    Строки читаются через ``values()`` и ``iterator()`` и отдаются
+    клиенту по мере чтения, поэтому даже большая страница не собирается
+    в памяти целиком. Курсоры соседних страниц идут в конце ответа.
+    """
+    limit = get_limit(request)
+    paginator = KeysetPaginator(queryset.values(*API_FIELDS), limit)
+    after = decode_cursor(request.GET.get('after', ''))
+    before = not after and decode_cursor(request.GET.get('before', ''))
+    rows = paginator.keyset_queryset(after, before)
+
+    def cursor(row):
+        return encode_cursor(row['pub_date'], row['id'])
+
+    def generate():
+        if before:
+            page = list(rows)
+            has_next, has_previous = True, len(page) > limit
+            page = page[:limit][::-1]
+        else:
+            page = rows.iterator(chunk_size=settings.POSTS_API_CHUNK_SIZE)
+            has_next, has_previous = False, bool(after)
+        yield '{"results": ['
+        first = last = None
+        for count, row in enumerate(page):
+            if count == limit:
+                has_next = True
+                break
+            yield (',' if count else '') + to_json(serialize(row))
+            first = first or row
+            last = row
+        yield '], "next": {}, "previous": {}}}'.format(
+            to_json(cursor(last) if has_next and last else None),
+            to_json(cursor(first) if has_previous and first else None),
+        )
+
+    return StreamingHttpResponse(generate(), content_type='application/json')
+
+
+def index(request):
+    return stream_feed(request, Post.objects.all())
+
+
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return stream_feed(request, group.posts.all())
+
+
+def profile(request, username):
+    author = get_object_or_404(User, username=username)
+    return stream_feed(request, author.posts.all())
+
+
+def post_detail(request, post_id):
+    row = Post.objects.filter(pk=post_id).values(*API_FIELDS).first()
+    if row is None:
+        raise Http404('Пост не найден')
+    return JsonResponse(
+        serialize(row), json_dumps_params={'ensure_ascii': False}
+    )
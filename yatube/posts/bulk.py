@@ -0,0 +1,92 @@
+"""Общий код команд, которые пишут посты через bulk_create."""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, connections, transaction
+from django.db.models import AutoField
+
+from . import search, timeline
+from .counters import recount_posts
+from .follow import inbox_feed
+from .models import Follow, Group, Post, User
+from .page_cache import bump_feed_versions
+from .paginators import feed_count_key
+
+
+def bulk_create_posts(posts, using='default'):
+    """
+    bulk_create с заданной pub_date. Значения полей готовит их pre_save,
+    кроме pub_date, а пачки вставляются с raw=True, как при loaddata,
+    поэтому auto_now_add не срабатывает. Метаданные поля не меняются:
+    save() в других потоках по-прежнему ставит текущую дату. Сигналы,
+    как и у bulk_create, не отправляются.
+    """
+    fields = [
+        field for field in Post._meta.concrete_fields
+        if not isinstance(field, AutoField)
+    ]
+    for post in posts:
+        for field in fields:
+            if field.name != 'pub_date':
+                setattr(post, field.attname, field.pre_save(post, add=True))
+        post._state.adding = False
+        post._state.db = using
+    batch_size = max(connections[using].ops.bulk_batch_size(fields, posts), 1)
+    with transaction.atomic(using=using, savepoint=False):
+        for start in range(0, len(posts), batch_size):
+            Post._base_manager._insert(
+                posts[start:start + batch_size], fields=fields, raw=True,
+                using=using,
+            )
+    return posts
+
+
+def last_post_pk():
+    """Id последнего поста: посты загрузки — те, у кого id больше."""
+    return Post.objects.order_by('-pk').values_list(
+        'pk', flat=True
+    ).first() or 0
+
+
+def refresh_derived_data(after_pk, batch_size=1000):
+    """
+    Обновляет то, что обычно поддерживают сигналы Post и что обходит
+    bulk_create, только для постов с id больше ``after_pk``: счетчики их
+    авторов, групп и дней, окна их лент и лент подписок, поисковый индекс
+    и версии кэша лент. Id постов в SQLite только растут.
+    """
+    posts = Post.objects.order_by().filter(pk__gt=after_pk)
+    if not posts.exists():
+        return
+    author_ids = posts.values('author_id')
+    group_ids = posts.filter(group__isnull=False).values('group_id')
+    recount_posts(posts, batch_size=batch_size)
+    follower_ids = Follow.objects.filter(author_id__in=author_ids).exclude(
+        author__stats__follower_count__gt=settings.POSTS_FANOUT_MAX_FOLLOWERS
+    ).values_list('user_id', flat=True).distinct()
+    timeline.rebuild_feeds(
+        [timeline.INDEX_FEED]
+        + [
+            timeline.profile_feed(pk)
+            for pk in posts.values_list('author_id', flat=True).distinct()
+        ]
+        + [
+            timeline.group_feed(pk)
+            for pk in group_ids.values_list('group_id', flat=True).distinct()
+        ]
+        + [inbox_feed(pk) for pk in follower_ids]
+    )
+    if search.is_available():
+        with transaction.atomic(), connection.cursor() as cursor:
+            search.index_posts_after(cursor, after_pk)
+    cache.delete(feed_count_key('index'))
+    usernames = User.objects.filter(pk__in=author_ids).values_list(
+        'username', flat=True
+    )
+    slugs = Group.objects.filter(pk__in=group_ids).values_list(
+        'slug', flat=True
+    )
+    bump_feed_versions(
+        ['index']
+        + [f'profile:{username}' for username in usernames]
+        + [f'group:{slug}' for slug in slugs]
+    )
@@ -0,0 +1,200 @@
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, TruncDate
+
+from .models import AuthorStats, Follow, Group, Post, PostDayCount, User
+from .page_cache import bump_feed_versions
+
+
+def change_author_stats(author_id, field, delta):
+    # Разошедшийся счетчик не уходит ниже нуля, его чинит rebuild_counters
+    updated = AuthorStats.objects.filter(
+        author_id=author_id, **{f'{field}__gte': -delta}
+    ).update(**{field: F(field) + delta})
+    if not updated and delta > 0:
+        AuthorStats.objects.get_or_create(
+            author_id=author_id, defaults={field: delta}
+        )
+    # Счетчики пишет воркер уже после того, как запрос сменил версии лент:
+    # страница, собранная между ними, закэширована бы со старым числом
+    usernames = User.objects.filter(pk=author_id).values_list(
+        'username', flat=True
+    )
+    bump_feed_versions([f'profile:{username}' for username in usernames])
+
+
+def change_author_post_count(author_id, delta):
+    change_author_stats(author_id, 'post_count', delta)
+
+
+def change_follower_count(author_id, delta):
+    change_author_stats(author_id, 'follower_count', delta)
+
+
+def change_group_post_count(group_id, delta):
+    if group_id is not None:
+        Group.objects.filter(pk=group_id, post_count__gte=-delta).update(
+            post_count=F('post_count') + delta
+        )
+        # Число постов группы выводят страницы ее ленты
+        slugs = Group.objects.filter(pk=group_id).values_list(
+            'slug', flat=True
+        )
+        bump_feed_versions([f'group:{slug}' for slug in slugs])
+
+
+def change_day_post_count(day, delta):
+    updated = PostDayCount.objects.filter(
+        day=day, post_count__gte=-delta
+    ).update(post_count=F('post_count') + delta)
+    if not updated and delta > 0:
+        PostDayCount.objects.get_or_create(
+            day=day, defaults={'post_count': delta}
+        )
+
+
+def bulk_create_batched(model, objs, batch_size):
+    """
+    Записывает ``objs`` пачками по ``batch_size``: bulk_create сам
+    собирает весь ввод в список, а так в памяти только одна пачка.
+    """
+    objs = iter(objs)
+    while True:
+        batch = list(islice(objs, batch_size))
+        if not batch:
+            return
+        model.objects.bulk_create(batch, batch_size=batch_size)
+
+
+def day_counts(posts):
+    # TruncDate берет день в текущем часовом поясе, как и сигналы
+    return (
+        posts.order_by()
+        .annotate(day=TruncDate('pub_date'))
+        .values_list('day')
+        .annotate(count=Count('pk'))
+    )
+
+
+def author_counts(posts):
+    return (
+        posts.order_by()
+        .values_list('author_id')
+        .annotate(count=Count('pk'))
+    )
+
+
+def group_counts():
+    return (
+        Post.objects.order_by()
+        .filter(group=OuterRef('pk'))
+        .values('group')
+        .annotate(count=Count('pk'))
+        .values('count')
+    )
+
+
+def rebuild_post_counters(batch_size=1000):
+    """Пересчитывает все счетчики по таблицам постов и подписок."""
+    follower_counts = (
+        Follow.objects.order_by()
+        .filter(author=OuterRef('author'))
+        .values('author')
+        .annotate(count=Count('pk'))
+        .values('count')
+    )
+    with transaction.atomic():
+        AuthorStats.objects.all().delete()
+        bulk_create_batched(
+            AuthorStats,
+            (
+                AuthorStats(author_id=author_id, post_count=count)
+                for author_id, count in author_counts(
+                    Post.objects.all()
+                ).iterator(chunk_size=batch_size)
+            ),
+            batch_size,
+        )
+        # У авторов без постов тоже бывают подписчики. Id читаются до
+        # записи: запрос смотрит в AuthorStats, куда идет запись
+        bulk_create_batched(
+            AuthorStats,
+            (
+                AuthorStats(author_id=author_id)
+                for author_id in list(Follow.objects.exclude(
+                    author__stats__isnull=False
+                ).values_list('author_id', flat=True).distinct())
+            ),
+            batch_size,
+        )
+        AuthorStats.objects.update(
+            follower_count=Coalesce(Subquery(follower_counts), 0)
+        )
+        Group.objects.update(
+            post_count=Coalesce(Subquery(group_counts()), 0)
+        )
+        PostDayCount.objects.all().delete()
+        bulk_create_batched(
+            PostDayCount,
+            (
+                PostDayCount(day=day, post_count=count)
+                for day, count in day_counts(
+                    Post.objects.all()
+                ).iterator(chunk_size=batch_size)
+            ),
+            batch_size,
+        )
+
+
+def recount_posts(posts, batch_size=1000):
+    """
+    Пересчитывает число постов авторов, групп и дней, к которым относятся
+    посты ``posts``. Остальные счетчики не меняются.
+    """
+    author_ids = posts.order_by().values('author_id')
+    author_post_counts = (
+        Post.objects.order_by()
+        .filter(author=OuterRef('author'))
+        .values('author')
+        .annotate(count=Count('pk'))
+        .values('count')
+    )
+    days = (
+        posts.order_by()
+        .annotate(day=TruncDate('pub_date'))
+        .values('day')
+        .distinct()
+    )
+    with transaction.atomic():
+        AuthorStats.objects.filter(author_id__in=author_ids).update(
+            post_count=Coalesce(Subquery(author_post_counts), 0)
+        )
+        # Новые авторы читаются до записи: запрос смотрит в AuthorStats
+        new_authors = list(author_counts(
+            Post.objects.filter(author_id__in=author_ids)
+            .exclude(author__stats__isnull=False)
+        ))
+        bulk_create_batched(
+            AuthorStats,
+            (
+                AuthorStats(author_id=author_id, post_count=count)
+                for author_id, count in new_authors
+            ),
+            batch_size,
+        )
+        Group.objects.filter(
+            pk__in=posts.order_by().values('group_id')
+        ).update(post_count=Coalesce(Subquery(group_counts()), 0))
+        PostDayCount.objects.filter(day__in=days).delete()
+        bulk_create_batched(
+            PostDayCount,
+            (
+                PostDayCount(day=day, post_count=count)
+                for day, count in day_counts(
+                    Post.objects.filter(pub_date__date__in=days)
+                ).iterator(chunk_size=batch_size)
+            ),
+            batch_size,
+        )
@@ -0,0 +1,132 @@
+"""
+Лента подписок.
+
+Посты обычных авторов раскладываются по окнам ``follow:<id читателя>``
+(TimelineEntry) фоновой задачей после публикации. У авторов, на которых
+подписано больше POSTS_FANOUT_MAX_FOLLOWERS читателей, посты никуда не
+раскладываются, а читаются из таблицы постов при открытии ленты и
+сливаются с окном подписок. Когда после отписки автор перестает быть
+популярным, его последние посты, в том числе опубликованные без
+раскладки, добавляются в окна подписок всех его читателей.
+"""
+from itertools import islice
+
+from django.conf import settings
+
+from core.jobs import enqueue
+
+from . import timeline
+from .counters import change_follower_count
+from .models import AuthorStats, Follow, Post, TimelineEntry
+from .paginators import KeysetPaginator, MergedKeysetPaginator
+
+
+def inbox_feed(user_id):
+    return f'follow:{user_id}'
+
+
+def is_popular(author_id):
+    return AuthorStats.objects.filter(
+        author_id=author_id,
+        follower_count__gt=settings.POSTS_FANOUT_MAX_FOLLOWERS,
+    ).exists()
+
+
+def fan_out_post(post_id):
+    """Добавляет новый пост в окна подписок читателей автора."""
+    post = Post.objects.filter(pk=post_id).only('pub_date', 'author').first()
+    if post is None or is_popular(post.author_id):
+        return
+    follower_ids = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True).iterator()
+    while True:
+        batch = list(islice(follower_ids, settings.POSTS_FANOUT_BATCH_SIZE))
+        if not batch:
+            break
+        timeline.add_post(post, [inbox_feed(user_id) for user_id in batch])
+
+
+def backfill_inbox(user_id, author_id):
+    """Добавляет в окно подписок последние посты нового автора."""
+    if is_popular(author_id):
+        return
+    feed = inbox_feed(user_id)
+    posts = (
+        Post.objects.filter(author_id=author_id)
+        .order_by('-pub_date', '-pk')
+        .values_list('pk', 'pub_date')[:settings.POSTS_TIMELINE_WINDOW]
+    )
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(feed=feed, post_id=pk, pub_date=pub_date)
+            for pk, pub_date in posts
+        ],
+        ignore_conflicts=True,
+    )
+    timeline.trim([feed])
+
+
+def drop_from_inbox(user_id, author_id):
+    """Убирает из окна подписок посты автора после отписки."""
+    feed = inbox_feed(user_id)
+    removed, _ = TimelineEntry.objects.filter(
+        feed=feed, post__author_id=author_id
+    ).delete()
+    if removed:
+        timeline.refill(feed)
+
+
+def count_unfollow(author_id):
+    """
+    Уменьшает число подписчиков автора после отписки. Если автор только
+    что перестал быть популярным, его посты больше не читаются на лету,
+    поэтому они добавляются в окна подписок оставшихся читателей.
+    """
+    change_follower_count(author_id, -1)
+    follower_count = AuthorStats.objects.filter(
+        author_id=author_id
+    ).values_list('follower_count', flat=True).first()
+    # Отписки считаются по одной, порог переходит ровно одна из них
+    if follower_count != settings.POSTS_FANOUT_MAX_FOLLOWERS:
+        return
+    follower_ids = Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True)
+    for user_id in follower_ids.iterator():
+        enqueue(backfill_inbox, user_id, author_id)
+
+
+def refill_inboxes(author_id):
+    """Дополняет окна подписок читателей автора после удаления поста."""
+    if is_popular(author_id):
+        return
+    follower_ids = Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True)
+    for user_id in follower_ids.iterator():
+        timeline.refill(inbox_feed(user_id))
+
+
+def follow_paginator(user, per_page):
+    """Паджинатор ленты подписок: окно подписок и популярные авторы."""
+    feed = inbox_feed(user.pk)
+    paginators = [
+        KeysetPaginator(
+            timeline.feed_posts(feed).for_feed(), per_page, timeline=feed
+        )
+    ]
+    popular_ids = list(
+        Follow.objects.filter(
+            user=user,
+            author__stats__follower_count__gt=(
+                settings.POSTS_FANOUT_MAX_FOLLOWERS
+            ),
+        ).values_list('author_id', flat=True)
+    )
+    if popular_ids:
+        paginators.append(KeysetPaginator(
+            Post.objects.for_feed().filter(author_id__in=popular_ids),
+            per_page,
+        ))
+    return MergedKeysetPaginator(paginators, per_page)
@@ -15,3 +15,13 @@ class PostForm(forms.ModelForm):
             'text': 'Напишите текст (обязательно)',
             'group': 'Укажите группу (не обязательно)'
         }
+
+
+class PostImageForm(forms.ModelForm):
+    """Картинка поста, отдельной формой рядом с PostForm."""
+    class Meta:
+        model = Post
+        fields = ('image',)
+        help_texts = {
+            'image': 'Загрузите картинку (не обязательно)',
+        }
@@ -0,0 +1,122 @@
+"""
+Картинки постов.
+
+Файл сохраняется под именем из хэша содержимого, поэтому его адрес не
+меняется, пока не меняется картинка, и браузер может кэшировать его
+бессрочно. Миниатюры шириной POSTS_IMAGE_WIDTHS готовит фоновая задача
+``make_thumbnails`` сразу после загрузки, а не первая отрисовка ленты.
+Пока их нет, карточка показывает исходный файл.
+"""
+import hashlib
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+UPLOAD_DIR = 'posts'
+THUMBNAIL_DIR = 'posts/thumbs'
+# Форматы, которые могут быть прозрачными, уменьшаются в PNG
+TRANSPARENT_EXTENSIONS = ('.png', '.gif', '.webp')
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Хранилище для имен из хэша содержимого: файл с таким именем уже
+    содержит те же байты, поэтому повторная загрузка его переиспользует.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def _save(self, name, content):
+        if self.exists(name):
+            return name
+        return super()._save(name, content)
+
+
+storage = ContentAddressedStorage()
+
+
+def upload_to(instance, filename):
+    digest = hashlib.sha256()
+    for chunk in instance.image.chunks():
+        digest.update(chunk)
+    extension = os.path.splitext(filename)[1].lower()
+    return f'{UPLOAD_DIR}/{digest.hexdigest()[:32]}{extension}'
+
+
+def thumbnail_format(name):
+    if os.path.splitext(name)[1].lower() in TRANSPARENT_EXTENSIONS:
+        return 'PNG', '.png'
+    return 'JPEG', '.jpg'
+
+
+def thumbnail_name(name, width):
+    base = os.path.splitext(os.path.basename(name))[0]
+    return f'{THUMBNAIL_DIR}/{base}-{width}{thumbnail_format(name)[1]}'
+
+
+def srcset(post):
+    """Значение srcset из готовых миниатюр и исходного файла."""
+    candidates = []
+    for width in map(int, post.image_widths.split(',')):
+        if width < post.image_width:
+            url = storage.url(thumbnail_name(post.image.name, width))
+        else:
+            url = post.image.url
+        candidates.append(f'{url} {width}w')
+    return ', '.join(candidates)
+
+
+def save_thumbnail(image, name, width):
+    if storage.exists(thumbnail_name(name, width)):
+        # Имя зависит только от содержимого: миниатюра уже готова
+        return
+    thumbnail = image.copy()
+    thumbnail.thumbnail((width, image.height))
+    image_format = thumbnail_format(name)[0]
+    if image_format == 'JPEG' and thumbnail.mode != 'RGB':
+        thumbnail = thumbnail.convert('RGB')
+    buffer = BytesIO()
+    thumbnail.save(
+        buffer, image_format,
+        quality=settings.POSTS_IMAGE_QUALITY, optimize=True, progressive=True,
+    )
+    storage.save(thumbnail_name(name, width), ContentFile(buffer.getvalue()))
+
+
+def make_thumbnails(post_id, name):
+    """
+    Готовит миниатюры картинки поста и записывает их ширины в
+    ``image_widths``. Если картинку успели заменить, задача ничего не
+    делает: для новой картинки поставлена своя.
+    """
+    # Pillow нужен только воркеру, воркеры сайта его не импортируют
+    from PIL import Image, ImageOps
+
+    from .models import Post
+
+    post = Post.objects.filter(pk=post_id, image=name).first()
+    if post is None:
+        return
+    with post.image.open('rb'):
+        image = Image.open(post.image)
+        image.load()
+    # Браузер поворачивает фото по EXIF, миниатюры должны совпадать
+    image = ImageOps.exif_transpose(image)
+    widths = []
+    for width in sorted(settings.POSTS_IMAGE_WIDTHS):
+        if width >= image.width:
+            break
+        save_thumbnail(image, name, width)
+        widths.append(width)
+    widths.append(image.width)
+    post.image_width, post.image_height = image.size
+    post.image_widths = ','.join(map(str, widths))
+    post.save(update_fields=[
+        'image_width', 'image_height', 'image_widths', 'updated',
+    ])
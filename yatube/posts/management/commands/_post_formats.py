@@ -0,0 +1,44 @@
+"""Форматы файлов для import_posts и export_posts."""
+import csv
+import json
+
+FIELDS = ('text', 'pub_date', 'author', 'group')
+FORMATS = ('ndjson', 'csv')
+
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    return 'csv' if path.lower().endswith('.csv') else 'ndjson'
+
+
+def read_records(stream, fmt):
+    """Словари с полями FIELDS, по одному на строку файла."""
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def plain(value):
+    # isoformat, а не DjangoJSONEncoder: тот обрезает микросекунды
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def write_records(stream, fmt, rows):
+    """Пишет кортежи значений FIELDS и возвращает их число."""
+    count = 0
+    if fmt == 'csv':
+        writer = csv.writer(stream)
+        writer.writerow(FIELDS)
+        for row in rows:
+            writer.writerow(plain(value) for value in row)
+            count += 1
+        return count
+    for row in rows:
+        record = dict(zip(FIELDS, map(plain, row)))
+        stream.write(json.dumps(record, ensure_ascii=False) + '\n')
+        count += 1
+    return count
@@ -0,0 +1,61 @@
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+DUMMY_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет время отрисовки первой страницы главной ленты без кэша '
+        'карточек постов, с пустым и с заполненным кэшем.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rounds',
+            type=int,
+            default=200,
+            help='Сколько раз отрисовать страницу в каждом режиме.',
+        )
+
+    def handle(self, *args, **options):
+        posts = list(Post.objects.for_feed()[:10])
+        if not posts:
+            raise CommandError('В базе нет постов, сначала заполните ее.')
+        request = RequestFactory().get(reverse('posts:index'))
+        request.user = AnonymousUser()
+        context = {'page_obj': posts, 'title': 'bench'}
+        rounds = options['rounds']
+
+        def render():
+            render_to_string('posts/index.html', context, request)
+
+        with override_settings(CACHES=DUMMY_CACHE):
+            self.report('без кэша', self.measure(render, rounds))
+        self.report('пустой кэш', self.measure(render, rounds, cache.clear))
+        self.report('заполненный кэш', self.measure(render, rounds))
+
+    def measure(self, render, rounds, before_round=None):
+        render()
+        total = 0
+        for _ in range(rounds):
+            if before_round is not None:
+                before_round()
+            started = time.perf_counter()
+            render()
+            total += time.perf_counter() - started
+        return total / rounds * 1000
+
+    def report(self, mode, ms):
+        self.stdout.write(f'{mode:>16}: {ms:.3f} мс на страницу')
@@ -0,0 +1,79 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from posts.models import Post
+from posts.paginators import KeysetPaginator
+from posts.timeline import INDEX_FEED, group_feed, profile_feed
+
+# Признаки того, что лента читается не по индексу
+FULL_SCAN_MARKERS = ('USE TEMP B-TREE', 'SCAN posts_post')
+
+
+class Command(BaseCommand):
+    help = (
+        'Выводит EXPLAIN QUERY PLAN для запросов лент index, profile и '
+        'group_posts, в том числе по окнам лент. С --check завершается '
+        'с ошибкой, если лента сортирует таблицу или читает ее целиком.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Завершиться с ошибкой при полном просмотре таблицы.',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Команда поддерживает только SQLite.')
+        cursor = (timezone.now(), 0)
+        feeds = {
+            'index': (Post.objects.for_feed(), INDEX_FEED),
+            'profile': (
+                Post.objects.for_feed().filter(author_id=0), profile_feed(0)
+            ),
+            'group_posts': (
+                Post.objects.for_feed().filter(group_id=0), group_feed(0)
+            ),
+        }
+        pages = {
+            'первая': {},
+            'after': {'after': cursor},
+            'before': {'before': cursor},
+        }
+        failed = []
+        for feed, (queryset, timeline) in feeds.items():
+            paginator = KeysetPaginator(queryset, 10, timeline=timeline)
+            queries = {
+                page: paginator.keyset_queryset(**kwargs)
+                for page, kwargs in pages.items()
+            }
+            queries['первая по окну'] = paginator.timeline_queryset()
+            queries['after по окну'] = paginator.timeline_queryset(cursor)
+            for page, queryset in queries.items():
+                plan = self.explain(queryset)
+                self.stdout.write(f'{feed} ({page} страница):')
+                for detail in plan:
+                    self.stdout.write(f'    {detail}')
+                if any(self.is_full_scan(detail) for detail in plan):
+                    failed.append(f'{feed} ({page})')
+        if failed and options['check']:
+            raise CommandError(
+                'Ленты без индекса: ' + ', '.join(failed)
+            )
+        if not failed:
+            self.stdout.write(self.style.SUCCESS(
+                'Все ленты читаются по индексу.'
+            ))
+
+    def explain(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def is_full_scan(self, detail):
+        if 'USING INDEX' in detail or 'USING COVERING INDEX' in detail:
+            return False
+        return any(marker in detail for marker in FULL_SCAN_MARKERS)
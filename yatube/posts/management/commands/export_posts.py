@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+
+from ._post_formats import FORMATS, detect_format, write_records
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает посты в NDJSON или CSV. Посты читаются из базы пачками '
+        'через iterator(), поэтому память не растет вместе с таблицей.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default='-',
+            help='Файл для выгрузки, по умолчанию стандартный вывод.',
+        )
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Сколько постов читать из базы за один раз.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = detect_format(path, options['format'])
+        rows = (
+            Post.objects.order_by('pk')
+            .values_list('text', 'pub_date', 'author__username', 'group__slug')
+            .iterator(chunk_size=options['chunk_size'])
+        )
+        started = time.perf_counter()
+        if path == '-':
+            count = write_records(self.stdout, fmt, rows)
+        else:
+            with open(path, 'w', encoding='utf-8', newline='') as stream:
+                count = write_records(stream, fmt, rows)
+        elapsed = time.perf_counter() - started
+        self.stderr.write(
+            f'Выгружено постов: {count} за {elapsed:.1f} с '
+            f'({count / elapsed if elapsed else 0:.0f} строк/с).'
+        )
@@ -0,0 +1,150 @@
+import sys
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts.bulk import (bulk_create_posts, last_post_pk,
+                        refresh_derived_data)
+from posts.models import Group, Post, User
+
+from ._post_formats import FORMATS, detect_format, read_records
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает посты из NDJSON или CSV с полями text, author, group и '
+        'pub_date. Посты пишутся через bulk_create пачками, каждая пачка '
+        'в своей транзакции; затем для загруженных постов обновляются '
+        'счетчики, окна лент и поисковый индекс.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='Файл для загрузки, «-» — стандартный ввод.'
+        )
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько постов записывать в одной транзакции.',
+        )
+        parser.add_argument(
+            '--create-authors',
+            action='store_true',
+            help='Создавать неизвестных авторов без пароля.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = detect_format(path, options['format'])
+        self.batch_size = options['batch_size']
+        self.create_authors = options['create_authors']
+        # Кэш поиска: username -> id и slug -> id, None для неизвестных
+        self.authors = {}
+        self.groups = {}
+        self.imported = self.skipped = 0
+        self.started = time.perf_counter()
+        after_pk = last_post_pk()
+        if path == '-':
+            self.import_stream(sys.stdin, fmt)
+        else:
+            with open(path, encoding='utf-8', newline='') as stream:
+                self.import_stream(stream, fmt)
+        self.stderr.write('')
+        refresh_derived_data(after_pk, batch_size=self.batch_size)
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено постов: {self.imported}, пропущено: {self.skipped}, '
+            f'{self.rate():.0f} строк/с.'
+        ))
+
+    def import_stream(self, stream, fmt):
+        batch = []
+        for record in read_records(stream, fmt):
+            batch.append(record)
+            if len(batch) >= self.batch_size:
+                self.import_batch(batch)
+                batch = []
+        if batch:
+            self.import_batch(batch)
+
+    def import_batch(self, records):
+        self.resolve(
+            self.authors, {record.get('author') for record in records},
+            self.load_authors,
+        )
+        self.resolve(
+            self.groups, {record.get('group') for record in records},
+            self.load_groups,
+        )
+        posts = []
+        for record in records:
+            post = self.build_post(record)
+            if post is None:
+                self.skipped += 1
+            else:
+                posts.append(post)
+        with transaction.atomic():
+            bulk_create_posts(posts)
+        self.imported += len(posts)
+        self.stderr.write(
+            f'{self.imported} постов, {self.rate():.0f} строк/с', ending='\r'
+        )
+
+    def build_post(self, record):
+        text = record.get('text')
+        author_id = self.authors.get(record.get('author'))
+        group_slug = record.get('group') or None
+        group_id = self.groups.get(group_slug)
+        if not text or author_id is None:
+            return None
+        if group_slug and group_id is None:
+            return None
+        pub_date = record.get('pub_date')
+        if pub_date:
+            pub_date = parse_datetime(pub_date)
+            if pub_date is None:
+                return None
+        return Post(
+            text=text,
+            author_id=author_id,
+            group_id=group_id,
+            pub_date=pub_date or timezone.now(),
+        )
+
+    def resolve(self, lookup, keys, load):
+        missing = {key for key in keys if key and key not in lookup}
+        if missing:
+            found = load(missing)
+            lookup.update(found)
+            lookup.update(dict.fromkeys(missing - found.keys()))
+
+    def load_authors(self, usernames):
+        authors = dict(
+            User.objects.filter(username__in=usernames)
+            .values_list('username', 'id')
+        )
+        new = usernames - authors.keys()
+        if new and self.create_authors:
+            User.objects.bulk_create(
+                User(username=username, password=make_password(None))
+                for username in new
+            )
+            authors.update(
+                User.objects.filter(username__in=new)
+                .values_list('username', 'id')
+            )
+        return authors
+
+    def load_groups(self, slugs):
+        return dict(
+            Group.objects.filter(slug__in=slugs).values_list('slug', 'id')
+        )
+
+    def rate(self):
+        elapsed = time.perf_counter() - self.started
+        return self.imported / elapsed if elapsed else 0
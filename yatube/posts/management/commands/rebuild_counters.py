@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import rebuild_post_counters
+from posts.models import AuthorStats, Group
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает счетчики постов авторов и групп по таблице постов. '
+        'Нужна после массовых изменений в обход Post.save().'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help=(
+                'Сколько счетчиков авторов и дней читать и записывать '
+                'за раз.'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        rebuild_post_counters(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитаны счетчики: авторов {AuthorStats.objects.count()}, '
+            f'групп {Group.objects.count()}.'
+        ))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from posts import search
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересобирает полнотекстовый индекс постов с токенизатором '
+        'из POSTS_SEARCH_TOKENIZER.'
+    )
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            raise CommandError('Полнотекстовый индекс есть только в SQLite.')
+        with transaction.atomic(), connection.cursor() as cursor:
+            search.rebuild_index(cursor)
+        self.stdout.write(self.style.SUCCESS(
+            f'В индексе {Post.objects.count()} постов.'
+        ))
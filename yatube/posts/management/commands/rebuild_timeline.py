@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import TimelineEntry
+from posts.timeline import rebuild_timeline
+
+
+class Command(BaseCommand):
+    help = (
+        'Заново заполняет окна последних постов лент (posts.timeline). '
+        'Нужна после массовых изменений в обход Post.save().'
+    )
+
+    def handle(self, *args, **options):
+        rebuild_timeline()
+        self.stdout.write(self.style.SUCCESS(
+            f'В окнах лент {TimelineEntry.objects.count()} записей.'
+        ))
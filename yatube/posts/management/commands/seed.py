@@ -0,0 +1,162 @@
+import random
+import time
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from faker import Faker
+
+from posts.bulk import (bulk_create_posts, last_post_pk,
+                        refresh_derived_data)
+from posts.models import Group, Post, User
+
+TEXT_POOL_SIZE = 500
+
+
+def zipf_weights(count, skew):
+    """Накопленные веса, с которыми первые элементы выбираются чаще."""
+    return list(accumulate(1 / rank ** skew for rank in range(1, count + 1)))
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу пользователями, группами и постами для нагрузочных '
+        'тестов. Авторы и группы выбираются по закону Ципфа: несколько '
+        'авторов пишут большую часть постов, как на живом сайте.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=365,
+            help='За сколько дней до текущего момента раскидать посты.',
+        )
+        parser.add_argument(
+            '--skew',
+            type=float,
+            default=1.1,
+            help='Показатель распределения Ципфа для авторов и групп.',
+        )
+        parser.add_argument(
+            '--no-group-share',
+            type=float,
+            default=0.3,
+            help='Доля постов без группы.',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--seed', type=int, help='Зерно генератора для повторяемости.'
+        )
+
+    def handle(self, *args, **options):
+        if options['posts'] > 0 and options['users'] < 1:
+            raise CommandError('Для постов нужен хотя бы один автор: --users.')
+        for name in ('users', 'groups', 'posts', 'days'):
+            if options[name] < 0:
+                raise CommandError(f'--{name} не может быть отрицательным.')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше нуля.')
+        self.random = random.Random(options['seed'])
+        self.fake = Faker('ru_RU')
+        if options['seed'] is not None:
+            self.fake.seed_instance(options['seed'])
+        self.batch_size = options['batch_size']
+        started = time.perf_counter()
+        after_pk = last_post_pk()
+
+        usernames = self.create_users(options['users'])
+        slugs = self.create_groups(options['groups'])
+        author_ids = list(
+            User.objects.filter(username__in=usernames)
+            .values_list('id', flat=True)
+        )
+        group_ids = list(
+            Group.objects.filter(slug__in=slugs).values_list('id', flat=True)
+        )
+        self.create_posts(options, author_ids, group_ids)
+
+        self.stdout.write('Пересчет счетчиков и поискового индекса...')
+        refresh_derived_data(after_pk, batch_size=self.batch_size)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано пользователей: {len(usernames)}, групп: {len(slugs)}, '
+            f'постов: {options["posts"]} за {elapsed:.1f} с.'
+        ))
+
+    def create_users(self, count):
+        prefix = int(time.time())
+        password = make_password(None)
+        users = [
+            User(
+                username=f'{self.fake.user_name()}-{prefix}-{i}',
+                first_name=self.fake.first_name(),
+                last_name=self.fake.last_name(),
+                password=password,
+            )
+            for i in range(count)
+        ]
+        User.objects.bulk_create(users)
+        return [user.username for user in users]
+
+    def create_groups(self, count):
+        prefix = int(time.time())
+        groups = [
+            Group(
+                title=self.fake.sentence(nb_words=3)[:200],
+                slug=f'group-{prefix}-{i}',
+                description=self.fake.text(max_nb_chars=200),
+            )
+            for i in range(count)
+        ]
+        Group.objects.bulk_create(groups)
+        return [group.slug for group in groups]
+
+    def create_posts(self, options, author_ids, group_ids):
+        texts = [
+            self.fake.text(max_nb_chars=400) for _ in range(TEXT_POOL_SIZE)
+        ]
+        author_weights = zipf_weights(len(author_ids), options['skew'])
+        group_weights = zipf_weights(len(group_ids), options['skew'])
+        period = timedelta(days=options['days']).total_seconds()
+        now = timezone.now()
+        total, created = options['posts'], 0
+        started = time.perf_counter()
+        while created < total:
+            size = min(self.batch_size, total - created)
+            authors = self.random.choices(
+                author_ids, cum_weights=author_weights, k=size
+            )
+            groups = self.random.choices(
+                group_ids, cum_weights=group_weights, k=size
+            ) if group_ids else [None] * size
+            posts = [
+                Post(
+                    text=self.random.choice(texts),
+                    author_id=author_id,
+                    group_id=(
+                        None
+                        if self.random.random() < options['no_group_share']
+                        else group_id
+                    ),
+                    pub_date=now - timedelta(
+                        seconds=self.random.uniform(0, period)
+                    ),
+                )
+                for author_id, group_id in zip(authors, groups)
+            ]
+            with transaction.atomic():
+                bulk_create_posts(posts)
+            created += size
+            rate = created / (time.perf_counter() - started)
+            self.stderr.write(
+                f'{created}/{total} постов, {rate:.0f} строк/с',
+                ending='\r',
+            )
+        self.stderr.write('')
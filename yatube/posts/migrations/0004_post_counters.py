@@ -0,0 +1,57 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:24
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def fill_counters(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Group = apps.get_model('posts', 'Group')
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    author_counts = (
+        Post.objects.order_by()
+        .values_list('author_id')
+        .annotate(count=Count('pk'))
+    )
+    AuthorStats.objects.bulk_create(
+        (
+            AuthorStats(author_id=author_id, post_count=count)
+            for author_id, count in author_counts.iterator()
+        ),
+        batch_size=1000,
+    )
+    group_counts = (
+        Post.objects.order_by()
+        .filter(group=OuterRef('pk'))
+        .values('group')
+        .annotate(count=Count('pk'))
+        .values('count')
+    )
+    Group.objects.update(post_count=Coalesce(Subquery(group_counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0003_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('post_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='post_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:40
+
+from django.db import migrations
+
+# SQL на момент миграции: posts.search со временем меняется, а миграция
+# должна создавать ту же таблицу. Другой токенизатор из настроек
+# применяет manage.py rebuild_search_index
+CREATE_INDEX = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS posts_post_fts "
+    "USING fts5(text, tokenize='unicode61 remove_diacritics 2')"
+)
+FILL_INDEX = (
+    'INSERT INTO posts_post_fts (rowid, text) '
+    'SELECT id, text FROM posts_post'
+)
+DROP_INDEX = 'DROP TABLE IF EXISTS posts_post_fts'
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(DROP_INDEX)
+            cursor.execute(CREATE_INDEX)
+            cursor.execute(FILL_INDEX)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(DROP_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_post_updated'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
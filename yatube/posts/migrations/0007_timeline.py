@@ -0,0 +1,51 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:46
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_timeline(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+    posts = Post.objects.order_by('-pub_date', '-pk')
+    feeds = [('index', posts)]
+    for author_id in posts.values_list('author_id', flat=True).distinct():
+        feeds.append((f'profile:{author_id}', posts.filter(author_id=author_id)))
+    for group_id in posts.filter(group__isnull=False).values_list(
+            'group_id', flat=True).distinct():
+        feeds.append((f'group:{group_id}', posts.filter(group_id=group_id)))
+    for feed, queryset in feeds:
+        window = queryset.values_list('pk', 'pub_date')
+        TimelineEntry.objects.bulk_create(
+            TimelineEntry(feed=feed, post_id=pk, pub_date=pub_date)
+            for pk, pub_date in window[:settings.POSTS_TIMELINE_WINDOW]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_post_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('feed', models.CharField(max_length=50)),
+                ('pub_date', models.DateTimeField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='posts.Post')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['feed', 'pub_date', 'post'], name='timeline_feed_pub_date_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='timelineentry',
+            unique_together={('feed', 'post')},
+        ),
+        migrations.RunPython(fill_timeline, migrations.RunPython.noop),
+    ]
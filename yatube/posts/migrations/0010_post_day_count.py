@@ -0,0 +1,41 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:15
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def fill_day_counts(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    PostDayCount = apps.get_model('posts', 'PostDayCount')
+    day_counts = (
+        Post.objects.order_by()
+        .annotate(day=TruncDate('pub_date'))
+        .values_list('day')
+        .annotate(count=Count('pk'))
+    )
+    PostDayCount.objects.bulk_create(
+        PostDayCount(day=day, post_count=count)
+        for day, count in day_counts.iterator()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_post_image'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostDayCount',
+            fields=[
+                ('day', models.DateField(primary_key=True, serialize=False)),
+                ('post_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['day'],
+            },
+        ),
+        migrations.RunPython(fill_day_counts, migrations.RunPython.noop),
+    ]
@@ -1,16 +1,50 @@
-from django.db import models
+from django.db import models, transaction
 
 from django.contrib.auth import get_user_model
 
+from . import images, search
+
 User = get_user_model()
 
 
+class PostQuerySet(models.QuerySet):
+    FEED_FIELDS = (
+        'text', 'pub_date', 'updated',
+        'author__username', 'author__first_name', 'author__last_name',
+        'group__slug', 'group__title',
+        'image', 'image_width', 'image_height', 'image_widths',
+    )
+
+    def for_feed(self):
+        """Посты вместе с автором и группой, которые выводит карточка."""
+        return self.select_related('author', 'group').only(*self.FEED_FIELDS)
+
+    def search(self, query):
+        """Посты по полнотекстовому запросу, сначала самые релевантные."""
+        match = search.match_expression(query)
+        if not match:
+            return self.none()
+        if not search.is_available():
+            return self.filter(text__icontains=query)
+        return self.extra(
+            tables=[search.FTS_TABLE],
+            where=[
+                f'{search.FTS_TABLE}.rowid = posts_post.id',
+                f'{search.FTS_TABLE} MATCH %s',
+            ],
+            params=[match],
+            select={'rank': f'{search.FTS_TABLE}.rank'},
+            order_by=['rank'],
+        )
+
+
 class Post(models.Model):
     text = models.TextField(
         help_text="Заполнение данного поля является обязательным",
         verbose_name="Текст поста",
     )
     pub_date = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -23,19 +57,137 @@ class Post(models.Model):
         help_text="Выбрать группу (не обязательно)",
         verbose_name="Группа"
     )
+    image = models.ImageField(
+        'Картинка',
+        upload_to=images.upload_to,
+        storage=images.storage,
+        blank=True,
+        width_field='image_width',
+        height_field='image_height',
+    )
+    image_width = models.PositiveIntegerField(null=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, editable=False)
+    # Ширины для srcset через запятую, пусто, пока миниатюры не готовы
+    image_widths = models.CharField(max_length=50, blank=True, editable=False)
+
+    objects = PostQuerySet.as_manager()
 
     def __str__(self):
         return self.text[:15]
 
+    def image_srcset(self):
+        return images.srcset(self)
+
+    def save(self, *args, **kwargs):
+        # Задачи сигналов ставятся в очередь в той же транзакции
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     class Meta:
         ordering = ['-pub_date']
         default_related_name = 'posts'
+        # Индексы под ленты index, profile и group_posts: сортировка
+        # по (pub_date, id) читается из индекса без сортировки таблицы
+        indexes = [
+            models.Index(
+                fields=['pub_date', 'id'],
+                name='post_pub_date_idx',
+            ),
+            models.Index(
+                fields=['author', 'pub_date', 'id'],
+                name='post_author_pub_date_idx',
+            ),
+            models.Index(
+                fields=['group', 'pub_date', 'id'],
+                name='post_group_pub_date_idx',
+            ),
+        ]
 
 
 class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(max_length=50, null=False, unique=True)
     description = models.TextField()
+    post_count = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.title
+
+
+class AuthorStats(models.Model):
+    """Число постов автора, которое не пересчитывается на каждый запрос."""
+    author = models.OneToOneField(
+        User,
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name='stats',
+    )
+    post_count = models.PositiveIntegerField(default=0)
+    follower_count = models.PositiveIntegerField(default=0)
+
+    @classmethod
+    def post_count_for(cls, author):
+        stats = cls.objects.filter(author=author).only('post_count').first()
+        return stats.post_count if stats else 0
+
+
+class PostDayCount(models.Model):
+    """
+    Число постов за день по TIME_ZONE: навигация по датам и число постов
+    в списке постов админки читаются отсюда, а не из таблицы постов.
+    """
+    day = models.DateField(primary_key=True)
+    post_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['day']
+
+    @classmethod
+    def total(cls, **filters):
+        total = cls.objects.filter(**filters).aggregate(
+            total=models.Sum('post_count')
+        )['total']
+        return total or 0
+
+
+class Follow(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follower',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='following',
+    )
+
+    class Meta:
+        unique_together = ['user', 'author']
+
+    def __str__(self):
+        return f'{self.user} подписан на {self.author}'
+
+
+class TimelineEntry(models.Model):
+    """
+    Пост из окна последних POSTS_TIMELINE_WINDOW постов ленты. Лента —
+    ключ вида ``index``, ``profile:<id автора>``, ``group:<id группы>``
+    или ``follow:<id читателя>`` (лента подписок, см. posts.follow).
+    """
+    feed = models.CharField(max_length=50)
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        unique_together = ['feed', 'post']
+        indexes = [
+            models.Index(
+                fields=['feed', 'pub_date', 'post'],
+                name='timeline_feed_pub_date_idx',
+            ),
+        ]
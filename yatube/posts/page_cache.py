@@ -0,0 +1,220 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.http import HttpResponse
+
+from core import compression, metrics
+from core.routers import read_from_replica
+
+from .models import Post
+
+FEED_VERSION_KEY = 'posts:feed-version:{}'
+PAGE_KEY = 'posts:page:{}:{}:{}'
+# ETag страниц, прочитанных с реплики: он не совпадает ни с одним
+# ETag ленты, и такая страница никогда не подтверждается ответом 304
+REPLICA_ETAG = '"replica"'
+
+
+def feed_version(feed):
+    """Текущая версия ленты, версия меняется при каждом изменении поста."""
+    key = FEED_VERSION_KEY.format(feed)
+    version = cache.get(key)
+    if version is None:
+        # Версия от времени не совпадет с версиями вытесненного ключа
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_feed_versions(feeds):
+    for feed in feeds:
+        try:
+            cache.incr(FEED_VERSION_KEY.format(feed))
+        except ValueError:
+            feed_version(feed)
+
+
+def following_feed(user_id):
+    """
+    Версия с этим именем меняется, когда пользователь подписывается или
+    отписывается: от подписок зависят кнопки на страницах профилей.
+    """
+    return f'following:{user_id}'
+
+
+def author_card(author_id):
+    """Версия с этим именем меняется, когда автор меняет имя."""
+    return f'author-card:{author_id}'
+
+
+def group_card(group_id):
+    """Версия с этим именем меняется при изменении группы."""
+    return f'group-card:{group_id}'
+
+
+def card_version(post):
+    """
+    Версии автора и группы поста одной строкой: карточка выводит имя
+    автора и название группы, которые меняются без изменения поста.
+    """
+    feeds = [author_card(post.author_id)]
+    if post.group_id is not None:
+        feeds.append(group_card(post.group_id))
+    keys = [FEED_VERSION_KEY.format(feed) for feed in feeds]
+    versions = cache.get_many(keys)
+    return '.'.join(
+        str(versions[key] if key in versions else feed_version(feed))
+        for feed, key in zip(feeds, keys)
+    )
+
+
+def feed_etag(feed_template):
+    """
+    ETag страницы ленты для ``condition``: версия ленты, адрес страницы
+    с курсором и пользователь, для которого отрисована шапка. Для
+    вошедшего пользователя в него входят версия его подписок и секрет
+    CSRF: после подписки или нового входа старая страница с прежней
+    кнопкой и токеном формы не отдается ответом 304. Считается по кэшу
+    без запросов к базе.
+    """
+    def etag(request, *args, **kwargs):
+        feed = feed_template.format(**kwargs)
+        value = (
+            f'{feed}:{feed_version(feed)}:{request.user.pk}:'
+            f'{request.get_full_path()}'
+        )
+        if request.user.is_authenticated:
+            following = following_feed(request.user.pk)
+            value += (
+                f':{feed_version(following)}:'
+                f'{request.META.get("CSRF_COOKIE", "")}'
+            )
+        return hashlib.md5(value.encode()).hexdigest()
+    return etag
+
+
+def post_version(request, post_id):
+    """
+    Время изменения поста и число постов автора одним запросом.
+    Результат запоминается в запросе для ``post_etag``,
+    ``post_last_modified`` и самого ``post_detail``.
+    """
+    if not hasattr(request, '_post_version'):
+        request._post_version = (
+            Post.objects.filter(pk=post_id).order_by()
+            .values_list('updated', 'author__stats__post_count')
+            .first()
+        )
+    return request._post_version
+
+
+def post_etag(request, post_id):
+    version = post_version(request, post_id)
+    if version is not None:
+        updated, post_count = version
+        value = (
+            f'{post_id}:{updated.isoformat()}:{post_count}:'
+            f'{request.user.pk}'
+        )
+        return hashlib.md5(value.encode()).hexdigest()
+
+
+def post_last_modified(request, post_id):
+    version = post_version(request, post_id)
+    if version is not None:
+        return version[0]
+
+
+def post_card_key(post):
+    """Ключ фрагмента карточки поста из includes/post.html."""
+    return make_template_fragment_key(
+        'post_card',
+        [post.pk, post.updated.isoformat(), card_version(post)],
+    )
+
+
+def mark_replica(response, replica):
+    if replica:
+        response['ETag'] = REPLICA_ETAG
+    return response
+
+
+def cache_feed_page(feed_template):
+    """
+    Кэширует страницы ленты для анонимных пользователей.
+
+    Ключ страницы состоит из имени ленты, ее версии и полного адреса
+    запроса с курсором или номером страницы, поэтому после изменения
+    поста в ленте старые страницы просто перестают читаться.
+    ``feed_template`` форматируется аргументами представления, например
+    ``'group:{slug}'``. Страница хранится минифицированной, а рядом с
+    ней — сжатые копии для принятых клиентами кодировок, так что при
+    попадании в кэш ответ не сжимается заново.
+
+    ETag ленты считается по текущей версии, а страница с реплики может
+    отставать от нее, поэтому такие страницы получают REPLICA_ETAG:
+    иначе клиент получал бы 304 на устаревшую страницу до следующей
+    смены версии. ``condition`` не заменяет уже заданный ETag.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (not settings.POSTS_PAGE_CACHE
+                    or request.method not in ('GET', 'HEAD')
+                    or request.user.is_authenticated):
+                return mark_replica(
+                    view(request, *args, **kwargs), read_from_replica()
+                )
+            feed = feed_template.format(**kwargs)
+            path = hashlib.md5(
+                request.get_full_path().encode()
+            ).hexdigest()
+            key = PAGE_KEY.format(feed, feed_version(feed), path)
+            encoding = compression.choose_encoding(request)
+            encoded_key = f'{key}:{encoding}'
+            cached = cache.get_many([key, encoded_key])
+            metrics.inc(
+                'yatube_cache_requests_total', cache='feed_page',
+                result='hit' if key in cached else 'miss',
+            )
+            if encoded_key in cached:
+                content, content_type, used, replica = cached[encoded_key]
+                response = HttpResponse(content_type=content_type)
+                return mark_replica(
+                    compression.set_content(response, content, used), replica
+                )
+            if key in cached:
+                content, content_type, timeout, replica = cached[key]
+                response = HttpResponse(content_type=content_type)
+            else:
+                response = view(request, *args, **kwargs)
+                replica = read_from_replica()
+                if not compression.is_html(response):
+                    return mark_replica(response, replica)
+                content = compression.minify_content(
+                    response.content, response.charset
+                )
+                content_type = response['Content-Type']
+                timeout = settings.POSTS_PAGE_CACHE_TIMEOUT
+                if replica:
+                    # Реплика могла еще не получить пост, из-за которого
+                    # сменилась версия ленты
+                    timeout = min(timeout, settings.DATABASE_REPLICA_MAX_LAG)
+                cache.set(
+                    key, (content, content_type, timeout, replica), timeout
+                )
+            content, used = compression.encode(content, encoding)
+            if encoding:
+                cache.set(
+                    encoded_key, (content, content_type, used, replica),
+                    timeout,
+                )
+            return mark_replica(
+                compression.set_content(response, content, used), replica
+            )
+        return wrapper
+    return decorator
@@ -0,0 +1,248 @@
+import hashlib
+import heapq
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db.models import F, Q
+from django.utils.dateparse import parse_datetime
+from django.utils.encoding import force_bytes, force_str
+from django.utils.functional import cached_property
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+from core import metrics
+
+from .models import PostDayCount
+
+FEED_COUNT_KEY = 'posts:feed-count:{}'
+ADMIN_COUNT_KEY = 'posts:admin-count:{}'
+
+
+def feed_count_key(feed):
+    """Ключ кэша с приблизительным числом постов ленты."""
+    return FEED_COUNT_KEY.format(feed)
+
+
+def encode_cursor(pub_date, pk):
+    value = f'{pub_date.isoformat()}|{pk}'
+    return urlsafe_base64_encode(force_bytes(value))
+
+
+def decode_cursor(cursor):
+    """Возвращает пару (pub_date, pk) или None для битого курсора."""
+    try:
+        pub_date, pk = force_str(urlsafe_base64_decode(cursor)).split('|')
+        pub_date, pk = parse_datetime(pub_date), int(pk)
+    except (TypeError, ValueError):
+        return None
+    if pub_date is not None:
+        return pub_date, pk
+
+
+class KeysetPage(Page):
+    """Страница ленты, выбранная по курсору (pub_date, id)."""
+
+    is_keyset = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        super().__init__(object_list, None, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return '<Keyset page>'
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    @cached_property
+    def next_cursor(self):
+        if self._has_next and self.object_list:
+            post = self.object_list[-1]
+            return encode_cursor(post.pub_date, post.pk)
+
+    @cached_property
+    def previous_cursor(self):
+        if self._has_previous and self.object_list:
+            post = self.object_list[0]
+            return encode_cursor(post.pub_date, post.pk)
+
+
+class KeysetPaginator(Paginator):
+    """
+    Паджинатор ленты постов по ключу (pub_date, id).
+
+    Страницы по курсорам ``after``/``before`` выбираются одним запросом
+    без COUNT и OFFSET, поэтому их стоимость не зависит от глубины.
+    Нумерованные страницы по-прежнему доступны через ``page()``, а число
+    постов берется из счетчика ``known_count`` или из кэша под ключом
+    ``count_key``. Если задано окно ленты ``timeline``, первые страницы
+    читаются по нему (см. posts.timeline).
+    """
+
+    def __init__(self, object_list, per_page, count_key=None,
+                 known_count=None, timeline=None, **kwargs):
+        super().__init__(
+            object_list.order_by('-pub_date', '-pk'), per_page, **kwargs
+        )
+        self.count_key = count_key
+        self.known_count = known_count
+        self.timeline = timeline
+
+    @cached_property
+    def count(self):
+        if self.known_count is not None:
+            return self.known_count
+        if self.count_key is None:
+            return self.object_list.count()
+        key = feed_count_key(self.count_key)
+        count = cache.get(key)
+        metrics.inc(
+            'yatube_cache_requests_total', cache='feed_count',
+            result='miss' if count is None else 'hit',
+        )
+        if count is None:
+            count = self.object_list.count()
+            cache.add(key, count, settings.POSTS_COUNT_CACHE_TIMEOUT)
+        return count
+
+    def keyset_queryset(self, after=None, before=None):
+        """
+        Запрос страницы с одним лишним постом для проверки соседней
+        страницы. Для ``before`` посты идут в обратном порядке.
+
+        Отдельное условие на ``pub_date`` позволяет базе начать чтение
+        индекса сразу с курсора, а не просматривать его с начала.
+        """
+        queryset = self.object_list
+        if after:
+            pub_date, pk = after
+            queryset = queryset.filter(pub_date__lte=pub_date).filter(
+                Q(pub_date__lt=pub_date) | Q(pk__lt=pk)
+            )
+        elif before:
+            pub_date, pk = before
+            queryset = queryset.filter(pub_date__gte=pub_date).filter(
+                Q(pub_date__gt=pub_date) | Q(pk__gt=pk)
+            ).order_by('pub_date', 'pk')
+        return queryset[:self.per_page + 1]
+
+    def timeline_queryset(self, after=None):
+        """Запрос страницы по окну ленты, порядок — по индексу окна."""
+        # Условия на окно задаются одним filter(), чтобы все они
+        # относились к одной и той же записи окна
+        condition = Q(timeline_entries__feed=self.timeline)
+        if after:
+            pub_date, pk = after
+            condition &= Q(timeline_entries__pub_date__lte=pub_date) & (
+                Q(timeline_entries__pub_date__lt=pub_date)
+                | Q(timeline_entries__post_id__lt=pk)
+            )
+        return self.object_list.filter(condition).order_by(
+            F('timeline_entries__pub_date').desc(),
+            F('timeline_entries__post_id').desc(),
+        )[:self.per_page + 1]
+
+    def get_timeline_posts(self, after):
+        """
+        Посты страницы из окна ленты или None, если страница выходит за
+        окно и ее нужно читать из таблицы постов.
+        """
+        posts = list(self.timeline_queryset(after))
+        if len(posts) > self.per_page:
+            return posts
+        # Короткая страница окна — конец ленты, только если окно вмещает
+        # ленту целиком. Для первой страницы это так: в окне всегда
+        # min(POSTS_TIMELINE_WINDOW, число постов) последних постов
+        if not after or self.count < settings.POSTS_TIMELINE_WINDOW:
+            return posts
+
+    def fetch(self, after=None, before=None):
+        """
+        До ``per_page + 1`` постов за курсором в порядке запроса: для
+        ``before`` — от старых к новым.
+        """
+        posts = None
+        if self.timeline is not None and not before:
+            posts = self.get_timeline_posts(after)
+        if posts is None:
+            posts = list(self.keyset_queryset(after, before))
+        return posts
+
+    def get_keyset_page(self, after=None, before=None):
+        """Страница постов старше ``after`` или новее ``before``."""
+        after = after and decode_cursor(after)
+        before = not after and before and decode_cursor(before)
+        posts = self.fetch(after, before)
+        has_more = len(posts) > self.per_page
+        posts = posts[:self.per_page]
+        if before:
+            return KeysetPage(posts[::-1], self, True, has_more)
+        return KeysetPage(posts, self, has_more, bool(after))
+
+
+class MergedKeysetPaginator(KeysetPaginator):
+    """
+    Курсорные страницы, слитые из нескольких лент. Каждая лента отдает
+    свои ``per_page + 1`` постов за курсором, из них берутся самые новые
+    (для ``before`` — самые старые).
+    """
+
+    def __init__(self, paginators, per_page):
+        Paginator.__init__(self, [], per_page)
+        self.paginators = paginators
+        self.timeline = None
+
+    @cached_property
+    def count(self):
+        return sum(paginator.count for paginator in self.paginators)
+
+    def fetch(self, after=None, before=None):
+        merged = heapq.merge(
+            *(paginator.fetch(after, before) for paginator in self.paginators),
+            key=lambda post: (post.pub_date, post.pk),
+            reverse=not before,
+        )
+        return list(islice(merged, self.per_page + 1))
+
+
+class ApproximateCountPaginator(Paginator):
+    """
+    Паджинатор списка постов в админке без COUNT(*) по всей таблице.
+
+    Если список отфильтрован только по дате, число постов берется из
+    PostDayCount по условиям ``day_filters``. Иначе посты считаются не
+    дальше POSTS_ADMIN_EXACT_COUNT_LIMIT, а число больше порога
+    считается целиком один раз и кэшируется на POSTS_COUNT_CACHE_TIMEOUT
+    секунд, поэтому на больших выборках оно приблизительное.
+    """
+
+    def __init__(self, object_list, per_page, day_filters=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.day_filters = day_filters
+
+    @cached_property
+    def count(self):
+        if self.day_filters is not None:
+            return PostDayCount.total(**self.day_filters)
+        queryset = self.object_list.order_by()
+        limit = settings.POSTS_ADMIN_EXACT_COUNT_LIMIT
+        count = queryset[:limit + 1].count()
+        if count <= limit:
+            return count
+        key = ADMIN_COUNT_KEY.format(
+            hashlib.md5(str(queryset.query).encode()).hexdigest()
+        )
+        count = cache.get(key)
+        metrics.inc(
+            'yatube_cache_requests_total', cache='admin_count',
+            result='miss' if count is None else 'hit',
+        )
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, settings.POSTS_COUNT_CACHE_TIMEOUT)
+        return count
@@ -0,0 +1,104 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+
+from core.jobs import batched
+
+FTS_TABLE = 'posts_post_fts'
+
+WORD_RE = re.compile(r'\w+')
+CYRILLIC_RE = re.compile(r'[а-яё]')
+# Окончания русских слов, самые длинные проверяются первыми
+RUSSIAN_ENDINGS = sorted(
+    (
+        'иями', 'ями', 'ами', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими',
+        'ой', 'ей', 'ий', 'ый', 'ая', 'яя', 'ое', 'ее', 'ые', 'ие', 'ов',
+        'ев', 'ах', 'ях', 'ам', 'ям', 'ом', 'ем', 'ую', 'юю', 'а', 'я',
+        'о', 'е', 'ы', 'и', 'у', 'ю', 'ь',
+    ),
+    key=len,
+    reverse=True,
+)
+MIN_STEM_LENGTH = 3
+# SQLite до 3.32 принимает не больше 999 параметров в запросе
+MAX_IDS_PER_QUERY = 900
+
+
+def is_available():
+    return connection.vendor == 'sqlite'
+
+
+def stem(word):
+    """Отрезает русское окончание, чтобы искать все формы слова."""
+    if not CYRILLIC_RE.search(word):
+        return word
+    for ending in RUSSIAN_ENDINGS:
+        if (word.endswith(ending)
+                and len(word) - len(ending) >= MIN_STEM_LENGTH):
+            return word[:-len(ending)]
+    return word
+
+
+def match_expression(query):
+    """
+    Переводит запрос пользователя в выражение FTS5 MATCH: все слова
+    обязательны, спецсимволы FTS5 из запроса не попадают в выражение.
+    """
+    words = WORD_RE.findall(query.lower())
+    if settings.POSTS_SEARCH_STEMMING:
+        return ' '.join(f'"{stem(word)}"*' for word in words)
+    return ' '.join(f'"{word}"' for word in words)
+
+
+def create_index(cursor):
+    tokenizer = settings.POSTS_SEARCH_TOKENIZER.replace("'", "''")
+    cursor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+        f"USING fts5(text, tokenize='{tokenizer}')"
+    )
+
+
+def drop_index(cursor):
+    cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def rebuild_index(cursor):
+    """Создает индекс заново с текущим токенизатором и заполняет его."""
+    drop_index(cursor)
+    create_index(cursor)
+    cursor.execute(
+        f'INSERT INTO {FTS_TABLE} (rowid, text) '
+        f'SELECT id, text FROM posts_post'
+    )
+
+
+def index_posts_after(cursor, after_pk):
+    """Индексирует посты с id больше ``after_pk``, записанные без save()."""
+    cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid > %s', [after_pk])
+    cursor.execute(
+        f'INSERT INTO {FTS_TABLE} (rowid, text) '
+        f'SELECT id, text FROM posts_post WHERE id > %s',
+        [after_pk],
+    )
+
+
+@batched
+def index_posts(post_ids):
+    """Переиндексирует посты; удаленные к этому времени просто пропадают."""
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        for start in range(0, len(post_ids), MAX_IDS_PER_QUERY):
+            chunk = post_ids[start:start + MAX_IDS_PER_QUERY]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})',
+                chunk,
+            )
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) '
+                f'SELECT id, text FROM posts_post '
+                f'WHERE id IN ({placeholders})',
+                chunk,
+            )
@@ -0,0 +1,232 @@
+from django.core.cache import cache
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.jobs import enqueue
+
+from . import follow, images, search, timeline
+from .counters import (change_author_post_count, change_day_post_count,
+                       change_follower_count, change_group_post_count)
+from .models import Follow, Group, Post, TimelineEntry, User
+from .page_cache import (author_card, bump_feed_versions, following_feed,
+                         group_card)
+from .paginators import feed_count_key
+
+
+@receiver(pre_save, sender=Post)
+def remember_group(sender, instance, **kwargs):
+    """
+    Запоминает прежнюю группу редактируемого поста и сбрасывает миниатюры,
+    если картинку заменили или убрали.
+    """
+    if not instance.image or not instance.image._committed:
+        # Миниатюры прежней картинки к новой не подходят
+        instance.image_widths = ''
+    if instance.pk is not None:
+        instance._saved_group_id = (
+            Post.objects.filter(pk=instance.pk)
+            .values_list('group_id', flat=True)
+            .first()
+        )
+
+
+def count_group_post(group_id, delta):
+    if group_id is not None:
+        enqueue(change_group_post_count, group_id, delta)
+
+
+def count_day_post(pub_date, delta):
+    day = timezone.localdate(pub_date).isoformat()
+    enqueue(change_day_post_count, day, delta)
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, **kwargs):
+    if created:
+        enqueue(change_author_post_count, instance.author_id, 1)
+        count_group_post(instance.group_id, 1)
+        count_day_post(instance.pub_date, 1)
+        return
+    old_group_id = getattr(instance, '_saved_group_id', None)
+    if old_group_id != instance.group_id:
+        count_group_post(old_group_id, -1)
+        count_group_post(instance.group_id, 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    enqueue(change_author_post_count, instance.author_id, -1)
+    count_group_post(instance.group_id, -1)
+    count_day_post(instance.pub_date, -1)
+
+
+@receiver([post_save, post_delete], sender=Post)
+def reset_feed_count(sender, instance, **kwargs):
+    """Сбрасывает закэшированное число постов главной ленты."""
+    cache.delete(feed_count_key('index'))
+
+
+@receiver([post_save, post_delete], sender=Post)
+def expire_post_feeds(sender, instance, **kwargs):
+    """Меняет версии лент, в которых выводится пост."""
+    group_ids = {instance.group_id, getattr(instance, '_saved_group_id', None)}
+    slugs = Group.objects.filter(pk__in=group_ids - {None}).values_list(
+        'slug', flat=True
+    )
+    bump_feed_versions(
+        ['index', f'profile:{instance.author.username}']
+        + [f'group:{slug}' for slug in slugs]
+    )
+
+
+NAME_FIELDS = ('username', 'first_name', 'last_name')
+
+
+def group_author_feeds(group_id):
+    """Ленты профилей авторов, у которых есть посты в группе."""
+    usernames = User.objects.filter(posts__group_id=group_id).values_list(
+        'username', flat=True
+    ).distinct()
+    return [f'profile:{username}' for username in usernames]
+
+
+@receiver(pre_save, sender=Group)
+def remember_group_names(sender, instance, **kwargs):
+    if instance.pk is not None:
+        instance._saved_names = (
+            Group.objects.filter(pk=instance.pk)
+            .values_list('slug', 'title')
+            .first()
+        )
+
+
+@receiver(post_save, sender=Group)
+def expire_group_feed(sender, instance, created, **kwargs):
+    """
+    Меняет версию ленты группы, а если сменились адрес или название, то
+    и версии лент, в карточках которых они выводятся: главной и
+    профилей авторов группы. Страницы по прежнему адресу тоже сбрасываются.
+    """
+    if created:
+        return
+    feeds = [f'group:{instance.slug}', group_card(instance.pk)]
+    saved = instance.__dict__.pop('_saved_names', None)
+    if saved is not None and saved != (instance.slug, instance.title):
+        feeds += [f'group:{saved[0]}', 'index']
+        feeds += group_author_feeds(instance.pk)
+    bump_feed_versions(feeds)
+
+
+@receiver(pre_delete, sender=Group)
+def expire_deleted_group_feeds(sender, instance, **kwargs):
+    """Посты удаленной группы остаются без нее во всех лентах."""
+    bump_feed_versions(
+        [f'group:{instance.slug}', group_card(instance.pk), 'index']
+        + group_author_feeds(instance.pk)
+    )
+
+
+@receiver(pre_save, sender=User)
+def remember_author_names(sender, instance, update_fields=None, **kwargs):
+    if instance.pk is None or (
+            update_fields is not None
+            and not set(NAME_FIELDS) & set(update_fields)):
+        return
+    instance._saved_names = (
+        User.objects.filter(pk=instance.pk).values_list(*NAME_FIELDS).first()
+    )
+
+
+@receiver(post_save, sender=User)
+def expire_author_cards(sender, instance, created, **kwargs):
+    """
+    Если автор сменил имя, меняет версии его карточек и лент, где они
+    выводятся: главной, его профиля, в том числе по прежнему адресу, и
+    групп, в которых он писал.
+    """
+    saved = instance.__dict__.pop('_saved_names', None)
+    if created or saved is None:
+        return
+    if saved == tuple(getattr(instance, name) for name in NAME_FIELDS):
+        return
+    slugs = Group.objects.filter(posts__author=instance).values_list(
+        'slug', flat=True
+    ).distinct()
+    bump_feed_versions(
+        [
+            author_card(instance.pk), 'index',
+            f'profile:{instance.username}', f'profile:{saved[0]}',
+        ]
+        + [f'group:{slug}' for slug in slugs]
+    )
+
+
+@receiver([post_save, post_delete], sender=Post)
+def index_post(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'text' in update_fields:
+        enqueue(search.index_posts, instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def thumbnail_saved_image(sender, instance, **kwargs):
+    if instance.image and not instance.image_widths:
+        enqueue(images.make_thumbnails, instance.pk, instance.image.name)
+
+
+@receiver(post_save, sender=Post)
+def update_timeline(sender, instance, created, **kwargs):
+    if created:
+        timeline.add_post(
+            instance,
+            timeline.post_feeds(instance.author_id, instance.group_id),
+        )
+        return
+    old_group_id = getattr(instance, '_saved_group_id', None)
+    if old_group_id != instance.group_id:
+        timeline.move_post(instance, old_group_id)
+
+
+@receiver(post_delete, sender=Post)
+def refill_timeline(sender, instance, **kwargs):
+    """На место удаленного из окон лент поста встает следующий."""
+    for feed in timeline.post_feeds(instance.author_id, instance.group_id):
+        timeline.refill(feed)
+
+
+@receiver(post_delete, sender=Group)
+def drop_group_timeline(sender, instance, **kwargs):
+    TimelineEntry.objects.filter(
+        feed=timeline.group_feed(instance.pk)
+    ).delete()
+
+
+@receiver(post_save, sender=Post)
+def fan_out_saved_post(sender, instance, created, **kwargs):
+    if created:
+        enqueue(follow.fan_out_post, instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def refill_follower_inboxes(sender, instance, **kwargs):
+    enqueue(follow.refill_inboxes, instance.author_id)
+
+
+@receiver([post_save, post_delete], sender=Follow)
+def expire_following(sender, instance, **kwargs):
+    """Меняет версию подписок читателя для ETag страниц профилей."""
+    bump_feed_versions([following_feed(instance.user_id)])
+
+
+@receiver(post_save, sender=Follow)
+def count_saved_follow(sender, instance, created, **kwargs):
+    if created:
+        enqueue(change_follower_count, instance.author_id, 1)
+        enqueue(follow.backfill_inbox, instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    enqueue(follow.count_unfollow, instance.author_id)
+    enqueue(follow.drop_from_inbox, instance.user_id, instance.author_id)
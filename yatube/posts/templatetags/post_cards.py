@@ -0,0 +1,11 @@
+from django import template
+
+from ..page_cache import card_version as post_card_version
+
+register = template.Library()
+
+
+@register.filter
+def card_version(post):
+    """Версии автора и группы для ключа кэша карточки поста."""
+    return post_card_version(post)
@@ -0,0 +1,119 @@
+import datetime
+
+from django import template
+from django.db.models import Max, Min, Sum
+from django.db.models.functions import TruncMonth, TruncYear
+from django.utils import formats
+from django.utils.text import capfirst
+from django.utils.translation import gettext as _
+
+from ..models import PostDayCount
+
+register = template.Library()
+
+
+def days_with_posts(**filters):
+    return PostDayCount.objects.filter(post_count__gt=0, **filters)
+
+
+def period_counts(trunc, **filters):
+    """Пары (первый день периода, число постов) по PostDayCount."""
+    return (
+        days_with_posts(**filters)
+        .annotate(period=trunc('day'))
+        .values_list('period')
+        .annotate(count=Sum('post_count'))
+        .order_by('period')
+    )
+
+
+@register.inclusion_tag('admin/date_hierarchy.html')
+def post_date_hierarchy(cl):
+    """
+    Навигация по датам списка постов, как у тега date_hierarchy админки,
+    но годы, месяцы и дни с числом постов берутся из PostDayCount, а не
+    из таблицы постов. Поэтому числа не учитывают остальные фильтры.
+    """
+    field_name = cl.date_hierarchy
+    year_field = f'{field_name}__year'
+    month_field = f'{field_name}__month'
+    day_field = f'{field_name}__day'
+    year_lookup = cl.params.get(year_field)
+    month_lookup = cl.params.get(month_field)
+    day_lookup = cl.params.get(day_field)
+
+    def link(filters):
+        return cl.get_query_string(filters, [f'{field_name}__'])
+
+    def choice(filters, title, count):
+        return {'link': link(filters), 'title': f'{title} ({count})'}
+
+    if not (year_lookup or month_lookup or day_lookup):
+        date_range = days_with_posts().aggregate(
+            first=Min('day'), last=Max('day')
+        )
+        first, last = date_range['first'], date_range['last']
+        if first and last and first.year == last.year:
+            year_lookup = first.year
+            if first.month == last.month:
+                month_lookup = first.month
+
+    if year_lookup and month_lookup and day_lookup:
+        day = datetime.date(
+            int(year_lookup), int(month_lookup), int(day_lookup)
+        )
+        return {
+            'show': True,
+            'back': {
+                'link': link({
+                    year_field: year_lookup, month_field: month_lookup,
+                }),
+                'title': capfirst(
+                    formats.date_format(day, 'YEAR_MONTH_FORMAT')
+                ),
+            },
+            'choices': [{
+                'title': capfirst(formats.date_format(day, 'MONTH_DAY_FORMAT'))
+            }],
+        }
+    if year_lookup and month_lookup:
+        days = days_with_posts(day__year=year_lookup, day__month=month_lookup)
+        return {
+            'show': True,
+            'back': {'link': link({year_field: year_lookup}),
+                     'title': str(year_lookup)},
+            'choices': [
+                choice(
+                    {year_field: year_lookup, month_field: month_lookup,
+                     day_field: day_count.day.day},
+                    capfirst(formats.date_format(
+                        day_count.day, 'MONTH_DAY_FORMAT'
+                    )),
+                    day_count.post_count,
+                )
+                for day_count in days
+            ],
+        }
+    if year_lookup:
+        months = period_counts(TruncMonth, day__year=year_lookup)
+        return {
+            'show': True,
+            'back': {'link': link({}), 'title': _('All dates')},
+            'choices': [
+                choice(
+                    {year_field: year_lookup, month_field: month.month},
+                    capfirst(formats.date_format(month, 'YEAR_MONTH_FORMAT')),
+                    count,
+                )
+                for month, count in months
+            ],
+        }
+    years = period_counts(TruncYear)
+    return {
+        'show': True,
+        'back': None,
+        'choices': [
+            choice({year_field: str(year.year)}, str(year.year), count)
+            for year, count in years
+        ],
+    }
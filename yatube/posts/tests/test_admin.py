@@ -0,0 +1,130 @@
+from datetime import date, datetime
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.bulk import bulk_create_posts
+from posts.counters import rebuild_post_counters
+from posts.models import Group, Post, PostDayCount
+from posts.paginators import ApproximateCountPaginator
+
+User = get_user_model()
+
+
+def aware(*args):
+    return timezone.make_aware(datetime(*args))
+
+
+@override_settings(BACKGROUND_JOBS_EAGER=True)
+class PostAdminTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        cls.group = Group.objects.create(
+            title='Группа', slug='admin-group', description='Описание'
+        )
+        bulk_create_posts([
+            Post(
+                text='Пост', author=cls.admin, group=cls.group,
+                pub_date=pub_date,
+            )
+            for pub_date in (
+                aware(2022, 12, 31, 12), aware(2023, 3, 1, 9),
+                aware(2023, 3, 1, 18), aware(2023, 3, 5, 10),
+            )
+        ])
+        rebuild_post_counters()
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.admin)
+        self.url = reverse('admin:posts_post_changelist')
+        cache.clear()
+
+    def day_counts(self):
+        return list(
+            PostDayCount.objects.filter(post_count__gt=0)
+            .values_list('day', 'post_count')
+        )
+
+    def test_day_counts_follow_posts(self):
+        """rebuild_post_counters и сигналы ведут число постов по дням."""
+        expected = [
+            (date(2022, 12, 31), 1), (date(2023, 3, 1), 2),
+            (date(2023, 3, 5), 1),
+        ]
+        self.assertEqual(self.day_counts(), expected)
+        Post.objects.filter(pub_date__day=5).get().delete()
+        self.assertEqual(self.day_counts(), expected[:2])
+        PostDayCount.objects.all().delete()
+        rebuild_post_counters()
+        self.assertEqual(self.day_counts(), expected[:2])
+
+    def test_rebuild_writes_in_batches(self):
+        """rebuild_post_counters пишет дни пачками по batch_size."""
+        with CaptureQueriesContext(connection) as context:
+            rebuild_post_counters(batch_size=2)
+        inserts = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('INSERT INTO "posts_postdaycount"')
+        ]
+        self.assertEqual(len(inserts), 2)
+        self.assertEqual(len(self.day_counts()), 3)
+
+    def test_changelist_does_not_count_posts(self):
+        """Список постов в админке не делает COUNT по таблице постов."""
+        for params in ({}, {'pub_date__year': '2023'}):
+            with self.subTest(params=params):
+                with CaptureQueriesContext(connection) as context:
+                    response = self.client.get(self.url, params)
+                self.assertEqual(response.status_code, 200)
+                counts = [
+                    query['sql'] for query in context.captured_queries
+                    if 'COUNT(' in query['sql']
+                    and 'posts_post' in query['sql']
+                ]
+                self.assertEqual(counts, [], '\n'.join(counts))
+                self.assertEqual(response.context['cl'].full_result_count, 4)
+        self.assertEqual(response.context['cl'].result_count, 3)
+
+    def test_date_hierarchy_from_day_counts(self):
+        """Навигация по датам показывает периоды с числом постов."""
+        response = self.client.get(self.url)
+        self.assertContains(response, '?pub_date__year=2023">2023 (3)<')
+        self.assertContains(response, '?pub_date__year=2022">2022 (1)<')
+        response = self.client.get(
+            self.url, {'pub_date__year': '2023', 'pub_date__month': '3'}
+        )
+        self.assertContains(response, 'pub_date__day=1')
+        self.assertContains(response, '(2)<')
+        self.assertEqual(response.context['cl'].result_count, 3)
+
+    def test_group_choices_are_read_once(self):
+        """Группы для list_editable читаются одним запросом на страницу."""
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(self.url)
+        group_queries = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('SELECT')
+            and 'FROM "posts_group"' in query['sql']
+        ]
+        self.assertEqual(len(group_queries), 1, '\n'.join(group_queries))
+
+    @override_settings(POSTS_ADMIN_EXACT_COUNT_LIMIT=2)
+    def test_large_counts_are_cached(self):
+        """Число постов выше порога считается один раз и берется из кэша."""
+        queryset = Post.objects.filter(group=self.group)
+        self.assertEqual(ApproximateCountPaginator(queryset, 10).count, 4)
+        Post.objects.create(text='Пост', author=self.admin, group=self.group)
+        with self.assertNumQueries(1):
+            paginator = ApproximateCountPaginator(queryset, 10)
+            self.assertEqual(paginator.count, 4)
+        small = Post.objects.filter(pub_date__year=2022)
+        self.assertEqual(ApproximateCountPaginator(small, 10).count, 1)
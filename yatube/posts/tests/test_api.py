@@ -0,0 +1,81 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class PostsAPITest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='user-api')
+        cls.group = Group.objects.create(
+            title='title-api',
+            slug='slug-api',
+            description='description-api'
+        )
+        for i in range(13):
+            Post.objects.create(
+                text=f'Пост {i}',
+                author=PostsAPITest.author,
+                group=PostsAPITest.group if i % 2 else None,
+            )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def get_json(self, url, data=None):
+        response = self.guest_client.get(url, data)
+        self.assertEqual(response.status_code, 200)
+        if response.streaming:
+            return json.loads(b''.join(response.streaming_content))
+        return response.json()
+
+    def test_feed_pages_by_cursor(self):
+        """Все посты ленты обходятся по курсорам next в порядке ленты."""
+        url = reverse('posts:api_index')
+        ids, data = [], {'limit': 5}
+        while True:
+            page = self.get_json(url, data)
+            ids += [post['id'] for post in page['results']]
+            if page['next'] is None:
+                break
+            data = {'limit': 5, 'after': page['next']}
+        self.assertEqual(
+            ids, list(Post.objects.order_by('-pub_date', '-pk')
+                      .values_list('pk', flat=True))
+        )
+
+        previous_page = self.get_json(
+            url, {'limit': 5, 'before': page['previous']}
+        )
+        self.assertEqual(
+            [post['id'] for post in previous_page['results']], ids[5:10]
+        )
+
+    def test_group_and_profile_feeds(self):
+        urls = {
+            reverse('posts:api_group_list', args=[self.group.slug]): 6,
+            reverse('posts:api_profile', args=[self.author.username]): 13,
+        }
+        for url, count in urls.items():
+            with self.subTest(url=url):
+                page = self.get_json(url)
+                self.assertEqual(len(page['results']), count)
+                self.assertIsNone(page['next'])
+
+    def test_post_detail(self):
+        post = Post.objects.filter(group=self.group).first()
+        data = self.get_json(reverse('posts:api_post_detail', args=[post.pk]))
+        self.assertEqual(data['text'], post.text)
+        self.assertEqual(data['author'], self.author.username)
+        self.assertEqual(data['group'], self.group.slug)
+        response = self.guest_client.get(
+            reverse('posts:api_post_detail', args=[post.pk + 100])
+        )
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,249 @@
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from posts import search
+from posts.bulk import (bulk_create_posts, last_post_pk,
+                        refresh_derived_data)
+from posts.follow import inbox_feed
+from posts.models import (AuthorStats, Follow, Group, Post, PostDayCount,
+                          TimelineEntry)
+
+User = get_user_model()
+
+
+class ExplainFeedsCommandTest(TestCase):
+
+    def test_feeds_use_indexes(self):
+        """Запросы лент читаются по индексам без сортировки таблицы."""
+        out = StringIO()
+        call_command('explain_feeds', '--check', stdout=out)
+        self.assertNotIn('TEMP B-TREE', out.getvalue())
+
+
+class RebuildCountersCommandTest(TestCase):
+
+    def test_rebuild_counters(self):
+        """Команда восстанавливает счетчики после bulk_create."""
+        author = User.objects.create_user('author')
+        group = Group.objects.create(title='Группа', slug='group')
+        Post.objects.bulk_create(
+            Post(text='Пост', author=author, group=group) for _ in range(3)
+        )
+        call_command('rebuild_counters', stdout=StringIO())
+        group.refresh_from_db()
+        self.assertEqual(group.post_count, 3)
+        self.assertEqual(AuthorStats.post_count_for(author), 3)
+
+
+class RebuildTimelineCommandTest(TestCase):
+
+    def test_rebuild_timeline(self):
+        """Команда добавляет в окна лент посты, созданные в обход save()."""
+        author = User.objects.create_user('author')
+        group = Group.objects.create(title='Группа', slug='group')
+        Post.objects.bulk_create(
+            Post(text='Пост', author=author, group=group) for _ in range(3)
+        )
+        call_command('rebuild_timeline', stdout=StringIO())
+        feeds = TimelineEntry.objects.values_list('feed', flat=True)
+        self.assertEqual(
+            sorted(feeds),
+            sorted(['index', f'profile:{author.pk}', f'group:{group.pk}'] * 3),
+        )
+
+
+class RebuildSearchIndexCommandTest(TestCase):
+
+    def test_rebuild_search_index(self):
+        """Команда добавляет в индекс посты, созданные в обход save()."""
+        author = User.objects.create_user('author')
+        Post.objects.bulk_create(
+            [Post(text='Пост про котиков', author=author)]
+        )
+        self.assertFalse(Post.objects.search('котик').exists())
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertTrue(Post.objects.search('котик').exists())
+
+    def test_index_posts_in_chunks(self):
+        """index_posts не передает в запрос больше 900 id."""
+        author = User.objects.create_user('author')
+        Post.objects.bulk_create(
+            [Post(text='Пост про котиков', author=author)] * 1000
+        )
+        post_ids = list(Post.objects.values_list('pk', flat=True))
+        with CaptureQueriesContext(connection) as context:
+            search.index_posts(post_ids)
+        deletes = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('DELETE')
+        ]
+        self.assertEqual(len(deletes), 2)
+        self.assertEqual(Post.objects.search('котик').count(), 1000)
+
+
+class BulkCreatePostsTest(TestCase):
+
+    def test_pub_date_kept(self):
+        """Заданная дата сохраняется, auto_now_add поля не выключается."""
+        author = User.objects.create_user('author')
+        pub_date = timezone.now() - timedelta(days=30)
+        bulk_create_posts(
+            [Post(text='Пост', author=author, pub_date=pub_date)]
+        )
+        post = Post.objects.get()
+        self.assertEqual(post.pub_date, pub_date)
+        self.assertGreater(post.updated, pub_date)
+        self.assertTrue(Post._meta.get_field('pub_date').auto_now_add)
+        fresh = Post.objects.create(
+            text='Пост', author=author, pub_date=pub_date
+        )
+        self.assertGreater(fresh.pub_date, pub_date)
+
+
+class RefreshDerivedDataTest(TestCase):
+
+    def test_only_loaded_posts_refreshed(self):
+        """Пересчитываются данные загруженных постов, чужие не трогаются."""
+        author = User.objects.create_user('author')
+        other = User.objects.create_user('other')
+        reader = User.objects.create_user('reader')
+        Follow.objects.create(user=reader, author=author)
+        group = Group.objects.create(title='Группа', slug='group')
+        Post.objects.create(text='Старый пост', author=other)
+        # Разошедшийся счетчик другого автора чинит только rebuild_counters
+        AuthorStats.objects.filter(author=other).update(post_count=99)
+        after_pk = last_post_pk()
+        pub_date = timezone.now() - timedelta(days=3)
+        bulk_create_posts([
+            Post(text='Загруженный пост', author=author, group=group,
+                 pub_date=pub_date)
+            for _ in range(2)
+        ])
+        refresh_derived_data(after_pk)
+        self.assertEqual(AuthorStats.post_count_for(author), 2)
+        self.assertEqual(AuthorStats.post_count_for(other), 99)
+        group.refresh_from_db()
+        self.assertEqual(group.post_count, 2)
+        self.assertEqual(
+            PostDayCount.objects.get(
+                day=timezone.localdate(pub_date)
+            ).post_count,
+            2,
+        )
+        self.assertEqual(
+            TimelineEntry.objects.filter(feed=inbox_feed(reader.pk)).count(),
+            2,
+        )
+        self.assertTrue(Post.objects.search('загруженный').exists())
+
+
+class ImportExportCommandsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user('author')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        Post.objects.create(text='Пост в группе', author=cls.author,
+                            group=cls.group)
+        Post.objects.create(text='Пост без группы', author=cls.author)
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def path(self, name):
+        return os.path.join(self.tmp_dir.name, name)
+
+    def test_export_and_import_round_trip(self):
+        """Выгруженные посты загружаются обратно с теми же данными."""
+        for fmt in ('posts.ndjson', 'posts.csv'):
+            with self.subTest(fmt=fmt):
+                expected = list(
+                    Post.objects.order_by('pk')
+                    .values_list('text', 'pub_date', 'author', 'group')
+                )
+                call_command('export_posts', self.path(fmt),
+                             stderr=StringIO())
+                Post.objects.all().delete()
+                call_command('import_posts', self.path(fmt), batch_size=1,
+                             stdout=StringIO(), stderr=StringIO())
+                self.assertEqual(
+                    list(Post.objects.order_by('pk').values_list(
+                        'text', 'pub_date', 'author', 'group'
+                    )),
+                    expected
+                )
+                self.group.refresh_from_db()
+                self.assertEqual(self.group.post_count, 1)
+                self.assertEqual(AuthorStats.post_count_for(self.author), 2)
+                self.assertTrue(Post.objects.search('группе').exists())
+
+    def test_import_unknown_authors(self):
+        """Посты неизвестных авторов пропускаются или создают авторов."""
+        with open(self.path('posts.csv'), 'w', encoding='utf-8') as stream:
+            stream.write('text,pub_date,author,group\n'
+                         'Пост,,stranger,\n'
+                         'Пост,,author,unknown-group\n')
+        call_command('import_posts', self.path('posts.csv'),
+                     stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(Post.objects.count(), 2)
+        call_command('import_posts', self.path('posts.csv'),
+                     create_authors=True, stdout=StringIO(),
+                     stderr=StringIO())
+        self.assertTrue(Post.objects.filter(author__username='stranger'))
+        self.assertEqual(Post.objects.count(), 3)
+
+
+class SeedAndBenchmarkCommandsTest(TestCase):
+
+    def test_seed_rejects_bad_sizes(self):
+        """Без авторов и с пустыми пачками seed не запускается."""
+        for options in ({'users': 0}, {'posts': -1}, {'batch_size': 0}):
+            with self.subTest(options=options):
+                with self.assertRaises(CommandError):
+                    call_command('seed', **options, stdout=StringIO())
+        self.assertFalse(User.objects.exists())
+
+    def test_seed_and_benchmark(self):
+        """seed заполняет базу, benchmark пишет отчет по всем сценариям."""
+        call_command('seed', users=5, groups=2, posts=50, seed=1,
+                     stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(Post.objects.count(), 50)
+        self.assertEqual(
+            sum(AuthorStats.objects.values_list('post_count', flat=True)), 50
+        )
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output = os.path.join(tmp_dir, 'report.json')
+            call_command('benchmark', requests=3, warmup=1, output=output,
+                         stdout=StringIO(), stderr=StringIO())
+            with open(output, encoding='utf-8') as stream:
+                report = json.load(stream)
+        self.assertEqual(
+            set(report['scenarios']),
+            {'index', 'group_posts', 'profile', 'post_detail', 'post_create',
+             'mixed', 'index_cached'}
+        )
+        for scenario, result in report['scenarios'].items():
+            with self.subTest(scenario=scenario):
+                self.assertEqual(result['errors'], 0)
+        # Ленты отрисовываются, а не берутся из кэша страниц
+        for scenario in ('index', 'group_posts', 'profile'):
+            with self.subTest(scenario=scenario):
+                self.assertGreater(
+                    report['scenarios'][scenario]['queries_per_request'], 0
+                )
+        self.assertEqual(
+            report['scenarios']['index_cached']['queries_per_request'], 0
+        )
+        self.assertEqual(Post.objects.count(), 50)
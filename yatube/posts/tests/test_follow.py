@@ -0,0 +1,105 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.follow import inbox_feed
+from posts.models import AuthorStats, Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+@override_settings(BACKGROUND_JOBS_EAGER=True)
+class FollowTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.stranger = User.objects.create_user(username='stranger')
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def follow(self, client, author):
+        return client.post(
+            reverse('posts:profile_follow', args=[author.username])
+        )
+
+    def feed(self, client):
+        response = client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_follow_and_unfollow(self):
+        """Подписка и отписка меняют Follow и счетчик подписчиков."""
+        self.follow(self.reader_client, self.author)
+        self.follow(self.reader_client, self.author)
+        self.follow(self.reader_client, self.reader)
+        self.assertEqual(
+            list(Follow.objects.values_list('user', 'author')),
+            [(self.reader.pk, self.author.pk)],
+            'Подписка повторилась или читатель подписался на себя',
+        )
+        self.assertEqual(self.author.stats.follower_count, 1)
+        self.reader_client.post(
+            reverse('posts:profile_unfollow', args=[self.author.username])
+        )
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.author).follower_count, 0
+        )
+
+    def test_post_reaches_followers_only(self):
+        """Новый пост попадает в ленту подписчика и не виден остальным."""
+        old_post = Post.objects.create(text='Старый пост', author=self.author)
+        self.follow(self.reader_client, self.author)
+        new_post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertEqual(self.feed(self.reader_client), [new_post, old_post])
+        self.assertEqual(
+            TimelineEntry.objects.filter(feed=inbox_feed(self.reader.pk))
+            .count(),
+            2,
+        )
+        stranger_client = Client()
+        stranger_client.force_login(self.stranger)
+        self.assertEqual(self.feed(stranger_client), [])
+
+        self.reader_client.post(
+            reverse('posts:profile_unfollow', args=[self.author.username])
+        )
+        self.assertEqual(self.feed(self.reader_client), [])
+
+    @override_settings(POSTS_FANOUT_MAX_FOLLOWERS=0)
+    def test_popular_author_read_on_open(self):
+        """Посты популярного автора не раскладываются, но видны в ленте."""
+        self.follow(self.reader_client, self.author)
+        other = User.objects.create_user(username='other')
+        self.follow(self.reader_client, other)
+        popular_post = Post.objects.create(text='Пост', author=self.author)
+        self.assertFalse(
+            TimelineEntry.objects.filter(feed__startswith='follow:').exists()
+        )
+        self.assertEqual(self.feed(self.reader_client), [popular_post])
+
+    @override_settings(POSTS_FANOUT_MAX_FOLLOWERS=1)
+    def test_posts_kept_when_author_stops_being_popular(self):
+        """
+        Посты, опубликованные, пока автор был популярен, остаются в ленте,
+        когда после отписки он перестает быть популярным.
+        """
+        stranger_client = Client()
+        stranger_client.force_login(self.stranger)
+        self.follow(self.reader_client, self.author)
+        self.follow(stranger_client, self.author)
+        post = Post.objects.create(text='Пост', author=self.author)
+        self.assertFalse(
+            TimelineEntry.objects.filter(feed__startswith='follow:').exists()
+        )
+        stranger_client.post(
+            reverse('posts:profile_unfollow', args=[self.author.username])
+        )
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                feed=inbox_feed(self.reader.pk), post=post
+            ).exists()
+        )
+        self.assertEqual(self.feed(self.reader_client), [post])
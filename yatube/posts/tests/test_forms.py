@@ -1,8 +1,10 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import Client, TestCase
 from django.urls import reverse
 
-from posts.models import Post
+from posts.models import AuthorStats, Group, Post
+from posts.page_cache import post_card_key
 
 User = get_user_model()
 
@@ -47,3 +49,72 @@ class FormTest(TestCase):
             post.pk,
             'Вместо изменения поста, создается новый пост'
         )
+
+    def test_post_counters(self):
+        """
+        Счетчики автора и групп меняются при создании, переносе
+        в другую группу и удалении поста.
+        """
+        group = Group.objects.create(title='Группа', slug='group')
+        other_group = Group.objects.create(title='Другая', slug='other')
+        posts_before = AuthorStats.post_count_for(FormTest.author)
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Новый пост', 'group': group.pk},
+        )
+        post = Post.objects.get(text='Новый пост')
+        group.refresh_from_db()
+        self.assertEqual(group.post_count, 1)
+        self.assertEqual(
+            AuthorStats.post_count_for(FormTest.author), posts_before + 1
+        )
+
+        self.authorized_client.post(
+            reverse('posts:post_edit', args=[post.pk]),
+            data={'text': post.text, 'group': other_group.pk},
+        )
+        group.refresh_from_db()
+        other_group.refresh_from_db()
+        self.assertEqual(group.post_count, 0)
+        self.assertEqual(other_group.post_count, 1)
+
+        post.refresh_from_db()
+        post.delete()
+        other_group.refresh_from_db()
+        self.assertEqual(other_group.post_count, 0)
+        self.assertEqual(
+            AuthorStats.post_count_for(FormTest.author), posts_before
+        )
+
+    def test_change_post_resets_card(self):
+        """Редактирование поста сбрасывает кэш его карточки."""
+        post = Post.objects.create(
+            text='Текст карточки до изменения',
+            author=FormTest.author
+        )
+        self.authorized_client.get(reverse('posts:index'))
+        old_card = post_card_key(post)
+        self.assertIsNotNone(cache.get(old_card))
+
+        self.authorized_client.post(
+            reverse('posts:post_edit', args=[post.pk]),
+            data={'text': 'Текст карточки после изменения'},
+        )
+        self.assertIsNone(cache.get(old_card))
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Текст карточки после изменения')
+
+    def test_author_and_group_changes_reset_cards(self):
+        """Новое имя автора и название группы видны в кэшированной карточке."""
+        author = User.objects.create_user('writer', first_name='Иван')
+        group = Group.objects.create(title='Старая группа', slug='cards')
+        Post.objects.create(text='Пост', author=author, group=group)
+        self.authorized_client.get(reverse('posts:index'))
+
+        author.first_name = 'Петр'
+        author.save()
+        group.title = 'Новая группа'
+        group.save()
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Петр')
+        self.assertContains(response, 'Новая группа')
@@ -0,0 +1,73 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts.images import thumbnail_name
+from posts.models import Post
+
+User = get_user_model()
+
+
+def image_file(name='photo.jpg', size=(1000, 500)):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, 'JPEG')
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/jpeg')
+
+
+@override_settings(POSTS_IMAGE_WIDTHS=(320, 640, 1200))
+class PostImageTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def create_post(self, image):
+        self.client.post(
+            reverse('posts:post_create'), {'text': 'Пост', 'image': image}
+        )
+        return Post.objects.get()
+
+    def test_thumbnails_made_on_upload(self):
+        """Миниатюры готовы до первой отрисовки ленты, имя из хэша."""
+        post = self.create_post(image_file())
+        self.assertRegex(post.image.name, r'^posts/[0-9a-f]{32}\.jpg$')
+        self.assertEqual(post.image_widths, '320,640,1000')
+        for width in (320, 640):
+            name = thumbnail_name(post.image.name, width)
+            with default_storage.open(name) as file:
+                self.assertEqual(Image.open(file).size, (width, width // 2))
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'srcset=')
+        self.assertContains(response, f'{post.image.url} 1000w')
+
+    def test_same_content_same_name(self):
+        """Имя файла зависит от содержимого, а не от имени загрузки."""
+        first = self.create_post(image_file('one.jpg'))
+        first.delete()
+        second = self.create_post(image_file('two.jpg'))
+        self.assertEqual(first.image.name, second.image.name)
+
+    def test_replaced_image_gets_new_thumbnails(self):
+        """После замены картинки миниатюры строятся для новой."""
+        post = self.create_post(image_file())
+        self.client.post(
+            reverse('posts:post_edit', args=[post.pk]),
+            {'text': 'Пост', 'image': image_file(size=(400, 400))},
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.image_widths, '320,400')
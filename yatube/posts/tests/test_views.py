@@ -1,9 +1,21 @@
+import gzip
+import io
+import tempfile
+from unittest import mock
+
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
+from core.compression import gzip_compress
+
 from ..forms import PostForm
-from posts.models import Post, Group
+from ..page_cache import REPLICA_ETAG, feed_version
+from ..timeline import INDEX_FEED, group_feed, rebuild_timeline
+from .utils import QueryBudgetMixin
+from posts.models import Post, Group, TimelineEntry
 
 User = get_user_model()
 
@@ -232,3 +244,433 @@ class PaginatorViewsTest(TestCase):
         """
         response = self.author_client.get(reverse('posts:index') + '?page=2')
         self.assertEqual(len(response.context['page_obj']), 3)
+
+    def test_paginate_cursor(self):
+        """
+        Курсорная навигация: вторая страница по ``after`` и возврат
+        на первую по ``before``.
+        """
+        url = reverse('posts:index')
+        first_page = self.author_client.get(url).context['page_obj']
+        self.assertFalse(first_page.has_previous())
+        self.assertTrue(first_page.has_next())
+
+        response = self.author_client.get(
+            url, {'after': first_page.next_cursor}
+        )
+        second_page = response.context['page_obj']
+        self.assertEqual(len(second_page), 3)
+        self.assertFalse(second_page.has_next())
+
+        response = self.author_client.get(
+            url, {'before': second_page.previous_cursor}
+        )
+        self.assertEqual(
+            list(response.context['page_obj']),
+            list(first_page),
+            'Курсор before не возвращает на предыдущую страницу'
+        )
+
+    def test_paginate_broken_cursor(self):
+        """Битый курсор отдает первую страницу."""
+        response = self.author_client.get(
+            reverse('posts:index'), {'after': 'broken'}
+        )
+        self.assertEqual(len(response.context['page_obj']), 10)
+
+
+class FeedQueriesTest(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='user-q')
+        cls.group = Group.objects.create(
+            title='title-q',
+            slug='slug-q',
+            description='description-q'
+        )
+        cls.post = Post.objects.create(
+            text='Первый пост',
+            author=FeedQueriesTest.author,
+            group=FeedQueriesTest.group,
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_feed_queries_do_not_depend_on_page_size(self):
+        """
+        Число запросов ленты не растет вместе с числом постов на странице.
+        """
+        budgets = {
+            reverse('posts:index'): 1,
+            reverse('posts:group_list', args=[self.group.slug]): 2,
+            reverse('posts:profile', args=[self.author.username]): 3,
+            reverse('posts:post_detail', args=[self.post.pk]): 2,
+        }
+        for url, budget in budgets.items():
+            with self.subTest(url=url):
+                self.assertQueryBudget(self.guest_client, url, budget)
+        Post.objects.bulk_create(
+            Post(text='Пост', author=self.author, group=self.group)
+            for _ in range(12)
+        )
+        # Окна лент после bulk_create пересобираются, как в seed
+        rebuild_timeline()
+        cache.clear()
+        for url, budget in budgets.items():
+            with self.subTest(url=url, full_page=True):
+                self.assertQueryBudget(self.guest_client, url, budget)
+
+
+@override_settings(POSTS_TIMELINE_WINDOW=15)
+class TimelineTest(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='user-t')
+        cls.group = Group.objects.create(
+            title='title-t',
+            slug='slug-t',
+            description='description-t'
+        )
+        for number in range(23):
+            Post.objects.create(
+                text=f'Пост {number}', author=cls.author, group=cls.group
+            )
+
+    def window(self, feed):
+        return list(
+            TimelineEntry.objects.filter(feed=feed)
+            .order_by('-pub_date', '-post_id')
+            .values_list('post_id', flat=True)
+        )
+
+    def test_cursor_pages_cross_window(self):
+        """Страницы по курсорам за пределами окна читаются из постов."""
+        self.assertQueryBudget(self.client, reverse('posts:index'), 1)
+        # Страницы для вошедшего пользователя не берутся из кэша
+        self.client.force_login(self.author)
+        ids, params = [], {}
+        while True:
+            page = self.client.get(
+                reverse('posts:index'), params
+            ).context['page_obj']
+            ids.extend(post.pk for post in page)
+            if not page.has_next():
+                break
+            params = {'after': page.next_cursor}
+        self.assertEqual(
+            ids,
+            list(Post.objects.order_by('-pub_date', '-pk')
+                 .values_list('pk', flat=True)),
+            'Лента по курсорам теряет или повторяет посты',
+        )
+
+    def test_window_follows_post_changes(self):
+        """Окна лент хранят последние посты после удаления и переноса."""
+        newest = Post.objects.order_by('-pub_date', '-pk')
+        self.assertEqual(
+            self.window(INDEX_FEED),
+            list(newest.values_list('pk', flat=True)[:15]),
+        )
+        newest.first().delete()
+        self.assertEqual(
+            self.window(INDEX_FEED),
+            list(newest.values_list('pk', flat=True)[:15]),
+            'На место удаленного поста не встал следующий',
+        )
+        other_group = Group.objects.create(title='Другая', slug='other-t')
+        post = newest.first()
+        post.group = other_group
+        post.save()
+        self.assertEqual(self.window(group_feed(other_group.pk)), [post.pk])
+        self.assertNotIn(post.pk, self.window(group_feed(self.group.pk)))
+        self.assertEqual(len(self.window(group_feed(self.group.pk))), 15)
+
+
+class PageCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='user-c')
+        cls.group = Group.objects.create(
+            title='title-c',
+            slug='slug-c',
+            description='description-c'
+        )
+        cls.cache_dir = tempfile.TemporaryDirectory()
+        cls.backends = {
+            'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+            'filebased': 'django.core.cache.backends.filebased.FileBasedCache',
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.cache_dir.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def cache_settings(self, backend):
+        return override_settings(CACHES={'default': {
+            'BACKEND': self.backends[backend],
+            'LOCATION': self.cache_dir.name,
+        }})
+
+    def test_feeds_are_cached_until_post_changes(self):
+        """
+        Ленты отдаются из кэша без запросов к базе, пока в них
+        не изменится пост.
+        """
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+        )
+        for backend in self.backends:
+            with self.cache_settings(backend), self.subTest(backend=backend):
+                cache.clear()
+                post = Post.objects.create(
+                    text=f'Пост для {backend}',
+                    author=self.author,
+                    group=self.group,
+                )
+                for url in urls:
+                    self.guest_client.get(url)
+                    with self.assertNumQueries(0):
+                        response = self.guest_client.get(url)
+                    self.assertContains(response, post.text)
+
+                post.text = f'Исправленный пост для {backend}'
+                post.save()
+                for url in urls:
+                    response = self.guest_client.get(url)
+                    self.assertContains(response, post.text)
+
+                post.delete()
+                for url in urls:
+                    response = self.guest_client.get(url)
+                    self.assertNotContains(response, post.text)
+
+    def test_name_changes_expire_pages(self):
+        """Новые имя автора и название группы видны в кэшированных лентах."""
+        author = User.objects.create_user('renamed', first_name='Иван')
+        group = Group.objects.create(title='Старая группа', slug='old-slug')
+        Post.objects.create(text='Пост', author=author, group=group)
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', args=[author.username]),
+            reverse('posts:group_list', args=[group.slug]),
+        )
+        cache.clear()
+        for url in urls:
+            self.guest_client.get(url)
+
+        author.first_name = 'Петр'
+        author.save()
+        group.title = 'Новая группа'
+        group.slug = 'new-slug'
+        group.save()
+        for url in urls[:2]:
+            response = self.guest_client.get(url)
+            self.assertContains(response, 'Петр')
+            self.assertContains(response, 'Новая группа')
+        response = self.guest_client.get(urls[2])
+        self.assertEqual(response.status_code, 404)
+
+        group.delete()
+        response = self.guest_client.get(urls[0])
+        self.assertNotContains(response, 'Новая группа')
+
+    def test_counters_from_worker_expire_pages(self):
+        """
+        Страница, собранная до того, как воркер обновил счетчики, не
+        остается в кэше со старым числом постов.
+        """
+        url = reverse('posts:profile', args=[self.author.username])
+        cache.clear()
+        before = self.guest_client.get(url).context['all_posts']
+        with override_settings(BACKGROUND_JOBS_EAGER=False):
+            Post.objects.create(
+                text='Пост', author=self.author, group=self.group
+            )
+            self.assertEqual(
+                self.guest_client.get(url).context['all_posts'], before
+            )
+            group_version = feed_version(f'group:{self.group.slug}')
+            call_command(
+                'run_worker', once=True, concurrency=1, stdout=io.StringIO()
+            )
+        response = self.guest_client.get(url)
+        self.assertIsNotNone(response.context, 'Страница взята из кэша')
+        self.assertEqual(response.context['all_posts'], before + 1)
+        self.assertGreater(
+            feed_version(f'group:{self.group.slug}'), group_version
+        )
+
+    def test_compressed_page_is_cached(self):
+        """Сжатая страница ленты отдается из кэша без повторного сжатия."""
+        url = reverse('posts:index')
+        cache.clear()
+        plain = self.guest_client.get(url)
+        self.assertNotIn('<!--', plain.content.decode())
+        with mock.patch(
+            'core.compression.gzip_compress', wraps=gzip_compress
+        ) as compress:
+            for _ in range(2):
+                response = self.guest_client.get(
+                    url, HTTP_ACCEPT_ENCODING='gzip'
+                )
+                self.assertEqual(response['Content-Encoding'], 'gzip')
+                self.assertEqual(
+                    gzip.decompress(response.content), plain.content
+                )
+        self.assertEqual(compress.call_count, 1)
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_authorized_feed_is_not_cached(self):
+        authorized_client = Client()
+        authorized_client.force_login(self.author)
+        url = reverse('posts:index')
+        authorized_client.get(url)
+        response = authorized_client.get(url)
+        self.assertIsNotNone(response.context)
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='user-e')
+        cls.post = Post.objects.create(
+            text='Пост для ETag',
+            author=ConditionalGetTest.author,
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_feed_not_modified(self):
+        """Лента отвечает 304, пока в ней не изменился пост."""
+        url = reverse('posts:index')
+        etag = self.guest_client.get(url)['ETag']
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        Post.objects.create(text='Новый пост', author=self.author)
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_profile_etag_follows_state_and_csrf(self):
+        """
+        После подписки и нового входа профиль не отвечает 304 со старой
+        кнопкой и старым токеном CSRF.
+        """
+        reader = User.objects.create_user(username='reader-e')
+        client = Client()
+        client.force_login(reader)
+        url = reverse('posts:profile', args=[self.author.username])
+        # Первый ответ ставит cookie CSRF, ETag считается уже с ним
+        client.get(url)
+        etag = client.get(url)['ETag']
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        client.post(
+            reverse('posts:profile_follow', args=[self.author.username])
+        )
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['following'])
+
+        etag = response['ETag']
+        client.logout()
+        client.force_login(reader)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_replica_page_not_confirmed(self):
+        """Страница с реплики не подтверждается ответом 304."""
+        url = reverse('posts:index')
+        cache.clear()
+        with mock.patch(
+            'posts.page_cache.read_from_replica', return_value=True
+        ):
+            response = self.guest_client.get(url)
+        self.assertEqual(response['ETag'], REPLICA_ETAG)
+        # Из кэша страница отдается с тем же ETag
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=REPLICA_ETAG)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], REPLICA_ETAG)
+
+    def test_post_detail_not_modified(self):
+        """Страница поста отвечает 304, пока пост не изменен."""
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        response = self.guest_client.get(url)
+        self.assertTrue(response.has_header('Last-Modified'))
+        etag = response['ETag']
+        with self.assertNumQueries(1):
+            response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.post.text = 'Исправленный пост для ETag'
+        self.post.save()
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class SearchViewTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='user-s')
+        cls.cat_post = Post.objects.create(
+            text='Котики гуляют по крыше',
+            author=SearchViewTest.author,
+        )
+        cls.dog_post = Post.objects.create(
+            text='Собака спит у котика',
+            author=SearchViewTest.author,
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def search(self, query):
+        response = self.guest_client.get(reverse('posts:search'), {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return list(response.context['page_obj'])
+
+    def test_search_finds_word_forms(self):
+        """Поиск находит посты с другими формами слова."""
+        self.assertCountEqual(
+            self.search('котик'), [self.cat_post, self.dog_post]
+        )
+        self.assertEqual(self.search('крышами'), [self.cat_post])
+
+    def test_search_follows_post_changes(self):
+        """Индекс обновляется при изменении и удалении поста."""
+        dog_post = Post.objects.get(pk=self.dog_post.pk)
+        dog_post.text = 'Собака спит у будки'
+        dog_post.save()
+        self.assertEqual(self.search('котик'), [self.cat_post])
+        Post.objects.get(pk=self.cat_post.pk).delete()
+        self.assertEqual(self.search('котик'), [])
+
+    def test_search_ignores_fts_syntax(self):
+        """Служебные символы FTS5 в запросе не ломают поиск."""
+        self.assertEqual(self.search('"кот* OR ('), [])
+        self.assertEqual(self.search(''), [])
+
+    def test_admin_search(self):
+        """Поиск в админке идет по полнотекстовому индексу."""
+        admin = User.objects.create_superuser('admin', 'admin@ya.ru', 'pass')
+        admin_client = Client()
+        admin_client.force_login(admin)
+        response = admin_client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'крыша'}
+        )
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.cat_post]
+        )
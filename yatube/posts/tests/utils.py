@@ -0,0 +1,18 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """Проверка числа SQL-запросов на страницу для TestCase."""
+
+    def assertQueryBudget(self, client, url, budget, data=None):
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url, data)
+        queries = context.captured_queries
+        self.assertLessEqual(
+            len(queries),
+            budget,
+            f'Страница {url} сделала {len(queries)} запросов вместо '
+            f'{budget}:\n' + '\n'.join(query['sql'] for query in queries)
+        )
+        return response
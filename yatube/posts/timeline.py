@@ -0,0 +1,136 @@
+"""
+Материализованные окна лент.
+
+Для главной ленты, ленты каждого автора и каждой группы в TimelineEntry
+хранятся последние POSTS_TIMELINE_WINDOW постов. Первые страницы лент
+читаются по окну, дальше — обычным запросом к постам. Окна
+поддерживаются сигналами Post, после записи в обход save() их
+пересобирает ``rebuild_timeline`` или, только для нужных лент,
+``rebuild_feeds``.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Post, TimelineEntry
+
+INDEX_FEED = 'index'
+
+
+def profile_feed(author_id):
+    return f'profile:{author_id}'
+
+
+def group_feed(group_id):
+    return f'group:{group_id}'
+
+
+def post_feeds(author_id, group_id):
+    feeds = [INDEX_FEED, profile_feed(author_id)]
+    if group_id is not None:
+        feeds.append(group_feed(group_id))
+    return feeds
+
+
+def feed_posts(feed):
+    """Все посты ленты по ее ключу."""
+    kind, _, pk = feed.partition(':')
+    if kind == 'follow':
+        # Посты популярных авторов в окна подписок не раскладываются
+        return Post.objects.filter(author__following__user_id=pk).exclude(
+            author__stats__follower_count__gt=(
+                settings.POSTS_FANOUT_MAX_FOLLOWERS
+            )
+        )
+    if kind == 'profile':
+        return Post.objects.filter(author_id=pk)
+    if kind == 'group':
+        return Post.objects.filter(group_id=pk)
+    return Post.objects.all()
+
+
+def add_post(post, feeds):
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(feed=feed, post=post, pub_date=post.pub_date)
+            for feed in feeds
+        ],
+        ignore_conflicts=True,
+    )
+    trim(feeds)
+
+
+def trim(feeds):
+    """Удаляет из окон посты старше POSTS_TIMELINE_WINDOW последних."""
+    condition = Q()
+    for feed in feeds:
+        window = (
+            TimelineEntry.objects.filter(feed=feed)
+            .order_by('-pub_date', '-post_id')
+            .values('pk')[:settings.POSTS_TIMELINE_WINDOW]
+        )
+        condition |= Q(feed=feed) & ~Q(pk__in=window)
+    TimelineEntry.objects.filter(condition).delete()
+
+
+def refill(feed, missing=None):
+    """
+    Дополняет окно, из которого ушли посты, следующими по дате.
+    Без ``missing`` недостающее число постов считается по окну.
+    """
+    entries = TimelineEntry.objects.filter(feed=feed)
+    if missing is None:
+        missing = settings.POSTS_TIMELINE_WINDOW - entries.count()
+    if missing <= 0:
+        return
+    # Окно — непрерывное начало ленты, следующие посты — самые новые
+    # из тех, что в окно не попали
+    posts = (
+        feed_posts(feed)
+        .exclude(pk__in=entries.values('post_id'))
+        .order_by('-pub_date', '-pk')
+        .values_list('pk', 'pub_date')[:missing]
+    )
+    TimelineEntry.objects.bulk_create(
+        TimelineEntry(feed=feed, post_id=pk, pub_date=pub_date)
+        for pk, pub_date in posts
+    )
+
+
+def move_post(post, old_group_id):
+    """Переносит пост между окнами групп после смены группы."""
+    if old_group_id is not None:
+        removed, _ = TimelineEntry.objects.filter(
+            feed=group_feed(old_group_id), post=post
+        ).delete()
+        if removed:
+            refill(group_feed(old_group_id), missing=removed)
+    if post.group_id is not None:
+        add_post(post, [group_feed(post.group_id)])
+
+
+def rebuild_timeline():
+    """Заново заполняет окна всех лент по таблице постов."""
+    author_ids = Post.objects.order_by().values_list(
+        'author_id', flat=True
+    ).distinct()
+    group_ids = Post.objects.order_by().filter(
+        group__isnull=False
+    ).values_list('group_id', flat=True).distinct()
+    feeds = (
+        [INDEX_FEED]
+        + [profile_feed(pk) for pk in author_ids]
+        + [group_feed(pk) for pk in group_ids]
+    )
+    with transaction.atomic():
+        TimelineEntry.objects.all().delete()
+        for feed in feeds:
+            refill(feed)
+
+
+def rebuild_feeds(feeds):
+    """Заново заполняет окна лент ``feeds``, остальные не трогает."""
+    with transaction.atomic():
+        for feed in feeds:
+            TimelineEntry.objects.filter(feed=feed).delete()
+            refill(feed)
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 app_name = 'posts'
 
@@ -12,6 +12,25 @@ urlpatterns = [
     path('profile/<str:username>/', views.profile, name='profile'),
     # Просмотр записи
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    # Поиск по тексту постов
+    path('search/', views.search, name='search'),
     path('create/', views.post_create, name='post_create'),
-    path('posts/<post_id>/edit/', views.post_edit, name='post_edit')
+    path('posts/<post_id>/edit/', views.post_edit, name='post_edit'),
+    # Лента подписок и подписка на автора
+    path('follow/', views.follow_index, name='follow_index'),
+    path(
+        'profile/<str:username>/follow/',
+        views.profile_follow,
+        name='profile_follow'
+    ),
+    path(
+        'profile/<str:username>/unfollow/',
+        views.profile_unfollow,
+        name='profile_unfollow'
+    ),
+    # JSON API для чтения лент и постов
+    path('api/posts/', api.index, name='api_index'),
+    path('api/group/<slug:slug>/', api.group_posts, name='api_group_list'),
+    path('api/profile/<str:username>/', api.profile, name='api_profile'),
+    path('api/posts/<int:post_id>/', api.post_detail, name='api_post_detail'),
 ]
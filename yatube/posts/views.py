@@ -1,15 +1,31 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.core.cache import cache
 from django.core.paginator import Paginator
+from django.utils.http import urlencode
 
 from django.shortcuts import render, get_object_or_404, redirect
+from django.views.decorators.http import condition, require_POST
 
-from .models import Post, Group, User
-from .forms import PostForm
+from core import metrics
+from core.budgets import view_budget
+from core.db import serialized_write
 
+from .models import AuthorStats, Follow, Post, Group, User
+from .follow import follow_paginator
+from .forms import PostForm, PostImageForm
+from .page_cache import (cache_feed_page, feed_etag, post_card_key,
+                         post_etag, post_last_modified, post_version)
+from .paginators import KeysetPaginator
+from .timeline import INDEX_FEED, group_feed, profile_feed
 
+
+@view_budget(max_queries=5, max_db_ms=50, max_render_ms=200)
+@condition(etag_func=feed_etag('index'))
+@cache_feed_page('index')
 def index(request):
-    post_list = Post.objects.all()
-    page_obj = paginator(request, post_list)
+    post_list = Post.objects.for_feed()
+    page_obj = paginator(request, post_list, 'index', timeline=INDEX_FEED)
     title = 'Главная страница сайта Yatube'
     context = {
         'page_obj': page_obj,
@@ -19,37 +35,54 @@ def index(request):
     return render(request, template, context)
 
 
+@view_budget(max_queries=5, max_db_ms=50, max_render_ms=200)
+@condition(etag_func=feed_etag('group:{slug}'))
+@cache_feed_page('group:{slug}')
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()[:10]
-    page_obj = paginator(request, posts)
+    posts = group.posts.for_feed()
+    page_obj = paginator(
+        request, posts, count=group.post_count, timeline=group_feed(group.pk)
+    )
     context = {
         'group': group,
-        'posts': posts,
         'page_obj': page_obj
     }
     template = 'posts/group_list.html'
     return render(request, template, context)
 
 
+@view_budget(max_queries=6, max_db_ms=50, max_render_ms=200)
+@condition(etag_func=feed_etag('profile:{username}'))
+@cache_feed_page('profile:{username}')
 def profile(request, username):
     author = User.objects.get(username=username)
-    post_list = author.posts.all()
-    page_obj = paginator(request, post_list)
+    post_list = author.posts.for_feed()
+    all_posts = AuthorStats.post_count_for(author)
+    page_obj = paginator(
+        request, post_list, count=all_posts, timeline=profile_feed(author.pk)
+    )
     title = f'Профайл пользователя {username}'
-    all_posts = post_list.count()
+    following = (
+        request.user.is_authenticated
+        and request.user != author
+        and Follow.objects.filter(user=request.user, author=author).exists()
+    )
     context = {
         'page_obj': page_obj,
         'title': title,
         'all_posts': all_posts,
-        'author': author
+        'author': author,
+        'following': following,
     }
     return render(request, 'posts/profile.html', context)
 
 
+@view_budget(max_queries=5, max_db_ms=50, max_render_ms=100)
+@condition(etag_func=post_etag, last_modified_func=post_last_modified)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    posts_count = post.author.posts.count()
+    post = get_object_or_404(Post.objects.for_feed(), pk=post_id)
+    posts_count = post_version(request, post_id)[1] or 0
     title = post.text
     context = {
         'title': title,
@@ -59,42 +92,125 @@ def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', context)
 
 
+@view_budget(max_queries=4, max_db_ms=200, max_render_ms=200)
+def search(request):
+    query = request.GET.get('q', '').strip()
+    posts = Post.objects.for_feed().search(query)
+    page_obj = Paginator(posts, 10).get_page(request.GET.get('page'))
+    observe_page(request, page_obj)
+    context = {
+        'page_obj': page_obj,
+        'query': query,
+        'title': f'Поиск: {query}' if query else 'Поиск',
+        'page_query': urlencode({'q': query}) + '&',
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@view_budget(max_queries=17, max_db_ms=100, max_render_ms=100)
 @login_required
 def post_create(request):
+    post = Post(author=request.user)
     form = PostForm(request.POST or None,
-                    files=request.FILES or None)
-    if form.is_valid():
-        post = form.save(commit=False)
-        post.author = request.user
-        post.save()
+                    files=request.FILES or None, instance=post)
+    image_form = PostImageForm(request.POST or None,
+                               files=request.FILES or None, instance=post)
+    # Обе формы заполняют один объект, он сохраняется один раз
+    if form.is_valid() and image_form.is_valid():
+        with serialized_write():
+            post.save()
         return redirect('posts:profile', username=post.author)
     context = {
         'form': form,
+        'image_form': image_form,
         'is_edit': False
     }
     return render(request, 'posts/create_post.html', context)
 
 
+@view_budget(max_queries=20, max_db_ms=100, max_render_ms=100)
 @login_required
 def post_edit(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     if request.user != post.author:
         return redirect('posts:post_detail', post_id)
+    old_card = post_card_key(post)
     form = PostForm(request.POST or None,
                     instance=post)
-    if form.is_valid():
-        form.save()
+    image_form = PostImageForm(request.POST or None,
+                               files=request.FILES or None, instance=post)
+    if form.is_valid() and image_form.is_valid():
+        with serialized_write():
+            post.save()
+        cache.delete(old_card)
         return redirect('posts:post_detail', post_id)
     context = {
         'form': form,
+        'image_form': image_form,
         'is_edit': True,
         'post': post
     }
     return render(request, 'posts/create_post.html', context)
 
 
-def paginator(request, posts):
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    return page_obj
+@view_budget(max_queries=7, max_db_ms=50, max_render_ms=200)
+@login_required
+def follow_index(request):
+    page_obj = follow_paginator(request.user, 10).get_keyset_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    observe_page(request, page_obj)
+    context = {
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/follow.html', context)
+
+
+@view_budget(max_queries=10, max_db_ms=50)
+@require_POST
+@login_required
+def profile_follow(request, username):
+    author = get_object_or_404(User, username=username)
+    if author != request.user:
+        Follow.objects.get_or_create(user=request.user, author=author)
+    return redirect('posts:profile', username=username)
+
+
+@view_budget(max_queries=7, max_db_ms=50)
+@require_POST
+@login_required
+def profile_unfollow(request, username):
+    Follow.objects.filter(
+        user=request.user, author__username=username
+    ).delete()
+    return redirect('posts:profile', username=username)
+
+
+def paginator(request, posts, feed=None, count=None, timeline=None):
+    paginator = KeysetPaginator(
+        posts, 10, count_key=feed, known_count=count, timeline=timeline
+    )
+    if 'page' in request.GET or settings.POSTS_NUMBERED_PAGINATION:
+        page = paginator.get_page(request.GET.get('page'))
+    else:
+        page = paginator.get_keyset_page(
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+        )
+    observe_page(request, page)
+    return page
+
+
+def observe_page(request, page):
+    """Глубина страницы ленты для метрик паджинации."""
+    view = metrics.view_name(request)
+    if page.number is None:
+        cursor = 'after' in request.GET or 'before' in request.GET
+        mode = 'keyset_cursor' if cursor else 'keyset_first'
+    else:
+        mode = 'numbered'
+        metrics.observe(
+            'yatube_paginator_page_number', page.number, view=view
+        )
+    metrics.inc('yatube_paginator_pages_total', view=view, mode=mode)
@@ -2,6 +2,9 @@ from django.views.generic import CreateView
 
 from django.urls import reverse_lazy
 
+from core.jobs import enqueue
+
+from .emails import send_welcome_email
 from .forms import CreationForm
 
 
@@ -9,3 +12,9 @@ class SignUp(CreateView):
     form_class = CreationForm
     success_url = reverse_lazy('posts:index')
     template_name = 'users/signup.html'
+
+    def form_valid(self, form):
+        response = super().form_valid(form)
+        # Письмо уходит из воркера, ответ его не ждет
+        enqueue(send_welcome_email, self.object.pk)
+        return response
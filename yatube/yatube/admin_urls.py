@@ -0,0 +1,9 @@
+"""
+URLconf админки, загружается при первом обращении к /admin/. Под
+yatube/wsgi_slim.py модели регистрируются в админке только здесь.
+"""
+from django.contrib import admin
+
+admin.autodiscover()
+
+urlpatterns = admin.site.get_urls()
@@ -23,7 +23,7 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 SECRET_KEY = '!dui2l7lja3i25k*u9bjl##np9immy$1w#xpz@ksl+wk0^pt%w'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get('DJANGO_DEBUG', '1') == '1'
 
 ALLOWED_HOSTS = [
     'localhost',
@@ -48,7 +48,16 @@ INSTALLED_APPS = [
     'about.apps.AboutConfig'
 ]
 
+# Быстрый старт воркера (yatube/wsgi_slim.py): модели регистрируются
+# в админке при первом обращении к ней, а не при запуске
+if os.environ.get('DJANGO_LAZY_ADMIN') == '1':
+    INSTALLED_APPS[0] = 'django.contrib.admin.apps.SimpleAdminConfig'
+
 MIDDLEWARE = [
+    'core.middleware.ProfilingMiddleware',
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
+    'core.middleware.HtmlCompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -62,13 +71,26 @@ ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 
+# Разобранные шаблоны хранятся в процессе. При DEBUG кэш выключен, чтобы
+# правки шаблонов были видны без перезапуска; включить его и при DEBUG
+# можно переменной окружения TEMPLATES_CACHED=1. С кэшем yatube/wsgi.py
+# разбирает все шаблоны TEMPLATES_DIR до первого запроса
+TEMPLATES_CACHED = not DEBUG or os.environ.get('TEMPLATES_CACHED') == '1'
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+if TEMPLATES_CACHED:
+    TEMPLATE_LOADERS = [
+        ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+    ]
 
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -90,8 +112,42 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Сколько секунд ждать блокировку записи до «database is locked»
+        'OPTIONS': {'timeout': 20},
+    }
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+
+# Кэш должен быть общим для всех процессов: версии лент (posts.page_cache)
+# меняют и воркеры gunicorn, и run_worker, а страницы и ответы 304 по
+# этим версиям отдают все воркеры. LocMemCache у каждого процесса свой,
+# с ним сброс в одном процессе не виден остальным, поэтому он остается
+# только при DEBUG, для runserver и тестов. Без DEBUG кэш по умолчанию
+# лежит в файлах CACHE_LOCATION на этой машине; если веб-серверов
+# несколько, задайте в окружении общий бэкенд, например
+# CACHE_BACKEND=django.core.cache.backends.memcached.MemcachedCache
+# и CACHE_LOCATION=127.0.0.1:11211. Чтобы при DEBUG изменения от
+# run_worker сразу были видны в runserver, задайте CACHE_BACKEND и там
+FILE_CACHE_BACKEND = 'django.core.cache.backends.filebased.FileBasedCache'
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache' if DEBUG
+            else FILE_CACHE_BACKEND,
+        ),
+        'LOCATION': os.environ.get(
+            'CACHE_LOCATION', os.path.join(BASE_DIR, 'cache')
+        ),
     }
 }
+if CACHES['default']['BACKEND'] == FILE_CACHE_BACKEND:
+    # Файловый кэш при переполнении удаляет треть файлов, в том числе
+    # версии лент; по умолчанию он держит всего 300 ключей
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': 20000}
 
 
 # Password validation
@@ -134,6 +190,24 @@ STATIC_URL = '/static/'
 
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 
+# collectstatic собирает статику в STATIC_ROOT. Без DEBUG к именам файлов
+# добавляется хэш содержимого, а рядом кладутся копии .gz и .br
+# (core.staticfiles). При STATIC_SERVE yatube/wsgi.py отдает их сам:
+# файлы с хэшем кэшируются браузером на год, остальные — на
+# STATIC_CACHE_MAX_AGE секунд. Если статику отдает nginx, задайте
+# STATIC_SERVE=0 в окружении
+STATIC_ROOT = os.path.join(BASE_DIR, 'collected_static')
+if not DEBUG:
+    STATICFILES_STORAGE = (
+        'core.staticfiles.CompressedManifestStaticFilesStorage'
+    )
+STATIC_SERVE = os.environ.get('STATIC_SERVE', '0' if DEBUG else '1') == '1'
+STATIC_CACHE_MAX_AGE = 60 * 60
+
+MEDIA_URL = '/media/'
+
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
 LOGIN_URL = 'users:login'
 
 LOGIN_REDIRECT_URL = 'posts:index'
@@ -142,3 +216,129 @@ LOGIN_REDIRECT_URL = 'posts:index'
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 # указываем директорию, в которую будут складываться файлы писем
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+
+# HTML-ответы без комментариев и отступов шаблонов, сжатые в gzip или
+# brotli (core.compression). Ответы короче MIN_LENGTH байт не сжимаются.
+# Уровни сжатия ниже, чем у статики: страницы сжимаются на лету
+HTML_MINIFY = True
+HTML_COMPRESS_MIN_LENGTH = 200
+HTML_GZIP_LEVEL = 6
+HTML_BROTLI_QUALITY = 5
+
+# Нумерованные ссылки в паджинаторе лент вместо курсорных
+# «новее/старше»; число постов для них берется из кэша
+POSTS_NUMBERED_PAGINATION = False
+POSTS_COUNT_CACHE_TIMEOUT = 60 * 5
+
+# Список постов в админке считает отфильтрованные посты точно до этого
+# порога, а большее число берет из кэша (posts.paginators)
+POSTS_ADMIN_EXACT_COUNT_LIMIT = 10000
+
+# Страницы лент для анонимных пользователей сбрасываются по версии
+# ленты, время жизни только ограничивает расход памяти кэша. Сброс
+# точный, только если кэш общий для всех процессов (CACHES выше)
+POSTS_PAGE_CACHE_TIMEOUT = 60 * 60
+# manage.py benchmark выключает кэш страниц, чтобы замерять отрисовку лент
+POSTS_PAGE_CACHE = True
+
+# Сколько последних постов каждой ленты хранится в окне posts.timeline:
+# первые POSTS_TIMELINE_WINDOW / 10 страниц читаются по окну
+POSTS_TIMELINE_WINDOW = 200
+
+# Лента подписок (posts.follow): посты авторов, у которых подписчиков
+# больше порога, не раскладываются по окнам подписок, а читаются при
+# открытии ленты. Раскладка идет пачками по столько читателей
+POSTS_FANOUT_MAX_FOLLOWERS = 1000
+POSTS_FANOUT_BATCH_SIZE = 100
+
+# Полнотекстовый поиск по постам (SQLite FTS5). После смены токенизатора
+# индекс пересобирается командой rebuild_search_index. Встроенного
+# русского стеммера в FTS5 нет, поэтому при POSTS_SEARCH_STEMMING
+# у слов запроса отрезаются окончания и ищутся все слова с этой основой
+POSTS_SEARCH_TOKENIZER = 'unicode61 remove_diacritics 2'
+POSTS_SEARCH_STEMMING = True
+
+# Ширины миниатюр картинок постов для srcset и качество JPEG
+POSTS_IMAGE_WIDTHS = (320, 640, 960)
+POSTS_IMAGE_QUALITY = 80
+
+# JSON API: размер страницы по умолчанию и предельный (?limit=), а также
+# число строк, которое читается из базы за один раз при потоковой отдаче
+POSTS_API_PAGE_SIZE = 100
+POSTS_API_MAX_PAGE_SIZE = 10000
+POSTS_API_CHUNK_SIZE = 500
+
+# Бюджеты представлений (core.budgets). Тесты manage.py test проверяют их
+# всегда; на стенде добавьте 'core.middleware.ViewBudgetMiddleware'
+# в MIDDLEWARE и задайте режим 'log' или 'raise'
+VIEW_BUDGETS_MODE = 'off'
+# Какие пределы бюджета проверять. Тесты проверяют только число запросов:
+# время на общих машинах CI скачет, его замеряет manage.py benchmark
+VIEW_BUDGETS_LIMITS = ('max_queries', 'max_db_ms', 'max_render_ms')
+TEST_RUNNER = 'core.test_runner.BudgetTestRunner'
+
+# Выборочное профилирование (core.middleware.ProfilingMiddleware):
+# доля профилируемых запросов, период снятия стеков и каталог для файлов
+# collapsed stacks. django-debug-toolbar под нагрузкой не подходит,
+# поэтому здесь не подключен
+PROFILING_SAMPLE_RATE = 0
+PROFILING_INTERVAL_MS = 5
+PROFILING_DIR = os.path.join(BASE_DIR, 'profiles')
+
+# Метрики Prometheus (core.metrics) на /metrics/. Воркеры gunicorn
+# складывают значения в общий каталог METRICS_DIR из окружения. Prometheus
+# передает METRICS_TOKEN в заголовке Authorization: Bearer; без токена
+# /metrics/ отвечает 404
+METRICS_DIR = os.environ.get('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = 5
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# Прагмы каждого соединения с SQLite (core.db): WAL, чтобы чтение не
+# ждало записи, NORMAL вместо FULL для fsync только на чекпойнтах,
+# отображение файла в память и кэш страниц в 64 МБ (отрицательное
+# значение cache_size — в килобайтах)
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+# Записи постов из представлений идут к SQLite по одной (core.db)
+SQLITE_SERIALIZE_WRITES = True
+
+# Реплики для чтения лент (core.routers). Локально их заменяют копии
+# SQLite: DATABASE_REPLICAS=2 в окружении добавляет базы replica1 и
+# replica2 в файлах db-replicaN.sqlite3, данные в них копирует команда
+# sync_replicas. Страницы, прочитанные с реплики, кэшируются не дольше
+# DATABASE_REPLICA_MAX_LAG секунд, столько же автор после записи читает
+# основную базу
+DATABASE_REPLICAS = [
+    f'replica{number}'
+    for number in range(1, int(os.environ.get('DATABASE_REPLICAS', 0)) + 1)
+]
+for alias in DATABASE_REPLICAS:
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME': os.path.join(BASE_DIR, f'db-{alias}.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+DATABASE_REPLICA_APPS = ['posts']
+DATABASE_REPLICA_VIEWS = [
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+    'posts:search',
+]
+DATABASE_REPLICA_MAX_LAG = 10
+
+# Фоновые задачи (core.jobs) выполняет manage.py run_worker; при EAGER
+# задачи выполняются сразу в запросе. Упавшая задача повторяется через
+# RETRY_DELAY секунд, затем через вдвое больше, и так MAX_ATTEMPTS раз.
+# Задача, занятая воркером, освобождается через LEASE секунд.
+BACKGROUND_JOBS_EAGER = False
+BACKGROUND_JOBS_MAX_ATTEMPTS = 5
+BACKGROUND_JOBS_RETRY_DELAY = 10
+BACKGROUND_JOBS_LEASE = 300
@@ -13,13 +13,25 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.contrib import admin
+from django.conf import settings
+from django.conf.urls.static import static
 from django.urls import include, path
 
+from core.lazy import lazy_include
+from core.views import metrics_view
+
 urlpatterns = [
     path('', include('posts.urls', namespace='posts')),
     path('about/', include('about.urls', namespace='about')),
-    path('admin/', admin.site.urls),
+    lazy_include('admin/', 'yatube.admin_urls', namespace='admin'),
     path('auth/', include('users.urls')),
-    path('auth/', include('django.contrib.auth.urls')),
+    path('auth/', include('users.auth_urls')),
+    path('metrics/', metrics_view, name='metrics'),
 ]
+
+if settings.DEBUG:
+    # В работе картинки отдает веб-сервер: имена из хэша содержимого
+    # можно кэшировать бессрочно
+    urlpatterns += static(
+        settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
+    )
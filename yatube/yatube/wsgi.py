@@ -9,8 +9,20 @@ https://docs.djangoproject.com/en/2.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
+from core.staticfiles import StaticFilesApplication
+from core.template_cache import warm_templates
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+if settings.TEMPLATES_CACHED:
+    # Шаблоны разбираются до первого запроса, а не во время него
+    warm_templates()
+
+if settings.STATIC_SERVE:
+    # Статика из STATIC_ROOT отдается до Django
+    application = StaticFilesApplication(application)
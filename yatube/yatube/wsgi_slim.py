@@ -0,0 +1,35 @@
+"""
+WSGI-вход с быстрым стартом воркера.
+
+В отличие от yatube/wsgi.py модели регистрируются в админке при первом
+обращении к /admin/, а не при запуске, зато URLconf, представления
+лент posts и шаблоны загружаются заранее, и первый читатель ленты не
+ждет их импорта. Время запуска обоих входов сравнивает
+``manage.py importtime`` и сценарий cold_start в ``manage.py benchmark``.
+
+Воркеры стоит запускать с SETUPTOOLS_USE_DISTUTILS=stdlib: иначе
+distutils, который импортирует django.utils.version, подменяется
+копией из setuptools, и запуск тратит на импорт pkg_resources больше
+времени, чем на все приложение.
+"""
+
+import os
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+from django.urls import reverse
+
+from core.staticfiles import StaticFilesApplication
+from core.template_cache import warm_templates
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+os.environ.setdefault('DJANGO_LAZY_ADMIN', '1')
+
+application = get_wsgi_application()
+
+# reverse загружает URLconf, а с ним posts.views и все, что им нужно
+reverse('posts:index')
+if settings.TEMPLATES_CACHED:
+    warm_templates()
+if settings.STATIC_SERVE:
+    application = StaticFilesApplication(application)